@@ -1,7 +1,17 @@
 import os
 import streamlit as st
 from dotenv import load_dotenv, set_key, find_dotenv
-from graph import build_graph, revise_with_feedback
+from cache import get_scrape_cache
+from jobs import JOB_POLL_INTERVAL, JOB_WORKERS, get_job_store, start_workers, submit_generate, submit_rewrite
+from llm_cache import LLM_CACHE_ENABLED, get_llm_cache
+from ratelimit import rate_limit_stats
+from run_context import StreamlitSink
+from tools import token_usage
+from tracing import start_metrics_server
+from graph import (
+    build_graph, get_checkpointer, run_config, revise_with_feedback, seo_prompt_context,
+    IMAGE_CONCURRENCY, BATCH_IMAGE_PROMPTS, STREAM_OUTPUT,
+)
 import time
 
 # --- 환경 설정 ---
@@ -13,6 +23,84 @@ load_dotenv()
 # os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY")
 # os.environ["LANGCHAIN_PROJECT"] = "Multi-Agent Blog Generator"
 
+# 그래프 실행마다 config로 전달하는 실행별 설정 (세션 상태 키)
+RUN_SETTING_KEYS = (
+    "model_provider", "image_model_provider", "image_concurrency", "batch_image_prompts", "stream_output",
+    "scrape_cache_bypass", "scrape_cache_ttl", "llm_cache", "llm_cache_nodes",
+    "openai_api_key", "gemini_api_key", "anthropic_api_key", "tavily_api_key",
+)
+
+
+@st.cache_resource
+def get_graph_app():
+    """컴파일된 그래프를 프로세스당 한 번만 생성하여 모든 세션과 재실행에서 공유"""
+    return build_graph(get_checkpointer())
+
+
+@st.cache_resource
+def get_worker_pool():
+    """작업 큐 워커를 프로세스당 한 번만 시작 (JOB_WORKERS가 0이면 별도 프로세스 워커 사용)"""
+    return start_workers(get_graph_app(), JOB_WORKERS)
+
+
+def collect_run_settings():
+    """현재 세션의 실행별 설정을 그래프 config로 전달할 딕셔너리로 수집
+
+    그래프는 세션 상태를 직접 읽지 않으므로, 노드에서 사용하는 설정은 모두 여기서 전달해야 합니다.
+    """
+    return {key: st.session_state[key] for key in RUN_SETTING_KEYS if key in st.session_state}
+
+
+def track_job(job_id):
+    """진행 상황을 표시할 작업 지정 (URL에도 남겨 새로고침 후에도 같은 작업을 이어서 표시)"""
+    st.session_state.job_id = job_id
+    st.query_params["job"] = job_id
+
+
+def render_job_events(events):
+    """작업 진행 상황 이벤트를 화면에 표시 (연속된 스트리밍 조각은 하나로 합쳐서 표시)"""
+    blocks = []
+    for event in events:
+        if event["level"] == "stream" and blocks and blocks[-1][0] == "stream":
+            blocks[-1][1] += event["message"]
+        else:
+            blocks.append([event["level"], event["message"]])
+
+    container = st
+    for level, message in blocks:
+        if level == "section":
+            container = st.expander(message, expanded=True)
+        elif level == "stream":
+            container.markdown(message)
+            container = st
+        else:
+            getattr(st, level)(message)
+
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def show_job_progress(job_id):
+    """실행 중인 작업의 진행 상황을 주기적으로 다시 읽어 표시하고, 끝나면 결과를 세션에 반영"""
+    job = get_job_store().get(job_id)
+    if job is None:
+        st.session_state.pop("job_id", None)
+        st.query_params.pop("job", None)
+        st.rerun()
+    render_job_events(get_job_store().events(job_id))
+
+    if job["status"] == "done":
+        st.session_state.final_state = job["result"]
+        st.session_state.run_id = job["payload"].get("run_id") or job_id
+        st.session_state.pop("job_id")
+        st.rerun()
+    elif job["status"] == "failed":
+        st.session_state.job_error = job["error"]
+        st.session_state.pop("job_id")
+        st.rerun()
+    else:
+        waiting = "대기 중" if job["status"] == "queued" else "실행 중"
+        st.caption(f"⏳ 작업 {waiting}... 페이지를 새로고침하거나 다른 설정을 바꿔도 작업은 계속 진행됩니다.")
+
+
 def show_fade_alert(message, alert_type="error"):
     """Fade out 효과가 있는 알람을 표시하는 함수"""
     placeholder = st.empty()
@@ -94,6 +182,13 @@ def check_required_api_keys():
 
 def main():
     st.set_page_config(page_title="🤖 네이버 블로그 포스팅 자동 생성기", layout="wide", initial_sidebar_state="expanded")
+    # METRICS_PORT가 지정된 경우에만 Prometheus 지표 엔드포인트 시작 (프로세스당 한 번)
+    start_metrics_server()
+    get_worker_pool()
+
+    # 새로고침 등으로 세션이 새로 시작되면 URL에 남은 작업의 진행 상황/결과를 다시 불러옴
+    if "job_id" not in st.session_state and "final_state" not in st.session_state and (job_id := st.query_params.get("job")):
+        st.session_state.job_id = job_id
 
     # 세션 상태 초기화 - .env 파일에서 자동 로드
     if "keys_initialized" not in st.session_state:
@@ -125,6 +220,62 @@ def main():
             key="image_model_provider"
         )
 
+        st.slider(
+            "이미지 동시 생성 수",
+            min_value=1, max_value=max(4, IMAGE_CONCURRENCY), value=max(1, IMAGE_CONCURRENCY),
+            key="image_concurrency",
+            help="메인 이미지와 부제목 이미지를 동시에 몇 개까지 생성할지 설정합니다."
+        )
+
+        st.checkbox(
+            "이미지 프롬프트 일괄 생성",
+            value=BATCH_IMAGE_PROMPTS,
+            key="batch_image_prompts",
+            help="키워드와 모든 이미지 프롬프트를 한 번의 LLM 호출로 생성합니다. 결과를 해석하지 못하면 항목별 호출로 대체됩니다."
+        )
+
+        st.checkbox(
+            "글 작성 과정 실시간 표시",
+            value=STREAM_OUTPUT,
+            key="stream_output",
+            help="초안 작성과 채팅 수정 결과를 완성될 때까지 기다리지 않고 생성되는 대로 바로 보여줍니다."
+        )
+
+        st.checkbox(
+            "스크랩 캐시 건너뛰기",
+            key="scrape_cache_bypass",
+            help="저장된 스크랩 결과를 사용하지 않고 URL을 새로 받아 캐시를 갱신합니다."
+        )
+        scrape_stats = get_scrape_cache().stats()
+        st.caption(
+            f"스크랩 캐시: 적중 {scrape_stats['hits']} · 재검증 {scrape_stats['revalidated']} · "
+            f"미적중 {scrape_stats['misses']} ({scrape_stats['entries']}개 저장)"
+        )
+
+        st.checkbox(
+            "LLM 응답 캐시 사용",
+            value=LLM_CACHE_ENABLED,
+            key="llm_cache",
+            help="SEO 분석, 블로그 지수 평가 등 같은 입력에 같은 결과를 써도 되는 단계의 LLM 응답을 재사용합니다. 글 작성과 수정은 항상 새로 생성합니다."
+        )
+        if llm_cache_stats := get_llm_cache().stats():
+            st.caption("LLM 캐시 적중률: " + " · ".join(
+                f"{node} {counts['hit_rate']:.0%} ({counts['hits']}/{counts['hits'] + counts['misses']})"
+                for node, counts in llm_cache_stats.items()
+            ))
+        if usage_stats := token_usage.stats():
+            # 제공자 프롬프트 캐시(고정 시스템 프롬프트)에서 읽은 입력 토큰 비율
+            st.caption("프롬프트 캐시 입력 토큰: " + " · ".join(
+                f"{node} {counts['cached_ratio']:.0%} ({counts['cache_read']:,}/{counts['input_tokens']:,})"
+                for node, counts in usage_stats.items()
+            ))
+        if limit_stats := {name: stats for name, stats in rate_limit_stats().items() if stats["throttled"]}:
+            # 429를 받은 제공자/모델만 표시 (동시 실행 한도는 성공할 때마다 다시 늘어남)
+            st.caption("요청 한도 초과: " + " · ".join(
+                f"{name} {stats['throttled']}회 (현재 동시 실행 {stats['concurrency']})"
+                for name, stats in limit_stats.items()
+            ))
+
         # 현재 저장된 키 상태 표시
         saved_keys_status = []
         if st.session_state.get("openai_api_key"):
@@ -206,13 +357,18 @@ def main():
             show_fade_alert(f"{missing_keys_str}가 필요합니다! 사이드바에서 입력 후 저장해주세요.", "error")
             return
 
-        with st.spinner("AI 멀티에이전트가 작업을 시작합니다..."):
-            app = build_graph()
-            initial_state = {"url": url}
-            final_state = app.invoke(initial_state)
-            
-            # 결과를 세션 상태에 저장
-            st.session_state.final_state = final_state
+        # 백그라운드 작업으로 실행 (실행 ID = 작업 ID, 체크포인트가 저장되어 재작성 시 writer 노드부터 이어서 실행)
+        st.session_state.pop("final_state", None)
+        st.session_state.pop("chat_history", None)
+        track_job(submit_generate(url, collect_run_settings()))
+
+    if job_error := st.session_state.pop("job_error", None):
+        st.error(f"생성 작업이 실패했습니다: {job_error}")
+
+    # 진행 중인 작업이 있으면 진행 상황만 표시
+    if job_id := st.session_state.get("job_id"):
+        show_job_progress(job_id)
+        return
 
     # 세션 상태에서 결과 가져오기
     if 'final_state' in st.session_state:
@@ -221,7 +377,7 @@ def main():
         # --- 결과 표시 ---
         # 1. 실패 시 여기서 실행 중단
         if "분석 실패:" in final_state.get('scraped_content', ''):
-            st.error("생성 프로세스가 중단되었습니다. 위의 에러 메시지를 확인해주세요.")
+            st.error(f"생성 프로세스가 중단되었습니다. {final_state['scraped_content']}")
             return # 더 이상 아래 UI를 그리지 않음
 
         # 2. 블로그 지수 확인 및 재작성 옵션
@@ -238,19 +394,19 @@ def main():
                 with st.expander("📋 상세 평가 결과 보기"):
                     st.text(blog_details)
             
+            refresh_title = st.checkbox(
+                "재작성 시 제목과 부제목도 새로 생성하기",
+                key="refresh_title_on_rewrite",
+                help="선택하지 않으면 기존 제목과 부제목을 유지하고 본문만 다시 작성합니다."
+            )
+
             # 재작성 선택 버튼
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🔄 블로그 글 재작성하기", type="primary"):
-                    with st.spinner("AI가 블로그 글을 재작성 중입니다..."):
-                        # 재작성을 위한 새로운 그래프 실행
-                        app = build_graph()
-                        rewrite_state = final_state.copy()
-                        rewrite_state["needs_rewrite"] = True
-                        rewrite_state["rewrite_reason"] = blog_details
-                        final_state = app.invoke(rewrite_state)
-                        st.session_state.final_state = final_state
-                        st.rerun()
+                    # 저장된 체크포인트에서 writer 노드부터 이어서 실행 (스크랩/SEO 분석 재사용)
+                    track_job(submit_rewrite(st.session_state.run_id, blog_details, refresh_title, collect_run_settings()))
+                    st.rerun()
             
             with col2:
                 if st.button("✅ 현재 결과 사용하기"):
@@ -403,25 +559,31 @@ def main():
 
             # 에이전트 응답 생성
             with st.chat_message("assistant"):
-                with st.spinner("작성가 에이전트가 블로그 포스트를 수정하고 있습니다..."):
-                    revised_post = revise_with_feedback(
-                        current_post=final_state.get('draft_post', ''),
-                        user_feedback=user_input,
-                        title=final_state.get('final_title', ''),
-                        seo_analysis=final_state.get('seo_analysis', '')
-                    )
-
-                    # 수정된 포스트로 업데이트
-                    st.session_state.final_state['draft_post'] = revised_post
-
-                    response_message = "✅ 블로그 포스트가 수정되었습니다! 위의 '완성된 블로그 포스트' 섹션이 업데이트되었습니다."
-                    st.markdown(response_message)
-
-                    # 어시스턴트 응답 추가
-                    st.session_state.chat_history.append({"role": "assistant", "content": response_message})
-
-                    # 페이지 새로고침하여 업데이트된 포스트 표시
-                    st.rerun()
+                revise_args = dict(
+                    current_post=final_state.get('draft_post', ''),
+                    user_feedback=user_input,
+                    title=final_state.get('final_title', ''),
+                    seo_analysis=seo_prompt_context(final_state),
+                    config=run_config(st.session_state.get("run_id"), collect_run_settings(), StreamlitSink())
+                )
+                if st.session_state.get("stream_output", STREAM_OUTPUT):
+                    # 수정된 글을 생성되는 대로 표시
+                    revised_post = revise_with_feedback(**revise_args, stream=True)
+                else:
+                    with st.spinner("작성가 에이전트가 블로그 포스트를 수정하고 있습니다..."):
+                        revised_post = revise_with_feedback(**revise_args)
+
+                # 수정된 포스트로 업데이트
+                st.session_state.final_state['draft_post'] = revised_post
+
+                response_message = "✅ 블로그 포스트가 수정되었습니다! 위의 '완성된 블로그 포스트' 섹션이 업데이트되었습니다."
+                st.markdown(response_message)
+
+                # 어시스턴트 응답 추가
+                st.session_state.chat_history.append({"role": "assistant", "content": response_message})
+
+                # 페이지 새로고침하여 업데이트된 포스트 표시
+                st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
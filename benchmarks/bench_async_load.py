@@ -0,0 +1,283 @@
+"""동시 실행 부하 테스트: 스레드당 실행 1개(invoke) vs 이벤트 루프 하나에서 비동기 실행(ainvoke)
+
+외부 서비스 대신 지연 시간만 흉내 내는 로컬 대체물을 사용합니다.
+
+    - LLM: 응답마다 --llm-latency초 걸리는 채팅 모델 (스트리밍은 조각으로 나눠 전송)
+    - 스크랩 대상 페이지와 Pollinations.ai: 별도 프로세스의 로컬 HTTP 서버 (--http-latency초 후 응답)
+    - Tavily: --search-latency초 걸리는 검색 (트렌드 캐시로 첫 실행만 호출)
+
+실행 방식과 동시 실행 수마다 새 프로세스에서 그래프를 N번 동시에 실행하고,
+전체 시간, 초당 처리 수, 실행별 지연 시간(p50/p95), 최대 스레드 수, 최대 메모리(RSS)를 비교합니다.
+
+사용법:
+    python benchmarks/bench_async_load.py --runs 10 50 100 200
+    python benchmarks/bench_async_load.py --runs 500 --modes async --llm-latency 1.0
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 모든 노드의 파서가 받아들이는 LLM 응답 (SEO 브리프/태그, 본문 소제목 포함)
+STAND_IN_REPLY = (
+    "[분석 및 전략]\n- 제목 앞부분에 주요 키워드 배치\n"
+    "[핵심 브리프]\n주요 키워드: 부하, 테스트\n보조 키워드: 비동기\n검색 의도: 성능 비교\n- 짧은 문단\n"
+    "## 첫 번째 소제목\n" + "본문 문장입니다. " * 40 + "\n"
+    "## 두 번째 소제목\n" + "본문 문장입니다. " * 40 + "\n"
+    "[추천 태그]\n부하, 테스트, 비동기"
+)
+ARTICLE_HTML = (
+    "<html><head><title>부하 테스트 글</title></head><body><article><h1>부하 테스트 글</h1>"
+    + "".join(f"<p>{i}번째 문단입니다. 로컬 대체 서버가 돌려주는 본문으로 추출 단계를 그대로 거칩니다.</p>" for i in range(40))
+    + "</article></body></html>"
+).encode("utf-8")
+SETTINGS = {
+    "model_provider": "OpenAI",
+    "openai_api_key": "sk-bench",
+    "tavily_api_key": "tvly-bench",
+    "image_model_provider": "Pollinations.ai",
+    "batch_image_prompts": False,
+    "stream_output": True,
+    "scrape_cache_bypass": True,
+}
+
+
+def serve(port: int, latency: float):
+    """스크랩 대상 페이지(/article/...)와 이미지(/prompt/...)를 지연 후 돌려주는 HTTP 서버"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = ARTICLE_HTML if self.path.startswith("/article/") else b"\x89PNG stand-in"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8" if body is ARTICLE_HTML else "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+        def handle_error(self, request, client_address):
+            # 이미지 요청은 상태 코드만 확인하고 끊으므로 연결 재설정 오류는 무시
+            pass
+
+    Server(("127.0.0.1", port), Handler).serve_forever()
+
+
+def install_stand_ins(llm_latency: float, search_latency: float):
+    """get_llm과 Tavily 검색이 로컬 대체물을 쓰도록 교체"""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    import graph
+    import tools
+
+    pieces = [STAND_IN_REPLY[i:i + 200] for i in range(0, len(STAND_IN_REPLY), 200)]
+
+    class StandInChatModel(BaseChatModel):
+        latency: float = 0.5
+
+        @property
+        def _llm_type(self) -> str:
+            return "stand-in"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(self.latency)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=STAND_IN_REPLY))])
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            await asyncio.sleep(self.latency)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=STAND_IN_REPLY))])
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            for piece in pieces:
+                time.sleep(self.latency / len(pieces))
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            for piece in pieces:
+                await asyncio.sleep(self.latency / len(pieces))
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    model = StandInChatModel(latency=llm_latency)
+    tools.llm_clients.get = lambda key, factory: model
+
+    class StandInSearch:
+        def __init__(self, **kwargs):
+            pass
+
+        def invoke(self, query):
+            time.sleep(search_latency)
+            return {"results": [{"title": "SEO 트렌드", "content": "짧은 문단과 키워드 배치"}]}
+
+        async def ainvoke(self, query):
+            await asyncio.sleep(search_latency)
+            return {"results": [{"title": "SEO 트렌드", "content": "짧은 문단과 키워드 배치"}]}
+
+    graph.TavilySearch = StandInSearch
+
+
+class ThreadSampler:
+    """실행 중 최대 스레드 수를 주기적으로 기록"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _succeeded(state: dict) -> bool:
+    return bool(state.get("draft_post")) and "분석 실패:" not in state.get("scraped_content", "")
+
+
+def run_sync(runs: int, base_url: str, checkpoint_path: str) -> list:
+    """변경 전 방식: 실행마다 스레드 하나에서 app.invoke (cli.py / jobs.py의 워커와 같은 구조)"""
+    from graph import build_graph, get_checkpointer, run_config
+    from run_context import ProgressSink
+
+    app = build_graph(get_checkpointer(checkpoint_path))
+
+    def _one(i):
+        started = time.perf_counter()
+        state = app.invoke({"url": f"{base_url}/article/{i}"}, run_config(f"sync-{i}", SETTINGS, ProgressSink()))
+        return time.perf_counter() - started, _succeeded(state)
+
+    with ThreadPoolExecutor(max_workers=runs) as pool:
+        return list(pool.map(_one, range(runs)))
+
+
+async def run_async(runs: int, base_url: str, checkpoint_path: str) -> list:
+    """변경 후 방식: 이벤트 루프 하나에서 app.ainvoke N개를 동시에 실행"""
+    from graph import build_graph, get_async_checkpointer, run_config
+    from run_context import ProgressSink
+    from tools import aclose_clients
+
+    async with get_async_checkpointer(checkpoint_path) as checkpointer:
+        app = build_graph(checkpointer)
+
+        async def _one(i):
+            started = time.perf_counter()
+            state = await app.ainvoke({"url": f"{base_url}/article/{i}"}, run_config(f"async-{i}", SETTINGS, ProgressSink()))
+            return time.perf_counter() - started, _succeeded(state)
+
+        try:
+            return await asyncio.gather(*(_one(i) for i in range(runs)))
+        finally:
+            await aclose_clients()
+
+
+def measure(args) -> dict:
+    """현재 프로세스에서 한 가지 실행 방식을 측정 (--child로 실행됨)"""
+    install_stand_ins(args.llm_latency, args.search_latency)
+    base_url = f"http://127.0.0.1:{args.port}"
+    checkpoint_path = os.path.join(args.workdir, f"{args.mode}-{args.child}.sqlite")
+
+    with ThreadSampler() as sampler:
+        started = time.perf_counter()
+        if args.mode == "sync":
+            results = run_sync(args.child, base_url, checkpoint_path)
+        else:
+            results = asyncio.run(run_async(args.child, base_url, checkpoint_path))
+        wall = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "mode": args.mode,
+        "runs": args.child,
+        "ok": sum(1 for _, ok in results if ok),
+        "wall_s": round(wall, 2),
+        "runs_per_s": round(args.child / wall, 2),
+        "p50_s": round(statistics.median(latencies), 2),
+        "p95_s": round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 2),
+        "peak_threads": sampler.peak,
+        # Linux에서 ru_maxrss 단위는 KB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, nargs="+", default=[10, 50, 100, 200], help="동시 실행 수 목록")
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--http-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8765)
+    # 내부용: 한 가지 측정을 새 프로세스에서 실행
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args)))
+        return
+
+    server = multiprocessing.Process(target=serve, args=(args.port, args.http_latency), daemon=True)
+    server.start()
+    time.sleep(0.5)
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = {
+                **os.environ,
+                "BLOG_AGENT_CACHE_DIR": workdir,
+                "TRACE_FILE": "",
+                "POLLINATIONS_URL": f"http://127.0.0.1:{args.port}/prompt/",
+                # 로컬 대체물에는 요청 한도가 없으므로 ratelimit의 제공자 한도를 끔 (0 = 제한 없음)
+                "OPENAI_RPM": "0", "OPENAI_TPM": "0", "POLLINATIONS_RPM": "0", "TAVILY_RPM": "0",
+                "RATE_LIMIT_CONCURRENCY": "100000",
+            }
+            for runs in args.runs:
+                for mode in args.modes:
+                    out = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--child", str(runs), "--mode", mode,
+                         "--workdir", workdir, "--port", str(args.port),
+                         "--llm-latency", str(args.llm_latency), "--search-latency", str(args.search_latency)],
+                        env=env, cwd=ROOT, capture_output=True, text=True, check=True,
+                    )
+                    rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+                    r = rows[-1]
+                    print(f"{r['mode']:<5} N={r['runs']:<4} 성공 {r['ok']:>4} | 전체 {r['wall_s']:7.2f}s | "
+                          f"{r['runs_per_s']:6.2f} runs/s | p50 {r['p50_s']:6.2f}s p95 {r['p95_s']:6.2f}s | "
+                          f"스레드 {r['peak_threads']:>4} | RSS {r['peak_rss_mb']:7.1f} MB", flush=True)
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
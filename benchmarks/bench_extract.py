@@ -0,0 +1,135 @@
+"""HTML 추출 파이프라인 벤치마크
+
+저장해 둔 네이버 블로그/뉴스 HTML 파일을 대상으로 기존 방식과 단일 파싱 방식의
+초당 처리 문서 수와 최대 메모리 사용량(tracemalloc)을 비교합니다.
+
+    before: BeautifulSoup(html.parser)로 제목/본문 영역을 찾고, trafilatura가 원문을 다시 파싱
+    after:  lxml 트리를 한 번만 만들고 제목/본문 영역 탐색과 trafilatura 추출이 이 트리를 재사용
+
+코퍼스 디렉터리의 *.html 파일 중 이름에 "naver"가 들어간 파일은 네이버 본문(PostView) 페이지로,
+나머지는 일반 뉴스/웹 페이지로 처리합니다. 기본 코퍼스는 fetch_corpus.py가 고정된 URL 목록에서 받아 둔
+benchmarks/corpus/입니다.
+
+사용법:
+    python benchmarks/fetch_corpus.py                    # 기본 코퍼스를 한 번 받아 둠
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --corpus path/to/saved_pages
+    python benchmarks/bench_extract.py --synthetic 200   # 저장된 페이지가 없을 때 합성 문서 사용
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import trafilatura  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+from fetch_corpus import CORPUS_DIR  # noqa: E402
+from tools import extract_naver_post, extract_web_page, parse_html  # noqa: E402
+
+
+def legacy_naver(content: bytes):
+    """변경 전 네이버 본문 추출 (html.parser + 원문 재파싱)"""
+    inner = BeautifulSoup(content, "html.parser")
+    title = ""
+    for sel in [".se-title-text", ".se_title_text", "h3.se_textarea", "#title_1", "h3#postTitleText"]:
+        el = inner.select_one(sel)
+        if el and el.get_text(strip=True):
+            title = el.get_text(strip=True)
+            break
+    if not title:
+        title = inner.title.get_text(strip=True) if inner.title else ""
+    container = inner.select_one(".se-main-container") or inner.select_one("#postViewArea")
+    if container:
+        for tag in container(["script", "style", "nav", "footer", "aside", "form"]):
+            tag.decompose()
+        return title, container.get_text(separator="\n", strip=True)
+    return title, trafilatura.extract(content.decode("utf-8", "replace"))
+
+
+def legacy_web(content: bytes):
+    """변경 전 일반 페이지 추출 (제목만 html.parser로 읽고 trafilatura가 다시 파싱)"""
+    soup = BeautifulSoup(content, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    return title, trafilatura.extract(content.decode("utf-8", "replace"))
+
+
+def single_parse_naver(content: bytes):
+    return extract_naver_post(parse_html(content))
+
+
+def single_parse_web(content: bytes):
+    return extract_web_page(parse_html(content))
+
+
+def synthetic_corpus(count: int):
+    """저장된 페이지가 없을 때 사용할 네이버/뉴스 형태의 합성 문서"""
+    rng = random.Random(0)
+    words = ["블로그", "여행", "맛집", "후기", "정리", "추천", "방법", "경험", "가이드", "분석"]
+    docs = []
+    for i in range(count):
+        paragraphs = "".join(
+            f"<p>{' '.join(rng.choice(words) for _ in range(rng.randint(20, 60)))}</p>"
+            for _ in range(rng.randint(10, 40))
+        )
+        noise = "<script>var tracking = 1;</script><nav><a href='/'>홈</a></nav>" * 5
+        if i % 2 == 0:
+            html = (f"<html><head><title>네이버 블로그 {i}</title></head><body>{noise}"
+                    f"<div class='se-title-text'>제목 {i}</div>"
+                    f"<div class='se-main-container'>{paragraphs}{noise}</div></body></html>")
+            docs.append((f"naver_{i}.html", html.encode("utf-8")))
+        else:
+            html = (f"<html><head><title>뉴스 {i}</title></head><body>{noise}"
+                    f"<article><h1>기사 {i}</h1>{paragraphs}</article><footer>저작권</footer></body></html>")
+            docs.append((f"news_{i}.html", html.encode("utf-8")))
+    return docs
+
+
+def load_corpus(path: str):
+    docs = []
+    for file_path in sorted(glob.glob(os.path.join(path, "*.html"))):
+        with open(file_path, "rb") as f:
+            docs.append((os.path.basename(file_path), f.read()))
+    return docs
+
+
+def run(label: str, docs, naver_fn, web_fn, repeat: int):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for name, content in docs:
+            (naver_fn if "naver" in name.lower() else web_fn)(content)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = len(docs) * repeat
+    print(f"{label:<7} {total / elapsed:9.1f} docs/sec | {elapsed:7.2f} s | peak {peak / 1024 / 1024:7.2f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="저장된 *.html 파일이 있는 디렉터리 (기본값: fetch_corpus.py의 저장 위치)")
+    parser.add_argument("--synthetic", type=int, default=0, help="코퍼스 대신 사용할 합성 문서 수")
+    parser.add_argument("--repeat", type=int, default=1, help="코퍼스 반복 횟수")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        docs = synthetic_corpus(args.synthetic)
+    else:
+        docs = load_corpus(args.corpus)
+    if not docs:
+        parser.error(f"{args.corpus}에 HTML 문서가 없습니다. python benchmarks/fetch_corpus.py로 먼저 받아주세요.")
+
+    naver_count = sum(1 for name, _ in docs if "naver" in name.lower())
+    print(f"문서 {len(docs)}개 (네이버 {naver_count}개, 기타 {len(docs) - naver_count}개) x {args.repeat}회")
+    run("before", docs, legacy_naver, legacy_web, args.repeat)
+    run("after", docs, single_parse_naver, single_parse_web, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
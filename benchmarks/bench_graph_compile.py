@@ -0,0 +1,73 @@
+"""클릭당 그래프 준비 비용 마이크로 벤치마크
+
+변경 전: 버튼을 누를 때마다 build_graph()로 StateGraph를 새로 만들고 컴파일
+변경 후: 프로세스당 한 번 컴파일한 그래프를 재사용하고, 실행별 설정만 config로 전달
+
+사용법:
+    python benchmarks/bench_graph_compile.py --iterations 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph import build_graph, get_checkpointer, run_config  # noqa: E402
+
+SETTINGS = {"model_provider": "OpenAI", "openai_api_key": "sk-bench", "tavily_api_key": "tvly-bench"}
+
+
+def per_click_rebuild(checkpoint_path: str) -> float:
+    """변경 전: 클릭마다 체크포인터 연결과 그래프를 새로 생성"""
+    started = time.perf_counter()
+    app = build_graph(get_checkpointer(checkpoint_path))
+    run_config(uuid.uuid4().hex, SETTINGS)
+    elapsed = time.perf_counter() - started
+    app.checkpointer.conn.close()
+    return elapsed
+
+
+def per_click_cached(cached_app) -> float:
+    """변경 후: 캐시된 그래프를 가져와 실행별 config만 생성"""
+    started = time.perf_counter()
+    app = cached_app
+    run_config(uuid.uuid4().hex, SETTINGS)
+    assert app is not None
+    return time.perf_counter() - started
+
+
+def report(label: str, samples: list) -> None:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(f"{label:<10} mean {statistics.mean(samples_ms):9.3f} ms | median {statistics.median(samples_ms):9.3f} ms | p95 {p95:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint_path = os.path.join(tmp, "checkpoints.sqlite")
+
+        before = [per_click_rebuild(checkpoint_path) for _ in range(args.iterations)]
+
+        started = time.perf_counter()
+        cached_app = build_graph(get_checkpointer(checkpoint_path))
+        first_compile = time.perf_counter() - started
+        after = [per_click_cached(cached_app) for _ in range(args.iterations)]
+        cached_app.checkpointer.conn.close()
+
+    print(f"클릭 {args.iterations}회 기준 그래프 준비 비용")
+    report("before", before)
+    report("after", after)
+    print(f"최초 1회 컴파일 비용: {first_compile * 1000:.3f} ms")
+    print(f"클릭당 절감: {(statistics.mean(before) - statistics.mean(after)) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
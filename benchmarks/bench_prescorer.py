@@ -0,0 +1,169 @@
+"""블로그 지수 로컬 사전 채점 벤치마크
+
+blog_index.prescore가 저장된 초안을 초당 몇 개 채점하는지 측정하고,
+같은 입력에 대해 항상 같은 점수가 나오는지(재현성) 확인합니다.
+--compare-llm을 주면 같은 초안의 로컬 채점 항목(4, 6, 7, 8, 9)을 LLM에도 평가시켜
+항목별 평균 점수 차이와 2점 이내로 일치한 비율을 출력합니다 (.env의 API 키 사용).
+
+초안은 다음 중 하나에서 읽습니다.
+    --checkpoints: 그래프 체크포인트 DB(.cache/checkpoints.sqlite)에 저장된 draft_post / seo_tags
+    --corpus:      *.md 파일이 있는 디렉터리 (태그 없이 채점)
+    --synthetic:   작성가 에이전트 출력 형태의 합성 초안
+
+사용법:
+    python benchmarks/bench_prescorer.py --checkpoints .cache/checkpoints.sqlite
+    python benchmarks/bench_prescorer.py --synthetic 2000 --repeat 5
+    python benchmarks/bench_prescorer.py --checkpoints .cache/checkpoints.sqlite --compare-llm 20
+"""
+import argparse
+import glob
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blog_index import CRITERIA, LOCAL_CRITERIA, parse_llm_scores, prescore  # noqa: E402
+
+# 로컬 채점 항목을 LLM에 평가시킬 때 쓰는 기준 (docs/blog_index_prompt.md의 배점)
+LLM_CHECK_PROMPT = """당신은 블로그 콘텐츠 전문가입니다. 주어진 블로그 게시물을 아래 5개 항목에 대해 각각 0-10점으로 평가해주세요.
+
+평가 기준 4. 본문 구조화: 소제목에 키워드 포함(4점), 목록/번호 활용(3점), 긴 문장을 2~3줄로 끊어 씀(3점)
+평가 기준 6. 내부/외부 링크: 블로그 내 다른 글로 연결(5점), 신뢰할 수 있는 외부 출처 1~2개 인용(5점)
+평가 기준 7. 이미지 활용: 이미지 3장 이상(4점), 핵심 키워드를 포함한 파일명(3점), ALT 텍스트 설명(3점)
+평가 기준 8. CTA 삽입: 공감/구독/이웃추가 유도 문구(5점), 댓글을 유도하는 질문(5점)
+평가 기준 9. 메타데이터와 태그: 태그가 글의 키워드와 일치(5점), 핵심 키워드 3~5개에 집중(5점)
+
+다음 형식으로 5줄만 출력해주세요:
+평가 기준 N: [점수]/10 - [평가 이유]"""
+
+
+def load_checkpoints(path: str):
+    """체크포인트 DB에서 실행(thread)별 마지막 (초안, 태그, 생성 예정 이미지의 제목/부제목)을 읽음"""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    drafts = {}
+    for item in saver.list(None):
+        values = item.checkpoint.get("channel_values", {})
+        thread_id = item.config["configurable"]["thread_id"]
+        if values.get("draft_post") and thread_id not in drafts:
+            planned = [values.get("final_title", "")] + values.get("naver_seo_subtitles", [])[:3]
+            drafts[thread_id] = (values["draft_post"], values.get("seo_tags", []), planned)
+    return list(drafts.values())
+
+
+def load_corpus(path: str):
+    drafts = []
+    for file_path in sorted(glob.glob(os.path.join(path, "*.md"))):
+        with open(file_path, encoding="utf-8") as f:
+            drafts.append((f.read(), [], []))
+    return drafts
+
+
+def synthetic_drafts(count: int):
+    """작성가 에이전트 출력 형태(서론, ## 소제목, 목록, CTA)의 합성 초안"""
+    rng = random.Random(0)
+    words = ["블로그", "여행", "맛집", "후기", "정리", "추천", "방법", "경험", "가이드", "분석", "😊", "✨"]
+    tags = ["여행", "맛집", "후기", "추천", "가이드", "서울", "주말", "데이트"]
+    drafts = []
+    for _ in range(count):
+        def sentence():
+            return " ".join(rng.choice(words) for _ in range(rng.randint(5, 30))) + rng.choice([".", "!", "?"])
+
+        parts = [" ".join(sentence() for _ in range(3))]
+        for h in range(rng.randint(2, 6)):
+            parts.append(f"## {rng.choice(tags)} {rng.choice(words)} {h + 1}")
+            parts.extend(sentence() for _ in range(rng.randint(2, 6)))
+            parts.extend(f"- {sentence()}" for _ in range(rng.randint(0, 4)))
+            if rng.random() < 0.3:
+                parts.append(f"![{rng.choice(tags)}](https://example.com/{h}.png)")
+            if rng.random() < 0.2:
+                parts.append(f"[출처](https://news.example.com/{h})")
+        parts.append("도움이 되셨다면 공감과 이웃추가 부탁드려요! 여러분의 경험은 어떠셨나요? 댓글로 알려주세요 💬")
+        planned = [f"{rng.choice(tags)} {rng.choice(words)}" for _ in range(4)]
+        drafts.append(("\n\n".join(parts), rng.sample(tags, rng.randint(3, 8)), planned))
+    return drafts
+
+
+def compare_with_llm(drafts: list, local: list, limit: int, provider: str):
+    """로컬 채점 결과와 같은 기준의 LLM 평가를 비교해 항목별 평균 차이와 2점 이내 일치율을 출력"""
+    from dotenv import load_dotenv
+    from langchain_core.prompts import ChatPromptTemplate
+
+    from graph import run_config
+    from tools import env_settings, get_llm
+
+    load_dotenv()
+    config = run_config("bench-prescorer", {**env_settings(), "model_provider": provider})
+    llm = get_llm(temperature=0, config=config)
+    if llm is None:
+        print("LLM 비교 건너뜀: API 키가 없습니다.")
+        return
+    chain = ChatPromptTemplate.from_messages([
+        ("system", LLM_CHECK_PROMPT),
+        ("human", "**발행 태그:** {tags}\n**발행 시 추가되는 이미지:** {planned}\n\n{draft_post}"),
+    ]) | llm
+
+    diffs = {n: [] for n in LOCAL_CRITERIA}
+    for (draft, tags, planned), scores in list(zip(drafts, local))[:limit]:
+        content = chain.invoke({
+            "tags": ", ".join(tags) or "없음",
+            "planned": ", ".join(f"'{p}' 설명이 붙은 이미지" for p in planned) or "없음",
+            "draft_post": draft,
+        }).content
+        for number, (llm_score, _) in parse_llm_scores(content).items():
+            if number in diffs:
+                diffs[number].append(scores[number][0] - llm_score)
+
+    print(f"LLM 비교 ({min(limit, len(drafts))}개 초안, 로컬 - LLM)")
+    for number, values in diffs.items():
+        if values:
+            mean = sum(values) / len(values)
+            within = sum(1 for d in values if abs(d) <= 2) / len(values)
+            print(f"  기준 {number} {CRITERIA[number]}: 평균 차이 {mean:+.1f}, 2점 이내 {within:.0%} ({len(values)}개)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoints", help="그래프 체크포인트 SQLite 파일")
+    parser.add_argument("--corpus", help="저장된 *.md 초안이 있는 디렉터리")
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 초안 수")
+    parser.add_argument("--repeat", type=int, default=3, help="초안 목록 반복 횟수")
+    parser.add_argument("--compare-llm", type=int, default=0, metavar="N", help="앞의 N개 초안을 LLM 평가와 비교")
+    parser.add_argument("--provider", default="OpenAI", choices=["OpenAI", "Gemini", "Claude"], help="--compare-llm에 사용할 LLM")
+    args = parser.parse_args()
+
+    if args.checkpoints:
+        drafts = load_checkpoints(args.checkpoints)
+    elif args.corpus:
+        drafts = load_corpus(args.corpus)
+    elif args.synthetic:
+        drafts = synthetic_drafts(args.synthetic)
+    else:
+        parser.error("--checkpoints, --corpus, --synthetic 중 하나를 지정해주세요.")
+    if not drafts:
+        parser.error("채점할 초안이 없습니다.")
+
+    avg_chars = sum(len(d) for d, _, _ in drafts) / len(drafts)
+    print(f"초안 {len(drafts)}개 (평균 {avg_chars:.0f}자) x {args.repeat}회")
+
+    first = [prescore(draft, tags, planned) for draft, tags, planned in drafts]
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        results = [prescore(draft, tags, planned) for draft, tags, planned in drafts]
+    elapsed = time.perf_counter() - started
+
+    total = len(drafts) * args.repeat
+    print(f"prescore {total / elapsed:10.1f} drafts/sec | {elapsed:7.3f} s")
+    print(f"재현성: {'동일' if results == first else '불일치'}")
+    averages = {n: sum(r[n][0] for r in first) / len(first) for n in first[0]}
+    print("항목별 평균 점수: " + ", ".join(f"기준 {n} {avg:.1f}" for n, avg in averages.items()))
+    if args.compare_llm:
+        compare_with_llm(drafts, first, args.compare_llm, args.provider)
+
+
+if __name__ == "__main__":
+    main()
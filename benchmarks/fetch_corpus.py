@@ -0,0 +1,87 @@
+"""bench_extract.py용 HTML 코퍼스를 받아 저장
+
+고정된 URL 목록(CORPUS_URLS)을 스크래퍼와 같은 방식으로 받아 benchmarks/corpus/에 저장합니다.
+네이버 블로그는 본문(PostView) 페이지를 naver_*.html로, 나머지는 web_*.html로 저장하므로
+bench_extract.py가 파일 이름으로 추출 방식을 고를 수 있습니다. 이미 받은 파일은 건너뜁니다.
+
+사용법:
+    python benchmarks/fetch_corpus.py
+    python benchmarks/fetch_corpus.py --urls urls.jsonl   # cli.py 입력 파일의 URL을 추가로 받음
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import _fetch_naver_post, _fetch_web_page, _is_naver_blog  # noqa: E402
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# 네이버 블로그 본문과 한국어/영어 일반 웹 문서
+CORPUS_URLS = [
+    "https://blog.naver.com/marantz2000/223977912972",
+    "https://ko.wikipedia.org/wiki/네이버",
+    "https://ko.wikipedia.org/wiki/블로그",
+    "https://ko.wikipedia.org/wiki/검색_엔진_최적화",
+    "https://en.wikipedia.org/wiki/Search_engine_optimization",
+    "https://en.wikipedia.org/wiki/Web_scraping",
+    "https://docs.python.org/ko/3/tutorial/index.html",
+    "https://docs.python.org/3/library/asyncio.html",
+]
+
+
+def corpus_name(url: str) -> str:
+    """URL별 저장 파일 이름 (네이버 블로그는 naver_ 접두사)"""
+    prefix = "naver" if _is_naver_blog(url) else "web"
+    return f"{prefix}_{hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]}.html"
+
+
+def read_urls(path: str) -> list:
+    """cli.py 입력 형식(JSONL의 url 필드) 또는 한 줄에 URL 하나인 파일에서 URL 목록을 읽음"""
+    urls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                urls.append(json.loads(line)["url"] if line.startswith("{") else line)
+    return urls
+
+
+def fetch(url: str) -> bytes:
+    r = _fetch_naver_post(url) if _is_naver_blog(url) else _fetch_web_page(url)
+    if r is None:
+        raise ValueError("네이버 본문 주소를 찾지 못했습니다.")
+    return r.content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=CORPUS_DIR, help="저장할 디렉터리")
+    parser.add_argument("--urls", help="추가로 받을 URL 파일 (cli.py 입력 JSONL 또는 URL 목록)")
+    args = parser.parse_args()
+
+    urls = CORPUS_URLS + (read_urls(args.urls) if args.urls else [])
+    os.makedirs(args.out, exist_ok=True)
+    saved = failed = 0
+    for url in urls:
+        path = os.path.join(args.out, corpus_name(url))
+        if os.path.exists(path):
+            continue
+        try:
+            content = fetch(url)
+        except Exception as e:
+            print(f"실패 {url}: {type(e).__name__}: {e}")
+            failed += 1
+            continue
+        with open(path, "wb") as f:
+            f.write(content)
+        print(f"저장 {os.path.basename(path)} ({len(content) / 1024:.0f} KiB) {url}")
+        saved += 1
+    print(f"{saved}개 저장, {failed}개 실패 ({args.out})")
+
+
+if __name__ == "__main__":
+    main()
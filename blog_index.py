@@ -0,0 +1,207 @@
+import re
+
+# 블로그 지수 평가 항목 (app.py에 표시되는 blog_details의 "평가 기준 N" 번호와 같음)
+CRITERIA = {
+    1: "검색 최적화 제목 작성",
+    2: "첫 문단에서 핵심 요약",
+    3: "독자 공감 포인트 확보",
+    4: "본문 구조화",
+    5: "꾸준한 구독자 유입을 위한 시리즈화",
+    6: "내부 링크 & 외부 링크 전략",
+    7: "이미지 활용법",
+    8: "CTA(Call To Action) 삽입",
+    9: "메타데이터와 태그 최적화",
+    10: "콘텐츠 차별화 요소 추가",
+}
+# 마크다운에서 기계적으로 측정하는 항목과 LLM이 평가하는 주관적 항목
+LOCAL_CRITERIA = (4, 6, 7, 8, 9)
+LLM_CRITERIA = (1, 2, 3, 5, 10)
+
+# 모바일 화면 기준 2~3줄에 해당하는 문장 길이(글자 수)
+MAX_SENTENCE_CHARS = 80
+
+_HEADING_RE = re.compile(r"^#{2,3} +(.+)$", re.MULTILINE)
+_LIST_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+\S", re.MULTILINE)
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)[^)]*\)")
+_URL_RE = re.compile(r"https?://[^\s)>\]]+")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?。])\s+|\n+")
+_MARKUP_RE = re.compile(r"^\s*(?:[-*+>]|\d+[.)])\s*|[*_`~]", re.MULTILINE)
+_SKIP_LINE_RE = re.compile(r"^(?:#.*|.*!\[[^\]]*\]\(.*)$", re.MULTILINE)
+_NON_WORD_RE = re.compile(r"[^\w]")
+_CTA_PATTERNS = {
+    "공감": re.compile(r"공감|좋아요|하트"),
+    "구독": re.compile(r"구독|이웃\s*추가|서로\s*이웃|팔로우|알림\s*설정"),
+    "공유": re.compile(r"공유|스크랩"),
+    "댓글": re.compile(r"댓글"),
+}
+# 줄 시작이나 공백 뒤의 #태그 (마크다운 소제목 "## "과 URL의 #fragment는 제외)
+_HASHTAG_RE = re.compile(r"(?:^|(?<=\s))#([^\s#.,!?()\[\]]+)", re.MULTILINE)
+_QUESTION_RE = re.compile(r"[?？]\s*(?:[^\w\s]\s*)*$", re.MULTILINE)
+_SCORE_LINE_RE = re.compile(r"평가\s*기준\s*(\d+)\s*[:：]\s*\**\s*(\d+(?:\.\d+)?)\s*/\s*10\s*\**\s*[-–—:]?\s*(.*)")
+_INTERNAL_HOSTS = ("blog.naver.com", "m.blog.naver.com")
+
+
+def _normalize(text: str) -> str:
+    return _NON_WORD_RE.sub("", text.lower())
+
+
+def _keywords(seo_tags: list) -> list:
+    # 본문/소제목과 비교할 상위 태그 (정규화된 형태)
+    return [k for k in (_normalize(tag) for tag in seo_tags[:10]) if k]
+
+
+def _clamp(score: float) -> int:
+    return max(0, min(10, round(score)))
+
+
+def score_structure(draft_post: str, seo_tags: list) -> tuple:
+    """4. 본문 구조화: 소제목 수, 소제목의 키워드 포함, 목록 사용, 문장 길이"""
+    headings = _HEADING_RE.findall(draft_post)
+    lists = len(_LIST_RE.findall(draft_post))
+    keywords = _keywords(seo_tags)
+    keyword_headings = sum(1 for h in map(_normalize, headings) if any(k in h for k in keywords))
+
+    # 소제목/이미지 줄과 목록·강조 기호를 제외한 본문 문장 길이
+    body = _MARKUP_RE.sub("", _SKIP_LINE_RE.sub("", draft_post))
+    sentences = [s for s in _SENTENCE_SPLIT_RE.split(body) if s.strip()]
+    short_ratio = sum(1 for s in sentences if len(s) <= MAX_SENTENCE_CHARS) / len(sentences) if sentences else 0.0
+
+    score = min(len(headings), 3)
+    score += 2 if keyword_headings else 0
+    score += 2 if lists >= 3 else 1 if lists else 0
+    score += 3 if short_ratio >= 0.9 else 2 if short_ratio >= 0.75 else 1 if short_ratio >= 0.5 else 0
+    reason = (
+        f"소제목 {len(headings)}개(키워드 포함 {keyword_headings}개), 목록 항목 {lists}개, "
+        f"{MAX_SENTENCE_CHARS}자 이하 문장 비율 {short_ratio:.0%}"
+    )
+    return _clamp(score), reason
+
+
+def score_links(draft_post: str) -> tuple:
+    """6. 내부 링크 & 외부 링크: 블로그 내부 링크 여부와 외부 출처 1~2개 인용 여부"""
+    urls = _URL_RE.findall(draft_post) if "://" in draft_post else []
+    if urls:
+        # 이미지 주소는 링크로 세지 않음
+        image_urls = {src for _, src in _IMAGE_RE.findall(draft_post)}
+        urls = [u for u in urls if u not in image_urls]
+    internal = [u for u in urls if any(host in u for host in _INTERNAL_HOSTS)]
+    external = len(urls) - len(internal)
+
+    score = 6 if 1 <= external <= 2 else 4 if external > 2 else 0
+    score += 4 if internal else 0
+    return _clamp(score), f"내부 링크 {len(internal)}개, 외부 링크 {external}개"
+
+
+def score_images(draft_post: str, seo_tags: list, planned_images: list = None) -> tuple:
+    """7. 이미지 활용: 발행될 이미지 수(3장 이상), ALT 텍스트, 파일명/ALT의 키워드
+
+    본문에 있는 이미지와 평가 이후 아트 디렉터가 만들 이미지(planned_images)를 함께 셉니다.
+    아트 디렉터 이미지는 제목/부제목으로 만든 프롬프트가 설명으로 붙으므로 ALT가 있는 것으로 보고,
+    이미지가 나타내는 제목/부제목에 키워드가 있는지로 키워드 포함 여부를 판단합니다.
+
+    Args:
+        planned_images: 아트 디렉터가 만들 이미지마다 그 이미지가 나타내는 제목/부제목 (생성할 수 없으면 빈 목록)
+    """
+    images = _IMAGE_RE.findall(draft_post)
+    planned_images = planned_images or []
+    keywords = _keywords(seo_tags)
+    total = len(images) + len(planned_images)
+
+    score = 6 if total >= 3 else 2 * total
+    with_alt = with_keyword = 0
+    if total:
+        with_alt = sum(1 for alt, _ in images if alt.strip()) + len(planned_images)
+        texts = [_normalize(alt + src) for alt, src in images] + [_normalize(text) for text in planned_images]
+        with_keyword = sum(1 for text in texts if any(k in text for k in keywords))
+        score += 2 * with_alt / total + 2 * with_keyword / total
+    reason = (
+        f"이미지 {total}장(본문 {len(images)}장, 생성 예정 {len(planned_images)}장), "
+        f"ALT 텍스트 {with_alt}장, 키워드 포함 {with_keyword}장"
+    )
+    return _clamp(score), reason
+
+
+def score_cta(draft_post: str) -> tuple:
+    """8. CTA 삽입: 공감/구독/공유/댓글 유도 문구와 독자에게 던지는 질문"""
+    found = [name for name, pattern in _CTA_PATTERNS.items() if pattern.search(draft_post)]
+    # 독자 참여를 유도하는 질문은 보통 글 후반부에 위치
+    tail = draft_post[len(draft_post) // 2:]
+    questions = len(_QUESTION_RE.findall(tail))
+
+    score = 6 if len(found) >= 2 else 4 if found else 0
+    score += 4 if questions else 0
+    return _clamp(score), f"유도 문구: {', '.join(found) or '없음'}, 후반부 질문 {questions}개"
+
+
+def score_tags(draft_post: str, seo_tags: list) -> tuple:
+    """9. 메타데이터와 태그: 발행 태그(SEO 추천 태그)가 글의 키워드와 맞는지
+
+    - 핵심 태그 집중: 상위 5개 태그 중 본문에 나오는 태그 수 (3개 이상이면 만점)
+    - 태그 일치도: 글에 해시태그를 직접 썼으면 그중 추천 태그의 비율,
+      없으면 상위 10개 태그 중 본문에 나오는 태그의 비율
+    """
+    keywords = _keywords(seo_tags)
+    if not keywords:
+        return 0, "SEO 추천 태그 없음"
+    body = _normalize(draft_post)
+    covered = sum(1 for k in keywords if k in body)
+    focus = sum(1 for k in keywords[:5] if k in body)
+    score = 5 * min(focus, 3) / 3
+
+    hashtags = [tag for tag in dict.fromkeys(_normalize(tag) for tag in _HASHTAG_RE.findall(draft_post)) if tag]
+    reason = f"상위 태그 {len(keywords)}개 중 본문에 나온 태그 {covered}개(상위 5개 중 {focus}개)"
+    if hashtags:
+        recommended = {k for k in (_normalize(tag.lstrip("#")) for tag in seo_tags) if k}
+        matched = sum(1 for tag in hashtags if tag in recommended)
+        score += 5 * matched / len(hashtags)
+        reason += f", 본문 해시태그 {len(hashtags)}개 중 추천 태그 {matched}개"
+    else:
+        score += 5 * covered / len(keywords)
+    return _clamp(score), reason
+
+
+def prescore(draft_post: str, seo_tags: list = None, planned_images: list = None) -> dict:
+    """마크다운에서 측정 가능한 항목(LOCAL_CRITERIA)을 LLM 없이 채점
+
+    Args:
+        draft_post: 마크다운 블로그 포스트
+        seo_tags: SEO 전문가 에이전트가 생성한 추천 태그
+        planned_images: 평가 이후 아트 디렉터가 만들 이미지마다 그 이미지가 나타내는 제목/부제목
+
+    Returns:
+        {평가 기준 번호: (점수, 평가 이유)}
+    """
+    seo_tags = seo_tags or []
+    return {
+        4: score_structure(draft_post, seo_tags),
+        6: score_links(draft_post),
+        7: score_images(draft_post, seo_tags, planned_images),
+        8: score_cta(draft_post),
+        9: score_tags(draft_post, seo_tags),
+    }
+
+
+def parse_llm_scores(content: str) -> dict:
+    """LLM 응답의 "평가 기준 N: 점수/10 - 이유" 줄을 {번호: (점수, 이유)}로 변환"""
+    scores = {}
+    for match in _SCORE_LINE_RE.finditer(content):
+        number = int(match.group(1))
+        if number in CRITERIA and number not in scores:
+            scores[number] = (_clamp(float(match.group(2))), match.group(3).strip())
+    return scores
+
+
+def format_details(scores: dict) -> tuple:
+    """항목별 점수를 기존 blog_details 형식의 문자열과 총점으로 변환
+
+    평가되지 않은 항목은 0점으로 처리합니다.
+    """
+    lines = []
+    total = 0
+    for number in CRITERIA:
+        score, reason = scores.get(number, (0, "평가 결과 없음"))
+        source = " (자동 측정)" if number in LOCAL_CRITERIA else ""
+        lines.append(f"평가 기준 {number}: {score}/10 - {reason}{source}")
+        total += score
+    lines.append(f"총점: {total}/100")
+    return total, "\n".join(lines)
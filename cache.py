@@ -0,0 +1,366 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# 로컬 캐시 파일을 저장할 디렉터리
+CACHE_DIR = os.getenv("BLOG_AGENT_CACHE_DIR", ".cache")
+
+# 스크랩 캐시: 최대 크기(MB)와 재검증 없이 바로 사용하는 기간(초)
+SCRAPE_CACHE_MAX_MB = float(os.getenv("SCRAPE_CACHE_MAX_MB", "64"))
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", str(6 * 60 * 60)))
+
+# SEO 트렌드 검색 결과 유효기간(초)과, 만료 전 백그라운드 갱신을 시작하는 시점(유효기간 대비 비율)
+SEO_TRENDS_TTL = float(os.getenv("SEO_TRENDS_TTL", str(24 * 60 * 60)))
+SEO_TRENDS_REFRESH_AHEAD = float(os.getenv("SEO_TRENDS_REFRESH_AHEAD", "0.8"))
+# 백그라운드 갱신이 계속 실패할 때 오래된 값을 그대로 반환하는 최대 기간(유효기간의 배수), 넘으면 호출 스레드에서 검색
+SEO_TRENDS_MAX_STALE = float(os.getenv("SEO_TRENDS_MAX_STALE", "3"))
+
+logger = logging.getLogger(__name__)
+
+# URL 정규화 시 제거하는 추적용 쿼리 파라미터
+_TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "ref", "ref_src"}
+
+
+def normalize_url(url: str) -> str:
+    """캐시 키로 사용할 URL 정규화
+
+    스킴/호스트 소문자화, 기본 포트와 fragment 제거, 추적용(utm_* 등) 파라미터 제거,
+    쿼리 파라미터 정렬을 적용하여 같은 문서를 가리키는 URL이 같은 키가 되도록 합니다.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "https"
+    host = (parsed.hostname or "").lower()
+    if parsed.port and not ((scheme == "http" and parsed.port == 80) or (scheme == "https" and parsed.port == 443)):
+        host = f"{host}:{parsed.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    )
+    return urlunparse((scheme, host, parsed.path or "/", "", urlencode(query), ""))
+
+
+class SqliteStore:
+    """캐시들이 공유하는 SQLite 연결 관리
+
+    하나의 연결을 여러 스레드가 잠금으로 나눠 쓰며, 여러 프로세스가 같은 파일을 열 수 있도록 WAL 모드를 사용합니다.
+    """
+
+    schema = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.schema)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ScrapeCache(SqliteStore):
+    """정규화된 URL별 스크랩 결과(제목, 본문) 디스크 캐시
+
+    - ttl초 이내에 받은 항목은 네트워크 요청 없이 바로 사용 (hit)
+    - 그 이후에는 저장된 ETag / Last-Modified로 조건부 GET을 보내고,
+      304 응답이면 다운로드와 본문 추출을 모두 건너뜀 (revalidated)
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 사용되지 않은 항목부터 삭제 (LRU)
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS scrape_cache (
+            url TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            text TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS scrape_cache_last_used ON scrape_cache (last_used);
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None, ttl: float = SCRAPE_CACHE_TTL):
+        super().__init__(path or os.path.join(CACHE_DIR, "scrape_cache.sqlite"))
+        self.max_bytes = int(max_bytes if max_bytes is not None else SCRAPE_CACHE_MAX_MB * 1024 * 1024)
+        self.ttl = ttl
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0}
+
+    def get(self, url: str):
+        """캐시 항목 조회 (없으면 None)"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT * FROM scrape_cache WHERE url = ?", (url,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE scrape_cache SET last_used = ? WHERE url = ?", (time.time(), url))
+        return dict(row) if row is not None else None
+
+    def is_fresh(self, entry: dict, ttl: float = None) -> bool:
+        """ttl초 이내에 받은(또는 재검증된) 항목인지 여부"""
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() - entry["fetched_at"] < ttl
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        """저장된 검증자로 조건부 GET 헤더 생성"""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, title: str, text: str, etag: str = None, last_modified: str = None):
+        now = time.time()
+        size = len(title.encode("utf-8")) + len(text.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scrape_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, title, text, etag, last_modified, now, now, size),
+            )
+            self._evict()
+
+    def mark_revalidated(self, url: str):
+        """304 응답으로 재검증된 항목의 수신 시각 갱신"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE scrape_cache SET fetched_at = ?, last_used = ? WHERE url = ?", (now, now, url))
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM scrape_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for row in self._conn.execute("SELECT url, size FROM scrape_cache ORDER BY last_used").fetchall():
+            self._conn.execute("DELETE FROM scrape_cache WHERE url = ?", (row["url"],))
+            total -= row["size"]
+            if total <= self.max_bytes:
+                break
+
+    def record(self, kind: str):
+        """hits / misses / revalidated 카운터 증가"""
+        with self._lock:
+            self._stats[kind] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            row = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM scrape_cache").fetchone()
+        stats["entries"], stats["bytes"] = row[0], row[1]
+        return stats
+
+
+class TrendCache(SqliteStore):
+    """검색어별 SEO 트렌드 결과 캐시 (프로세스 메모리 + 디스크, stale-while-revalidate)
+
+    - 유효기간의 refresh_ahead 비율이 지나면 값을 그대로 반환하면서 백그라운드에서 미리 갱신
+    - 유효기간이 지난 값도 그대로 반환하고 백그라운드에서 갱신하므로,
+      캐시가 한 번 채워진 뒤에는 요청이 검색 API를 기다리지 않음
+    - 다만 갱신이 계속 실패해 값이 유효기간의 max_stale배보다 오래되면 비어 있는 것으로 취급
+    - 캐시가 비어 있을 때만 호출 스레드에서 검색하며, 같은 검색어의 동시 요청은 첫 요청의 결과를 함께 기다림
+    - 메모리 값이 갱신할 때가 되면 다른 프로세스가 디스크에 저장한 더 새로운 값이 있는지 먼저 확인
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS trend_cache (
+            query TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            stored_at REAL NOT NULL
+        );
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        ttl: float = SEO_TRENDS_TTL,
+        refresh_ahead: float = SEO_TRENDS_REFRESH_AHEAD,
+        max_stale: float = SEO_TRENDS_MAX_STALE,
+    ):
+        super().__init__(path or os.path.join(CACHE_DIR, "trend_cache.sqlite"))
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = max_stale
+        self._memory = {}  # query -> (value, stored_at)
+        self._refreshing = set()
+        self._inflight = {}  # query -> 캐시가 비어 있을 때 진행 중인 검색의 Future
+
+    def _load(self, query: str):
+        with self._lock:
+            if query in self._memory:
+                return self._memory[query]
+            row = self._conn.execute("SELECT value, stored_at FROM trend_cache WHERE query = ?", (query,)).fetchone()
+            if row is not None:
+                self._memory[query] = (row["value"], row["stored_at"])
+                return self._memory[query]
+        return None
+
+    def _store(self, query: str, value: str):
+        stored_at = time.time()
+        with self._lock, self._conn:
+            self._memory[query] = (value, stored_at)
+            self._conn.execute("INSERT OR REPLACE INTO trend_cache VALUES (?, ?, ?)", (query, value, stored_at))
+
+    def _reload(self, query: str, entry: tuple) -> tuple:
+        """다른 프로세스가 디스크에 더 새로운 값을 저장했으면 메모리 값을 교체"""
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM trend_cache WHERE query = ?", (query,)).fetchone()
+            if row is not None and row["stored_at"] > entry[1]:
+                entry = self._memory[query] = (row["value"], row["stored_at"])
+        return entry
+
+    def _usable(self, query: str, entry: tuple, ttl: float):
+        """바로 반환해도 되는 캐시 값, 너무 오래되었으면 디스크를 다시 확인한 뒤 None"""
+        if entry is None or time.time() - entry[1] < ttl * self.max_stale:
+            return entry
+        entry = self._reload(query, entry)
+        if time.time() - entry[1] < ttl * self.max_stale:
+            return entry
+        logger.warning("SEO 트렌드 캐시가 %.0f초 동안 갱신되지 않아 다시 검색합니다 (%s)", time.time() - entry[1], query)
+        return None
+
+    def _serve(self, query: str, entry: tuple, fetch, ttl: float) -> str:
+        """캐시 값을 반환하고, 갱신할 때가 되었으면 백그라운드 갱신"""
+        if time.time() - entry[1] >= ttl * self.refresh_ahead:
+            entry = self._reload(query, entry)
+            if time.time() - entry[1] >= ttl * self.refresh_ahead:
+                self._refresh_in_background(query, fetch)
+        return entry[0]
+
+    def _join_cold_fetch(self, query: str, ttl: float):
+        """(Future, 직접 검색할지 여부): 같은 검색어를 이미 검색 중이면 그 Future를 반환"""
+        with self._lock:
+            entry = self._load(query)
+            if entry is not None and time.time() - entry[1] < ttl * self.max_stale:
+                # 앞선 요청의 검색이 방금 끝나 캐시가 채워진 경우
+                future = Future()
+                future.set_result(entry[0])
+                return future, False
+            if query in self._inflight:
+                return self._inflight[query], False
+            future = self._inflight[query] = Future()
+            return future, True
+
+    def _finish_cold_fetch(self, query: str, future: Future, value: str = None, error: BaseException = None):
+        if value:
+            self._store(query, value)
+        with self._lock:
+            self._inflight.pop(query, None)
+        if error is not None:
+            # 취소(CancelledError)는 기다리던 다른 요청까지 취소하지 않도록 일반 오류로 전달
+            future.set_exception(error if isinstance(error, Exception) else RuntimeError(f"검색 중단: {type(error).__name__}"))
+        else:
+            future.set_result(value)
+
+    def _refresh_in_background(self, query: str, fetch):
+        with self._lock:
+            if query in self._refreshing:
+                return
+            self._refreshing.add(query)
+
+        def _run():
+            try:
+                value = fetch()
+                if value:
+                    self._store(query, value)
+            except Exception as e:
+                logger.warning("SEO 트렌드 백그라운드 갱신 실패 (%s): %s", query, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(query)
+
+        threading.Thread(target=_run, name="trend-cache-refresh", daemon=True).start()
+
+    def get_or_fetch(self, query: str, fetch, ttl: float = None) -> str:
+        """캐시된 검색 결과를 반환하고, 필요하면 fetch()로 (백그라운드) 갱신
+
+        Args:
+            query: 검색어 (캐시 키)
+            fetch: 검색을 수행해 결과 문자열을 반환하는 함수. 빈 결과는 캐시하지 않음
+            ttl: 이번 호출에만 적용할 유효기간(초)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        entry = self._usable(query, self._load(query), ttl)
+        if entry is not None:
+            return self._serve(query, entry, fetch, ttl)
+
+        future, leader = self._join_cold_fetch(query, ttl)
+        if not leader:
+            try:
+                return future.result()
+            except Exception:
+                # 먼저 시작한 검색이 실패하면 이 요청에서 다시 검색
+                return self._fetch_and_store(query, fetch)
+        try:
+            value = fetch()
+        except BaseException as e:
+            self._finish_cold_fetch(query, future, error=e)
+            raise
+        self._finish_cold_fetch(query, future, value)
+        return value
+
+    def _fetch_and_store(self, query: str, fetch) -> str:
+        value = fetch()
+        if value:
+            self._store(query, value)
+        return value
+
+    async def aget_or_fetch(self, query: str, afetch, fetch, ttl: float = None) -> str:
+        """get_or_fetch의 비동기 버전
+
+        캐시가 비어 있으면 afetch()를 기다리고, 백그라운드 갱신은 기존과 같이 스레드에서 fetch()로 수행합니다.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        entry = self._usable(query, self._load(query), ttl)
+        if entry is not None:
+            return self._serve(query, entry, fetch, ttl)
+
+        future, leader = self._join_cold_fetch(query, ttl)
+        if not leader:
+            try:
+                return await asyncio.wrap_future(future)
+            except Exception:
+                value = await afetch()
+                if value:
+                    self._store(query, value)
+                return value
+        try:
+            value = await afetch()
+        except BaseException as e:
+            self._finish_cold_fetch(query, future, error=e)
+            raise
+        self._finish_cold_fetch(query, future, value)
+        return value
+
+
+_scrape_cache = None
+_trend_cache = None
+_scrape_cache_lock = threading.Lock()
+
+
+def get_scrape_cache() -> ScrapeCache:
+    """프로세스 전역 스크랩 캐시 (지연 생성)"""
+    global _scrape_cache
+    if _scrape_cache is None:
+        with _scrape_cache_lock:
+            if _scrape_cache is None:
+                _scrape_cache = ScrapeCache()
+    return _scrape_cache
+
+
+def get_trend_cache() -> TrendCache:
+    """프로세스 전역 SEO 트렌드 캐시 (지연 생성)"""
+    global _trend_cache
+    if _trend_cache is None:
+        with _scrape_cache_lock:
+            if _trend_cache is None:
+                _trend_cache = TrendCache()
+    return _trend_cache
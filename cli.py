@@ -0,0 +1,249 @@
+"""여러 URL을 한 번에 처리하는 헤드리스 실행기
+
+입력 JSONL의 한 줄이 URL 하나이며, url 외의 키는 그 URL에만 적용할 실행 설정입니다.
+
+    {"url": "https://blog.naver.com/...", "id": "post-001", "model_provider": "Claude"}
+    {"url": "https://news.example.com/...", "options": {"image_model_provider": "Pollinations.ai"}}
+
+각 URL의 결과는 끝나는 순서대로 출력 JSONL에 한 줄씩 기록되며, 행 ID마다 결과 줄은 하나입니다
+(--retry-failed로 다시 실행하는 행은 이전 실패 줄을 지우고 새로 기록). 입력의 id는 서로 달라야 합니다.
+같은 명령을 다시 실행하면 이미 성공한 줄은 건너뛰고, 중간에 멈춘 URL은
+체크포인트에 저장된 마지막 노드 다음부터 이어서 실행합니다.
+
+사용법:
+    python cli.py urls.jsonl -o results.jsonl --concurrency 4
+    python cli.py urls.jsonl --async --concurrency 100   # 이벤트 루프 하나에서 비동기로 실행
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from graph import build_graph, get_async_checkpointer, get_checkpointer, run_config
+from run_context import LoggingSink
+from tools import aclose_clients, env_settings
+
+# 동시에 처리할 URL 수 기본값
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# 행 옵션이 아닌 입력 키
+ROW_KEYS = {"url", "id", "options"}
+
+logger = logging.getLogger("blog_agent.cli")
+
+
+def read_rows(path: str) -> list:
+    """입력 JSONL을 (행 ID, URL, 실행 설정) 목록으로 읽음 (id가 없으면 줄 번호 사용)
+
+    행 ID는 실행 ID(체크포인트)와 결과 줄을 구분하는 키이므로 중복되면 ValueError를 냅니다.
+    """
+    rows = []
+    seen = {}  # 행 ID -> 처음 나온 줄 번호
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if not row.get("url"):
+                raise ValueError(f"{path}:{line_no}: url이 없습니다.")
+            options = {k: v for k, v in row.items() if k not in ROW_KEYS}
+            options.update(row.get("options") or {})
+            row_id = str(row.get("id") or line_no)
+            if row_id in seen:
+                raise ValueError(f"{path}:{line_no}: id '{row_id}'가 {seen[row_id]}번째 줄과 중복됩니다.")
+            seen[row_id] = line_no
+            rows.append((row_id, row["url"], options))
+    return rows
+
+
+def finished_ids(path: str, include_failed: bool = True) -> set:
+    """출력 JSONL에 이미 결과가 기록된 행 ID (중단 중에 깨진 마지막 줄은 무시)"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if include_failed or result.get("status") == "ok":
+                done.add(str(result.get("id")))
+    return done
+
+
+def compact_output(path: str, rerun_ids: set) -> None:
+    """다시 실행할 행의 이전 결과 줄과 중단 중에 깨진 줄을 출력 JSONL에서 제거
+
+    이전 실행에서 같은 행 ID가 여러 번 기록되었으면 마지막 줄만 남깁니다.
+    """
+    if not os.path.exists(path):
+        return
+    kept = {}  # 행 ID -> 결과 줄 (기록된 순서 유지)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row_id = str(json.loads(line).get("id"))
+            except (json.JSONDecodeError, AttributeError):
+                continue
+            kept.pop(row_id, None)
+            if row_id not in rerun_ids:
+                kept[row_id] = line if line.endswith("\n") else line + "\n"
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(kept.values())
+    os.replace(tmp_path, path)
+
+
+def batch_run_id(input_path: str, row_id: str) -> str:
+    """입력 파일과 행 ID로 정해지는 실행 ID (재실행 시 같은 체크포인트를 이어서 사용)"""
+    batch = hashlib.sha1(os.path.abspath(input_path).encode("utf-8")).hexdigest()[:8]
+    return f"batch-{batch}-{row_id}"
+
+
+def run_row(app, run_id: str, url: str, settings: dict) -> dict:
+    """URL 하나에 대해 그래프를 실행 (체크포인트가 있으면 이어서 실행)"""
+    config = run_config(run_id, settings, LoggingSink(f"blog_agent.progress.{run_id}"))
+    snapshot = app.get_state(config)
+    if snapshot.next:
+        # 이전 실행이 중간에 멈춘 경우 마지막으로 끝난 노드 다음부터 실행
+        logger.info("%s: %s 노드부터 이어서 실행", run_id, ", ".join(snapshot.next))
+        return app.invoke(None, config)
+    if snapshot.values.get("url") == url and not _scrape_failed(snapshot.values):
+        # 그래프는 끝났지만 결과 줄을 쓰기 전에 멈춘 경우
+        return snapshot.values
+    return app.invoke({"url": url}, config)
+
+
+async def arun_row(app, run_id: str, url: str, settings: dict) -> dict:
+    """run_row의 비동기 버전 (get_async_checkpointer로 컴파일한 그래프에 사용)"""
+    config = run_config(run_id, settings, LoggingSink(f"blog_agent.progress.{run_id}"))
+    snapshot = await app.aget_state(config)
+    if snapshot.next:
+        logger.info("%s: %s 노드부터 이어서 실행", run_id, ", ".join(snapshot.next))
+        return await app.ainvoke(None, config)
+    if snapshot.values.get("url") == url and not _scrape_failed(snapshot.values):
+        return snapshot.values
+    return await app.ainvoke({"url": url}, config)
+
+
+def _scrape_failed(state: dict) -> bool:
+    return "분석 실패:" in state.get("scraped_content", "")
+
+
+def result_line(row_id: str, url: str, state: dict, elapsed: float) -> dict:
+    failed = _scrape_failed(state)
+    return {
+        "id": row_id,
+        "url": url,
+        "status": "error" if failed else "ok",
+        "error": state.get("scraped_content") if failed else None,
+        "title": state.get("final_title", ""),
+        "post": state.get("draft_post", ""),
+        "subtitles": state.get("naver_seo_subtitles", []),
+        "tags": state.get("seo_tags", []),
+        "blog_index": state.get("blog_index", 0),
+        "image_url": state.get("image_url", ""),
+        "subtitle_image_urls": state.get("subtitle_image_urls", []),
+        "elapsed_s": round(elapsed, 1),
+    }
+
+
+def error_line(row_id: str, url: str, error: Exception, elapsed: float) -> dict:
+    return {"id": row_id, "url": url, "status": "error", "error": f"{type(error).__name__}: {error}",
+        "elapsed_s": round(elapsed, 1)}
+
+
+async def run_batch_async(input_path: str, pending: list, base_settings: dict, concurrency: int, write) -> None:
+    """이벤트 루프 하나에서 최대 concurrency개의 URL을 동시에 실행 (스레드를 URL마다 쓰지 않음)"""
+    limit = asyncio.Semaphore(max(1, concurrency))
+
+    async with get_async_checkpointer() as checkpointer:
+        app = build_graph(checkpointer)
+
+        async def _run(row_id, url, options):
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    state = await arun_row(app, batch_run_id(input_path, row_id), url, {**base_settings, **options})
+                    write(result_line(row_id, url, state, time.perf_counter() - started))
+                except Exception as e:
+                    logger.exception("%s 처리 실패", url)
+                    write(error_line(row_id, url, e, time.perf_counter() - started))
+
+        try:
+            await asyncio.gather(*(_run(*row) for row in pending))
+        finally:
+            await aclose_clients()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="URL 목록 JSONL")
+    parser.add_argument("-o", "--output", help="결과 JSONL (기본: 입력 파일명.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="동시에 처리할 URL 수")
+    parser.add_argument("--provider", default=os.getenv("MODEL_PROVIDER", "OpenAI"), choices=["OpenAI", "Gemini", "Claude"])
+    parser.add_argument("--image-provider", default=os.getenv("IMAGE_MODEL_PROVIDER", "Pollinations.ai"), choices=["DALL·E 3", "Pollinations.ai"])
+    parser.add_argument("--retry-failed", action="store_true", help="이전에 실패한 URL도 다시 실행")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="스레드 대신 이벤트 루프 하나에서 비동기로 실행")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+
+    output = args.output or os.path.splitext(args.input)[0] + ".results.jsonl"
+    rows = read_rows(args.input)
+    done = finished_ids(output, include_failed=not args.retry_failed)
+    pending = [row for row in rows if row[0] not in done]
+    compact_output(output, {row[0] for row in pending})
+    logger.info("전체 %d개 중 %d개 처리 (완료 %d개 건너뜀), 동시 실행 %d", len(rows), len(pending), len(rows) - len(pending), args.concurrency)
+
+    base_settings = {"model_provider": args.provider, "image_model_provider": args.image_provider, "stream_output": False}
+    base_settings.update(env_settings())
+
+    write_lock = threading.Lock()
+    failures = 0
+
+    with open(output, "a", encoding="utf-8") as out:
+        def _write(result):
+            nonlocal failures
+            line = json.dumps(result, ensure_ascii=False)
+            with write_lock:
+                out.write(line + "\n")
+                out.flush()
+                print(line, flush=True)
+                failures += result["status"] != "ok"
+
+        if args.use_async:
+            asyncio.run(run_batch_async(args.input, pending, base_settings, args.concurrency, _write))
+        else:
+            app = build_graph(get_checkpointer())
+
+            def _run(row_id, url, options):
+                started = time.perf_counter()
+                try:
+                    state = run_row(app, batch_run_id(args.input, row_id), url, {**base_settings, **options})
+                    return result_line(row_id, url, state, time.perf_counter() - started)
+                except Exception as e:
+                    logger.exception("%s 처리 실패", url)
+                    return error_line(row_id, url, e, time.perf_counter() - started)
+
+            with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+                futures = [pool.submit(_run, *row) for row in pending]
+                for future in as_completed(futures):
+                    _write(future.result())
+
+    logger.info("완료: 성공 %d개, 실패 %d개 -> %s", len(pending) - failures, failures, output)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.messages import HumanMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from cache import CACHE_DIR, SqliteStore, normalize_url
+from run_context import get_run_context
+from tools import LLM_MODELS, get_llm, get_setting, make_executor
+
+# 노드별로 원문 콘텐츠에 사용할 토큰 예산 (실행 설정의 context_budgets가 우선)
+CONTEXT_TOKEN_BUDGETS = {
+    "seo_specialist": int(os.getenv("SEO_CONTEXT_TOKENS", "3000")),
+    "writer_title": int(os.getenv("TITLE_CONTEXT_TOKENS", "1500")),
+    "writer": int(os.getenv("WRITER_CONTEXT_TOKENS", "3000")),
+}
+# 원문을 나눠 요약할 때 청크 하나의 토큰 수와 동시에 요약할 청크 수
+CONDENSE_CHUNK_TOKENS = int(os.getenv("CONDENSE_CHUNK_TOKENS", "2000"))
+CONDENSE_CONCURRENCY = int(os.getenv("CONDENSE_CONCURRENCY", "4"))
+
+# tiktoken 인코딩이 없는 제공자의 토큰 수 보정 비율 (o200k_base 대비 근사값, 한국어 본문에서 넉넉하게 잡은 값)
+# 제공자 토큰 계산 API를 쓸 수 있으면 실제 토큰 수를 세고, 그 측정값으로 이 비율을 대신함 (count_tokens 참고)
+TOKEN_RATIO = {
+    "OpenAI": 1.0,
+    "Gemini": float(os.getenv("TOKEN_RATIO_GEMINI", "1.1")),
+    "Claude": float(os.getenv("TOKEN_RATIO_CLAUDE", "1.4")),
+}
+# 제공자 토큰 계산 API 결과를 텍스트 해시별로 기억하는 개수
+PROVIDER_TOKEN_CACHE_SIZE = int(os.getenv("PROVIDER_TOKEN_CACHE_SIZE", "1024"))
+# 제공자 토큰 계산에 필요한 실행 설정의 API 키
+_PROVIDER_KEYS = {"Gemini": "gemini_api_key", "Claude": "anthropic_api_key"}
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+_provider_counts = OrderedDict()  # (제공자, 텍스트 해시) -> 제공자 API로 센 토큰 수
+_measured_ratio = {}  # 제공자 -> 마지막으로 측정한 토큰 수 비율 (제공자 토큰 수 / o200k_base 토큰 수)
+_provider_lock = threading.Lock()
+
+
+def _get_encoding():
+    """OpenAI 모델의 tiktoken 인코딩 (최초 1회 로드, 실패하면 False)"""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.encoding_for_model(LLM_MODELS["OpenAI"])
+                except Exception as e:
+                    # 오프라인 환경 등에서 인코딩 파일을 받을 수 없으면 글자 수 기반 추정으로 대체
+                    logger.warning("tiktoken 인코딩을 불러오지 못해 토큰 수를 추정합니다: %s", e)
+                    _encoding = False
+    return _encoding
+
+
+def _estimate_tokens(text: str) -> int:
+    # ASCII는 약 4자당 1토큰, 한글 등은 약 1.5자당 1토큰
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+
+def _base_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    return len(encoding.encode(text, disallowed_special=())) if encoding else _estimate_tokens(text)
+
+
+def token_ratio(provider: str) -> float:
+    """o200k_base 토큰 수에 곱할 제공자 비율 (측정한 값이 있으면 그 값, 없으면 TOKEN_RATIO)"""
+    with _provider_lock:
+        return _measured_ratio.get(provider) or TOKEN_RATIO.get(provider, 1.0)
+
+
+def _provider_tokens(text: str, provider: str, config, base: int):
+    """제공자 토큰 계산 API로 센 토큰 수 (텍스트 해시별로 기억, 사용할 수 없으면 None)"""
+    key = (provider, hashlib.sha256(text.encode("utf-8")).hexdigest())
+    with _provider_lock:
+        if key in _provider_counts:
+            _provider_counts.move_to_end(key)
+            return _provider_counts[key]
+    if not get_setting(config, _PROVIDER_KEYS[provider]):
+        return None
+    llm = get_llm(temperature=0, config=config)
+    if llm is None:
+        return None
+    try:
+        # Gemini는 count_tokens API, Claude는 메시지 토큰 계산 API를 사용
+        if provider == "Claude":
+            count = llm.get_num_tokens_from_messages([HumanMessage(content=text)])
+        else:
+            count = llm.get_num_tokens(text)
+    except Exception as e:
+        logger.warning("%s 토큰 계산 API를 사용할 수 없어 비율로 추정합니다: %s", provider, e)
+        return None
+    with _provider_lock:
+        _provider_counts[key] = count
+        while len(_provider_counts) > PROVIDER_TOKEN_CACHE_SIZE:
+            _provider_counts.popitem(last=False)
+        if base:
+            _measured_ratio[provider] = count / base
+    return count
+
+
+def count_tokens(text: str, provider: str = "OpenAI", config=None) -> int:
+    """제공자 기준 텍스트의 토큰 수
+
+    OpenAI는 tiktoken으로 셉니다. 다른 제공자는 config에 API 키가 있으면 제공자 API로 세고,
+    없으면 tiktoken 토큰 수에 token_ratio를 곱해 추정합니다.
+    """
+    if not text:
+        return 0
+    base = _base_tokens(text)
+    if config is not None and provider in _PROVIDER_KEYS:
+        counted = _provider_tokens(text, provider, config, base)
+        if counted is not None:
+            return counted
+    return math.ceil(base * token_ratio(provider))
+
+
+async def acount_tokens(text: str, provider: str = "OpenAI", config=None) -> int:
+    """count_tokens의 비동기 버전 (제공자 API 호출이 이벤트 루프를 막지 않도록 스레드에서 실행)"""
+    if config is None or provider not in _PROVIDER_KEYS:
+        return count_tokens(text, provider)
+    return await asyncio.to_thread(count_tokens, text, provider, config)
+
+
+def truncate_tokens(text: str, budget: int, provider: str = "OpenAI", config=None) -> str:
+    """토큰 예산에 맞게 텍스트 앞부분을 자름 (가능하면 문단 경계에서, 결과는 항상 text의 앞부분)"""
+    if count_tokens(text, provider, config) <= budget:
+        return text
+    base_budget = int(budget / token_ratio(provider))
+    encoding = _get_encoding()
+    if encoding:
+        # 토큰 경계가 한글 등 여러 바이트 글자의 중간일 수 있으므로, 잘린 글자는 버리고 원문을 같은 글자 수로 자름
+        prefix = encoding.decode_bytes(encoding.encode(text, disallowed_special=())[:base_budget])
+        cut = text[:len(prefix.decode("utf-8", errors="ignore"))]
+    else:
+        cut = text[:int(len(text) * base_budget / max(_estimate_tokens(text), 1))]
+    paragraph_end = cut.rfind("\n")
+    return cut[:paragraph_end] if paragraph_end > len(cut) * 0.8 else cut
+
+
+def split_chunks(text: str, chunk_tokens: int = CONDENSE_CHUNK_TOKENS, provider: str = "OpenAI") -> list:
+    """문단 단위로 묶어 chunk_tokens 이하의 청크 목록으로 분할"""
+    chunks, current, current_tokens = [], [], 0
+    for paragraph in (p for p in text.split("\n") if p.strip()):
+        tokens = count_tokens(paragraph, provider)
+        if tokens > chunk_tokens:
+            # 한 문단이 청크보다 길면 토큰 기준으로 잘라서 넣음 (잘린 조각은 항상 paragraph의 앞부분)
+            while paragraph:
+                piece = truncate_tokens(paragraph, chunk_tokens, provider) or paragraph[:1000]
+                chunks.append(piece)
+                paragraph = paragraph[len(piece):].strip()
+            continue
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class CondensedCache(SqliteStore):
+    """URL별 요약(map-reduce) 결과 캐시
+
+    키는 정규화된 URL이며, 원문 해시가 달라지면(글이 수정되면) 새로 요약합니다.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS condensed_cache (
+            url TEXT PRIMARY KEY,
+            source_hash TEXT NOT NULL,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = None):
+        super().__init__(path or os.path.join(CACHE_DIR, "condensed_cache.sqlite"))
+
+    def get(self, url: str, source_hash: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM condensed_cache WHERE url = ? AND source_hash = ?", (url, source_hash)
+            ).fetchone()
+        return row["value"] if row is not None else None
+
+    def put(self, url: str, source_hash: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO condensed_cache VALUES (?, ?, ?, ?)", (url, source_hash, value, time.time())
+            )
+
+
+_condensed_cache = None
+_condensed_cache_lock = threading.Lock()
+
+
+def get_condensed_cache() -> CondensedCache:
+    """프로세스 전역 요약 캐시 (지연 생성)"""
+    global _condensed_cache
+    if _condensed_cache is None:
+        with _condensed_cache_lock:
+            if _condensed_cache is None:
+                _condensed_cache = CondensedCache()
+    return _condensed_cache
+
+
+def token_budget(node: str, config=None) -> int:
+    budgets = {**CONTEXT_TOKEN_BUDGETS, **(get_setting(config, "context_budgets") or {})}
+    return int(budgets[node])
+
+
+CONDENSE_MAP_PROMPT = ChatPromptTemplate.from_template(
+    "다음은 긴 글을 나눈 {total}개 부분 중 {index}번째 부분입니다. "
+    "블로그 글 작성에 필요한 핵심 정보(사실, 수치, 고유명사, 경험담, 팁)를 빠짐없이 한국어로 요약해주세요. "
+    "요약만 출력하세요.\n\n{chunk}"
+)
+CONDENSE_REDUCE_PROMPT = ChatPromptTemplate.from_template(
+    "다음은 한 글을 여러 부분으로 나눠 요약한 내용입니다. 중복을 없애고 원문 순서대로 하나의 요약으로 합쳐주세요. "
+    "핵심 정보는 빠뜨리지 말고 약 {target}토큰 이내로 작성하고, 요약만 출력하세요.\n\n{summaries}"
+)
+
+
+def _condense_plan(url: str, text: str, tokens: int, config):
+    """요약 준비: (RunContext, 제공자, 목표 토큰 수, 캐시 키, 원문 해시, 캐시된 요약)
+
+    원문 토큰 수(tokens)가 가장 큰 노드 예산 이하라서 요약이 필요 없으면 None을 반환합니다.
+    """
+    run = get_run_context(config)
+    provider = run.get("model_provider", "OpenAI")
+    target = max(token_budget(node, config) for node in CONTEXT_TOKEN_BUDGETS)
+    if tokens <= target:
+        return None
+
+    key = normalize_url(url)
+    source_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    cached = get_condensed_cache().get(key, source_hash)
+    if cached is not None:
+        run.write("♻️ 저장된 원문 요약을 사용합니다.")
+    return run, provider, target, key, source_hash, cached
+
+
+def condense_source(url: str, text: str, config=None) -> str:
+    """가장 큰 노드 예산을 넘는 긴 원문을 청크별로 동시에 요약한 뒤(map) 하나로 합침(reduce)
+
+    예산 안에 들어오는 원문이면 빈 문자열을 반환합니다. 결과는 URL별로 캐시됩니다.
+    """
+    provider = get_setting(config, "model_provider", "OpenAI")
+    plan = _condense_plan(url, text, count_tokens(text, provider, config), config)
+    if plan is None:
+        return ""
+    run, provider, target, key, source_hash, cached = plan
+    if cached is not None:
+        return cached
+
+    llm = get_llm(temperature=0, config=config, node="condense")
+    if llm is None:
+        return ""
+
+    chunks = split_chunks(text, provider=provider)
+    run.write(f"📚 원문이 길어 {len(chunks)}개 부분으로 나눠 요약 중...")
+    map_chain = CONDENSE_MAP_PROMPT | llm
+    with make_executor(min(CONDENSE_CONCURRENCY, len(chunks))) as pool:
+        futures = [
+            pool.submit(map_chain.invoke, {"total": len(chunks), "index": i + 1, "chunk": chunk})
+            for i, chunk in enumerate(chunks)
+        ]
+        summaries = [future.result().content.strip() for future in futures]
+
+    condensed = "\n\n".join(summaries)
+    if count_tokens(condensed, provider, config) > target:
+        reduce_chain = CONDENSE_REDUCE_PROMPT | llm
+        condensed = reduce_chain.invoke({"target": target, "summaries": condensed}).content.strip()
+
+    get_condensed_cache().put(key, source_hash, condensed)
+    return condensed
+
+
+async def acondense_source(url: str, text: str, config=None) -> str:
+    """condense_source의 비동기 버전 (청크 요약을 CONDENSE_CONCURRENCY개까지 동시에 ainvoke)"""
+    provider = get_setting(config, "model_provider", "OpenAI")
+    plan = _condense_plan(url, text, await acount_tokens(text, provider, config), config)
+    if plan is None:
+        return ""
+    run, provider, target, key, source_hash, cached = plan
+    if cached is not None:
+        return cached
+
+    llm = get_llm(temperature=0, config=config, node="condense")
+    if llm is None:
+        return ""
+
+    chunks = split_chunks(text, provider=provider)
+    run.write(f"📚 원문이 길어 {len(chunks)}개 부분으로 나눠 요약 중...")
+    map_chain = CONDENSE_MAP_PROMPT | llm
+    limit = asyncio.Semaphore(CONDENSE_CONCURRENCY)
+
+    async def _summarize(index: int, chunk: str) -> str:
+        async with limit:
+            result = await map_chain.ainvoke({"total": len(chunks), "index": index, "chunk": chunk})
+        return result.content.strip()
+
+    summaries = await asyncio.gather(*(_summarize(i + 1, chunk) for i, chunk in enumerate(chunks)))
+
+    condensed = "\n\n".join(summaries)
+    if await acount_tokens(condensed, provider, config) > target:
+        reduce_chain = CONDENSE_REDUCE_PROMPT | llm
+        condensed = (await reduce_chain.ainvoke({"target": target, "summaries": condensed})).content.strip()
+
+    get_condensed_cache().put(key, source_hash, condensed)
+    return condensed
+
+
+def source_context(state: dict, node: str, config=None) -> str:
+    """노드의 토큰 예산에 맞는 원문 콘텐츠
+
+    원문이 예산 안에 들어오면 그대로, 넘으면 요약본(condensed_content)을 사용하고
+    그래도 넘치는 부분은 토큰 단위로 자릅니다.
+    """
+    provider = get_setting(config, "model_provider", "OpenAI")
+    budget = token_budget(node, config)
+    source = state.get("scraped_content", "")
+    if count_tokens(source, provider, config) <= budget:
+        return source
+    return truncate_tokens(state.get("condensed_content") or source, budget, provider, config)
@@ -1,21 +1,55 @@
+import asyncio
 import json
+import os
+import sqlite3
+import time
 
-import streamlit as st
+from contextlib import asynccontextmanager
 from typing import List, TypedDict
 
+from langchain_core.exceptions import OutputParserException
 from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_tavily import TavilySearch
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from langgraph.graph import StateGraph, END
-from openai import OpenAI
-
-from tools import get_llm, scrape_web_content, generate_image_with_gemini
+from openai import AsyncOpenAI, OpenAI
+from pydantic import BaseModel, Field, ValidationError
+
+from blog_index import LLM_CRITERIA, format_details, parse_llm_scores, prescore
+from cache import get_trend_cache
+from context import acondense_source, condense_source, count_tokens, source_context
+from prompts import (
+    BLOG_INDEX_SYSTEM_PROMPT, DRAFT_SYSTEM_PROMPT, REVISION_SYSTEM_PROMPT, REWRITE_SYSTEM_PROMPT,
+    SECTION_REVISION_SYSTEM_PROMPT, SEO_SYSTEM_PROMPT, SUBTITLE_SYSTEM_PROMPT, TITLE_SYSTEM_PROMPT,
+)
+from ratelimit import get_limiter
+from run_context import ProgressSink, RunContext, default_sink, get_run_context
+from revision import section_heading, select_sections, seo_keywords, splice_section, split_sections
+from tools import (
+    agenerate_image_with_gemini, ascrape_web_content, generate_image_with_gemini, get_llm, make_executor,
+    scrape_web_content, system_prompt,
+)
+from tracing import atraced_node, trace_span, traced_node
+
+# 아트 디렉터 단계에서 동시에 실행할 이미지 작업 수 (사이드바 설정이 우선)
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_CONCURRENCY", "4"))
+# 이미지 키워드와 프롬프트를 한 번의 구조화 출력 호출로 생성할지 여부 (사이드바 설정이 우선)
+BATCH_IMAGE_PROMPTS = os.getenv("BATCH_IMAGE_PROMPTS", "true").lower() == "true"
+# 그래프 실행 체크포인트를 저장할 SQLite 파일 (실행 ID별로 저장되어 재작성 시 이어서 실행)
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join(".cache", "checkpoints.sqlite"))
+# 본문 작성/수정 결과를 토큰 단위로 화면에 스트리밍할지 여부 (사이드바 설정이 우선)
+STREAM_OUTPUT = os.getenv("STREAM_OUTPUT", "true").lower() == "true"
 
 
 class AgentState(TypedDict):
     url: str
     scraped_content: str
+    condensed_content: str  # 토큰 예산을 넘는 긴 원문의 요약본
     seo_analysis: str
+    seo_brief: dict  # 작성/수정 프롬프트에 사용하는 압축 SEO 브리프 (SeoBrief)
     seo_tags: List[str]
     draft_post: str
     final_title: str
@@ -28,169 +62,366 @@ class AgentState(TypedDict):
     subtitle_image_prompts: List[str]
     subtitle_image_urls: List[str]
     image_keywords: List[str]
+    image_source: dict  # 현재 이미지를 만든 제목/부제목/이미지 모델 (재작성 후에도 같으면 이미지 재사용)
     needs_rewrite: bool
     rewrite_reason: str
     rewrite_count: int  # 재작성 횟수 추가
+    refresh_title_on_rewrite: bool  # 재작성 시 제목/부제목도 새로 생성할지 여부
     messages: List[BaseMessage]
     user_feedback: str  # 사용자 피드백/수정 요청
     chat_history: List[dict]  # 채팅 히스토리
 
 
-def researcher_node(state: AgentState):
-    st.write("▶️ 리서처 에이전트: URL 콘텐츠 분석 시작...")
-    url = state['url']
-    title, text = scrape_web_content(url)
+# 스크랩 결과가 이 문구를 포함하면 분석 실패로 처리
+SCRAPE_FAILURE_KEYWORDS = ["오류 발생", "추출할 수 없습니다", "스크랩이 금지된 글"]
+
+
+def _researcher_inputs(state: AgentState, config: RunnableConfig):
+    """리서처 노드 입력: (RunContext, URL, 스크랩 옵션)"""
+    run = get_run_context(config)
+    run.write("▶️ 리서처 에이전트: URL 콘텐츠 분석 시작...")
+    options = {"use_cache": not run.get("scrape_cache_bypass", False), "cache_ttl": run.get("scrape_cache_ttl")}
+    return run, state['url'], options
+
+
+def _checked_scrape(title: str, text: str, run: RunContext):
+    """(스크랩 원문, 분석 실패일 때의 노드 결과 또는 None)"""
     scraped_content = (title or "") + (text or "")
-    failure_keywords = ["오류 발생", "추출할 수 없습니다", "스크랩이 금지된 글"] 
-    if any(k in scraped_content for k in failure_keywords):
-        st.error(f"⚠️ {scraped_content}")
-        return {"scraped_content": f"분석 실패: {scraped_content}"}
-    st.success("✅ 리서처 에이전트: 콘텐츠 분석 완료!")
+    if any(k in scraped_content for k in SCRAPE_FAILURE_KEYWORDS):
+        run.error(f"⚠️ {scraped_content}")
+        return scraped_content, {"scraped_content": f"분석 실패: {scraped_content}"}
+    return scraped_content, None
+
+
+def _condense_failed(error: Exception, run: RunContext) -> str:
+    run.warning(f"⚠️ 원문 요약에 실패하여 앞부분만 사용합니다: {error}")
+    return ""
+
+
+def _researcher_result(url: str, scraped_content: str, condensed_content: str, run: RunContext) -> dict:
+    run.success("✅ 리서처 에이전트: 콘텐츠 분석 완료!")
     return {
         "scraped_content": scraped_content,
+        "condensed_content": condensed_content,
         "messages": [HumanMessage(content=f"URL '{url}'의 콘텐츠 분석 완료.")]
     }
 
 
-def seo_specialist_node(state: AgentState):
-    st.write("▶️ SEO 전문가 에이전트: 네이버 SEO 전략 분석 중...")
-    scraped_content = state['scraped_content']
-    search_query = "2025년 네이버 블로그 SEO 최적화 전략"
-    tavily_api_key = st.session_state.get("tavily_api_key")
-    if not tavily_api_key:
-        st.error("❌ Tavily API Key가 설정되어 있지 않습니다.")
-        return {"scraping_status": "Failure", "seo_analysis": "Tavily API Key 없음", "seo_tags": []}
+def researcher_node(state: AgentState, config: RunnableConfig):
+    run, url, options = _researcher_inputs(state, config)
+    scraped_content, failure = _checked_scrape(*scrape_web_content(url, **options), run)
+    if failure is not None:
+        return failure
+    try:
+        # 노드 예산을 넘는 긴 원문은 앞부분만 자르지 않고 전체를 요약해 둠
+        condensed_content = condense_source(url, scraped_content, config)
+    except Exception as e:
+        condensed_content = _condense_failed(e, run)
+    return _researcher_result(url, scraped_content, condensed_content, run)
 
+
+async def aresearcher_node(state: AgentState, config: RunnableConfig):
+    """researcher_node의 비동기 버전"""
+    run, url, options = _researcher_inputs(state, config)
+    scraped_content, failure = _checked_scrape(*await ascrape_web_content(url, **options), run)
+    if failure is not None:
+        return failure
     try:
-        tavily = TavilySearch(max_results=3, tavily_api_key=tavily_api_key)
-        results = tavily.invoke({"query": search_query})
-        seo_trends = ""
-        if results and "results" in results:
-            for r in results["results"]:
-                seo_trends += f"제목: {r.get('title','')}\n내용: {r.get('content','')}\n\n"
-        else:
-            seo_trends = "검색 결과를 찾을 수 없습니다."
+        condensed_content = await acondense_source(url, scraped_content, config)
     except Exception as e:
-        st.error(f"Tavily 검색 오류: {e}")
-        seo_trends = ""
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """당신은 15년 경력의 네이버 블로그 SEO 전문가입니다.
-         주어진 원본 콘텐츠와 최신 SEO 트렌드 정보를 바탕으로, 네이버 검색에 최적화된 블로그 포스트 전략을 수립해야 합니다.
-         결과는 다음 형식으로 정리해주세요:
-         [분석 및 전략]
-         - (여기에 콘텐츠 기반 SEO 전략과 키워드 분석 내용을 서술)
-         
-         [추천 태그]
-         태그1, 태그2, 태그3, ... (쉼표로 구분된 30개의 태그)"""),
+        condensed_content = _condense_failed(e, run)
+    return _researcher_result(url, scraped_content, condensed_content, run)
+
+
+def _format_seo_trends(results) -> str:
+    seo_trends = ""
+    if results and "results" in results:
+        for r in results["results"]:
+            seo_trends += f"제목: {r.get('title','')}\n내용: {r.get('content','')}\n\n"
+    return seo_trends
+
+
+def _checked_search(results):
+    # TavilySearch는 요청 오류(429 포함)를 예외 대신 {"error": ...}로 돌려주므로 RateLimiter가 알 수 있도록 다시 올림
+    if isinstance(results, dict) and isinstance(results.get("error"), Exception):
+        raise results["error"]
+    return results
+
+
+def _search_seo_trends(search_query: str, tavily_api_key: str) -> str:
+    """Tavily로 SEO 트렌드를 검색하여 프롬프트에 넣을 형식으로 정리
+
+    결과가 없으면 빈 문자열을 반환하여 캐시되지 않도록 합니다.
+    """
+    tavily = TavilySearch(max_results=3, tavily_api_key=tavily_api_key)
+    with trace_span("tavily", "search", query=search_query):
+        results = get_limiter("Tavily").call(lambda: _checked_search(tavily.invoke({"query": search_query})))
+    return _format_seo_trends(results)
+
+
+async def _asearch_seo_trends(search_query: str, tavily_api_key: str) -> str:
+    """_search_seo_trends의 비동기 버전"""
+    tavily = TavilySearch(max_results=3, tavily_api_key=tavily_api_key)
+
+    async def _search():
+        return _checked_search(await tavily.ainvoke({"query": search_query}))
+
+    with trace_span("tavily", "search", query=search_query):
+        results = await get_limiter("Tavily").acall(_search)
+    return _format_seo_trends(results)
+
+
+SEO_TRENDS_QUERY = "2025년 네이버 블로그 SEO 최적화 전략"
+# 트렌드 검색 결과가 비어 있을 때 프롬프트에 넣는 문구
+NO_SEO_TRENDS = "검색 결과를 찾을 수 없습니다."
+
+
+def _seo_prompt(config: RunnableConfig) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages([
+        system_prompt(SEO_SYSTEM_PROMPT, config),
         ("human",
          "**최신 네이버 SEO 트렌드:**\n{seo_trends}\n\n"
          "**분석할 원본 콘텐츠:**\n{scraped_content}")
     ])
 
-    llm = get_llm()
-    if llm is None:
-        return {"scraping_status": "Failure", "seo_analysis": "LLM 없음", "seo_tags": []}
 
-    chain = prompt | llm
-    resp = chain.invoke({"seo_trends": seo_trends, "scraped_content": scraped_content[:4000]})
-    analysis_text = resp.content
+def _seo_result(analysis_text: str, run: RunContext) -> dict:
+    """SEO 분석 응답에서 추천 태그와 압축 브리프를 뽑아 노드 결과로 만듦"""
     try:
         tags_part = analysis_text.split("[추천 태그]")[1].strip()
         tags = [t.strip() for t in tags_part.split(",") if t.strip()]
     except IndexError:
         tags = []
 
-    st.success("✅ SEO 전문가 에이전트: 전략 분석 및 태그 생성 완료!")
-    return {"seo_analysis": analysis_text, "seo_tags": tags}
+    seo_brief = _parse_seo_brief(analysis_text, tags)
+    provider = run.get("model_provider", "OpenAI")
+    analysis_tokens = count_tokens(analysis_text, provider)
+    brief_tokens = count_tokens(format_seo_brief(seo_brief), provider)
+    # 제목/부제목/본문 프롬프트 3곳에 분석 전문 대신 브리프를 넣음
+    run.info(
+        f"📉 SEO 브리프 {brief_tokens}토큰 (분석 전문 {analysis_tokens}토큰): "
+        f"작성 단계에서 약 {3 * max(analysis_tokens - brief_tokens, 0)}토큰 절감, 이후 수정 요청마다 {max(analysis_tokens - brief_tokens, 0)}토큰 절감"
+    )
+
+    run.success("✅ SEO 전문가 에이전트: 전략 분석 및 태그 생성 완료!")
+    return {"seo_analysis": analysis_text, "seo_brief": seo_brief, "seo_tags": tags}
+
+
+def _seo_inputs(config: RunnableConfig):
+    """SEO 노드 입력: (RunContext, Tavily API 키, 키가 없을 때의 노드 결과 또는 None)"""
+    run = get_run_context(config)
+    run.write("▶️ SEO 전문가 에이전트: 네이버 SEO 전략 분석 중...")
+    tavily_api_key = run.get("tavily_api_key")
+    if not tavily_api_key:
+        run.error("❌ Tavily API Key가 설정되어 있지 않습니다.")
+        return run, None, {"scraping_status": "Failure", "seo_analysis": "Tavily API Key 없음", "seo_tags": []}
+    return run, tavily_api_key, None
+
+
+def _seo_trends_failed(error: Exception, run: RunContext) -> str:
+    run.error(f"Tavily 검색 오류: {error}")
+    return ""
+
+
+def _seo_chain(state: AgentState, config: RunnableConfig, seo_trends: str):
+    """(분석 체인, 체인 입력), LLM이 없으면 (None, 실패 결과)"""
+    llm = get_llm(config=config, node="seo_specialist")
+    if llm is None:
+        return None, {"scraping_status": "Failure", "seo_analysis": "LLM 없음", "seo_tags": []}
+    return _seo_prompt(config) | llm, {"seo_trends": seo_trends, "scraped_content": source_context(state, "seo_specialist", config)}
+
+
+def seo_specialist_node(state: AgentState, config: RunnableConfig):
+    run, tavily_api_key, failure = _seo_inputs(config)
+    if failure is not None:
+        return failure
+
+    try:
+        # 같은 검색어의 결과는 하루 단위로만 바뀌므로 캐시된 결과를 사용 (만료 전 백그라운드에서 갱신)
+        seo_trends = get_trend_cache().get_or_fetch(
+            SEO_TRENDS_QUERY,
+            lambda: _search_seo_trends(SEO_TRENDS_QUERY, tavily_api_key),
+            ttl=run.get("seo_trends_ttl"),
+        ) or NO_SEO_TRENDS
+    except Exception as e:
+        seo_trends = _seo_trends_failed(e, run)
+
+    chain, inputs = _seo_chain(state, config, seo_trends)
+    if chain is None:
+        return inputs
+    return _seo_result(chain.invoke(inputs).content, run)
+
+
+async def aseo_specialist_node(state: AgentState, config: RunnableConfig):
+    """seo_specialist_node의 비동기 버전"""
+    run, tavily_api_key, failure = _seo_inputs(config)
+    if failure is not None:
+        return failure
+
+    try:
+        seo_trends = await get_trend_cache().aget_or_fetch(
+            SEO_TRENDS_QUERY,
+            lambda: _asearch_seo_trends(SEO_TRENDS_QUERY, tavily_api_key),
+            lambda: _search_seo_trends(SEO_TRENDS_QUERY, tavily_api_key),
+            ttl=run.get("seo_trends_ttl"),
+        ) or NO_SEO_TRENDS
+    except Exception as e:
+        seo_trends = _seo_trends_failed(e, run)
+
+    chain, inputs = _seo_chain(state, config, seo_trends)
+    if chain is None:
+        return inputs
+    return _seo_result((await chain.ainvoke(inputs)).content, run)
+
+
+class SeoBrief(BaseModel):
+    """작성/수정 프롬프트에 SEO 분석 전문 대신 넣는 압축 브리프"""
+    primary_keywords: List[str] = Field(default_factory=list, description="주요 키워드 (최대 5개)")
+    secondary_keywords: List[str] = Field(default_factory=list, description="보조 키워드 (최대 8개)")
+    intent: str = Field(default="", description="검색 의도 한 문장")
+    strategy: List[str] = Field(default_factory=list, description="핵심 전략 (최대 4개)")
+
+
+_SEO_BRIEF_LABELS = {"주요 키워드": "primary_keywords", "보조 키워드": "secondary_keywords", "검색 의도": "intent"}
+
 
+def _section(text: str, start: str, end: str) -> str:
+    if start not in text:
+        return ""
+    return text.split(start, 1)[1].split(end, 1)[0]
+
+
+def _parse_seo_brief(analysis_text: str, tags: List[str]) -> dict:
+    """SEO 분석의 [핵심 브리프] 부분을 SeoBrief로 변환
+
+    모델이 브리프를 빠뜨린 항목은 추천 태그와 [분석 및 전략]의 첫 항목들로 채웁니다.
+    """
+    values = {"primary_keywords": [], "secondary_keywords": [], "intent": "", "strategy": []}
+    for line in _section(analysis_text, "[핵심 브리프]", "[추천 태그]").splitlines():
+        line = line.replace("**", "").strip()
+        if line.startswith("-"):
+            values["strategy"].append(line.lstrip("- ").strip())
+            continue
+        for label, key in _SEO_BRIEF_LABELS.items():
+            if line.startswith(label) and ":" in line:
+                value = line.split(":", 1)[1].strip()
+                values[key] = value if key == "intent" else [v.strip() for v in value.split(",") if v.strip()]
+
+    if not values["primary_keywords"]:
+        values["primary_keywords"] = tags[:3]
+    if not values["secondary_keywords"]:
+        values["secondary_keywords"] = tags[3:8]
+    if not values["strategy"]:
+        bullets = _section(analysis_text, "[분석 및 전략]", "[").splitlines()
+        values["strategy"] = [b.strip().lstrip("- ").strip()[:120] for b in bullets if b.strip().startswith("-")]
+
+    return SeoBrief(
+        primary_keywords=values["primary_keywords"][:5],
+        secondary_keywords=values["secondary_keywords"][:8],
+        intent=values["intent"],
+        strategy=values["strategy"][:4],
+    ).model_dump()
+
+
+def format_seo_brief(brief: dict) -> str:
+    """SEO 브리프를 프롬프트에 넣을 짧은 텍스트로 변환"""
+    lines = [
+        f"주요 키워드: {', '.join(brief.get('primary_keywords', []))}",
+        f"보조 키워드: {', '.join(brief.get('secondary_keywords', []))}",
+    ]
+    if brief.get("intent"):
+        lines.append(f"검색 의도: {brief['intent']}")
+    lines.extend(f"- {item}" for item in brief.get("strategy", []))
+    return "\n".join(lines)
+
+
+def seo_prompt_context(state: dict) -> str:
+    """작성/수정 프롬프트에 넣을 SEO 정보 (브리프가 없는 이전 실행은 분석 전문)"""
+    brief = state.get("seo_brief")
+    return format_seo_brief(brief) if brief else state.get("seo_analysis", "")
+
+
+def _writer_plan(state: AgentState, config: RunnableConfig, run: RunContext):
+    """작성가 노드의 체인과 입력 준비
+
+    Returns:
+        (제목 체인, 제목 입력, 부제목 체인, 본문 체인, 본문 입력), LLM이 없으면 None
+        재작성 시 기존 제목을 유지하면 제목/부제목 체인은 None이고 본문 입력의 main_title에 기존 제목이 들어 있음
+    """
+    llm = get_llm(config=config, node="writer")
+    if llm is None:
+        return None
 
-def writer_node(state: AgentState):
     # 재작성 여부 확인
     is_rewrite = state.get("needs_rewrite", False)
     rewrite_count = state.get("rewrite_count", 0)
-    
+
     if is_rewrite:
-        st.write(f"▶️ 작성가 에이전트: 블로그 포스트 재작성 중... ({rewrite_count + 1}회차)")
+        run.write(f"▶️ 작성가 에이전트: 블로그 포스트 재작성 중... ({rewrite_count + 1}회차)")
     else:
-        st.write("▶️ 작성가 에이전트: 블로그 포스트 초안 작성 중...")
-    
-    scraped_content = state['scraped_content']
-    seo_analysis = state['seo_analysis']
-    rewrite_reason = state.get('rewrite_reason', '')
+        run.write("▶️ 작성가 에이전트: 블로그 포스트 초안 작성 중...")
 
-    title_prompt = ChatPromptTemplate.from_template(
-        "주어진 SEO 분석과 원본 콘텐츠를 바탕으로, 네이버 검색에 최적화된 매력적인 블로그 제목 1개만 생성해주세요. (추가 설명 없이 제목만 출력)\n\n"
-        "**SEO 분석:**\n{seo_analysis}\n\n"
-        "**원본 콘텐츠:**\n{scraped_content}"
-    )
-    llm = get_llm()
-    if llm is None:
-        return {"draft_post": "LLM 없음", "final_title": "", "final_subheadings": [], "naver_seo_subtitles": []}
+    # SEO 분석 전문 대신 압축 브리프를 사용 (제목/부제목/본문 프롬프트 공통)
+    seo_analysis = seo_prompt_context(state)
+    rewrite_reason = state.get('rewrite_reason', '')
+    # 재작성 시에는 기존 제목/부제목을 유지하고 본문만 다시 작성 (refresh_title_on_rewrite로 제목 재생성 가능)
+    keep_title = is_rewrite and bool(state.get("final_title")) and not state.get("refresh_title_on_rewrite", False)
+
+    title_chain = subtitle_chain = title_inputs = None
+    if not keep_title:
+        title_prompt = ChatPromptTemplate.from_messages([
+            system_prompt(TITLE_SYSTEM_PROMPT, config),
+            ("human", "**SEO 분석:**\n{seo_analysis}\n\n**원본 콘텐츠:**\n{scraped_content}")
+        ])
+        title_chain = title_prompt | llm
+        title_inputs = {
+            "seo_analysis": seo_analysis,
+            "scraped_content": source_context(state, "writer_title", config)
+        }
 
-    title_chain = title_prompt | llm
-    main_title = title_chain.invoke({
-        "seo_analysis": seo_analysis,
-        "scraped_content": scraped_content[:2000]
-    }).content.strip().replace('"', '')
-
-    subtitle_prompt = ChatPromptTemplate.from_template(
-        """다음 블로그 제목과 SEO 분석을 바탕으로, 네이버 블로그 SEO에 최적화된 부제목 5개를 생성해주세요.
-        
-        **네이버 블로그 부제목 작성 가이드:**
-        - 검색 키워드 자연스러운 포함
-        - 클릭을 유도하는 문구
-        - 숫자/시간 표현 활용
-        - 감정적/호기심 유발 요소
-        - 20-30자 내외
-        - 서로 다른 관점
-
-        각 부제목은 한 줄씩 번호 없이 출력하세요.
-        
-        **메인 제목:** {main_title}
-        
-        **SEO 분석:**
-        {seo_analysis}"""
-    )
-    subtitle_chain = subtitle_prompt | llm
-    subtitle_resp = subtitle_chain.invoke({"main_title": main_title, "seo_analysis": seo_analysis}).content
-    naver_seo_subtitles = [ln.strip() for ln in subtitle_resp.split("\n") if ln.strip() and not ln.strip().startswith("**")]
+        subtitle_prompt = ChatPromptTemplate.from_messages([
+            system_prompt(SUBTITLE_SYSTEM_PROMPT, config),
+            ("human", "**메인 제목:** {main_title}\n\n**SEO 분석:**\n{seo_analysis}")
+        ])
+        subtitle_chain = subtitle_prompt | llm
 
     # 재작성일 경우 개선사항을 반영한 프롬프트 사용
     if is_rewrite and rewrite_reason:
         draft_prompt = ChatPromptTemplate.from_messages([
-            ("system", 
-             """당신은 전문 블로그 작가입니다. 이전에 작성한 블로그 포스트의 품질이 낮아서 재작성을 진행합니다. 60점 이상의 점수를 받도록 글을 재작성해주세요.
-             
-             다음 개선사항들을 반영하여 고품질의 네이버 블로그 포스트를 마크다운 형식으로 작성해주세요:
-             - 이모지를 적절히 활용하여 친근한 어조 유지
-             - 서론, 본론(소제목 ## 사용), 결론으로 구성
-             - 독자 공감 포인트와 실제 경험담 포함
-             - 검색 최적화를 위한 키워드 자연스럽게 배치
-             - 목록과 번호를 활용하여 가독성 강화
-             - CTA(Call to Action) 삽입하여 독자 참여 유도
-             
-             **개선해야 할 부분:**
-             {rewrite_reason}"""),
-            ("human", "**제목:** {main_title}\n\n**SEO 분석:**\n{seo_analysis}\n\n**원본 콘텐츠:**\n{scraped_content}")
+            system_prompt(REWRITE_SYSTEM_PROMPT, config),
+            ("human", "**제목:** {main_title}\n\n**SEO 분석:**\n{seo_analysis}\n\n**원본 콘텐츠:**\n{scraped_content}\n\n**개선해야 할 부분:**\n{rewrite_reason}")
         ])
     else:
         draft_prompt = ChatPromptTemplate.from_messages([
-            ("system", "당신은 전문 블로그 작가입니다. 주어진 제목, SEO 분석, 원본 콘텐츠를 바탕으로 이모지를 활용하여 친근한 어조의 매력적인 네이버 블로그 포스트를 마크다운 형식으로 작성해주세요. 내용은 서론, 본론(소제목 ## 사용), 결론으로 구성해주세요."),
+            system_prompt(DRAFT_SYSTEM_PROMPT, config),
             ("human", "**제목:** {main_title}\n\n**SEO 분석:**\n{seo_analysis}\n\n**원본 콘텐츠:**\n{scraped_content}")
         ])
 
     draft_chain = draft_prompt | llm
     draft_context = {
-        "main_title": main_title,
+        "main_title": state["final_title"] if keep_title else "",
         "seo_analysis": seo_analysis,
-        "scraped_content": scraped_content[:4000]
+        "scraped_content": source_context(state, "writer", config)
     }
     if is_rewrite and rewrite_reason:
         draft_context["rewrite_reason"] = rewrite_reason
+    return title_chain, title_inputs, subtitle_chain, draft_chain, draft_context
 
-    draft_post = draft_chain.invoke(draft_context).content
+
+def _no_draft() -> dict:
+    return {"draft_post": "LLM 없음", "final_title": "", "final_subheadings": [], "naver_seo_subtitles": []}
+
+
+def _clean_title(title: str) -> str:
+    return title.strip().replace('"', '')
+
+
+def _writer_result(state: AgentState, run: RunContext, draft_post: str, main_title: str, subtitles: str = None) -> dict:
+    """작성 결과를 노드 결과로 만듦 (subtitles가 None이면 기존 부제목 유지)"""
+    if subtitles is None:
+        naver_seo_subtitles = state.get("naver_seo_subtitles", [])
+    else:
+        naver_seo_subtitles = [ln.strip() for ln in subtitles.split("\n") if ln.strip() and not ln.strip().startswith("**")]
 
     subheadings = [ln.replace("## ", "").strip() for ln in draft_post.split("\n") if ln.startswith("## ")]
 
@@ -203,221 +434,518 @@ def writer_node(state: AgentState):
         "needs_rewrite": False,  # 재작성 플래그 초기화
         "rewrite_reason": ""  # 재작성 이유 초기화
     }
-    
-    if is_rewrite:
-        result["rewrite_count"] = rewrite_count + 1
-        st.success("✅ 작성가 에이전트: 포스트 재작성 완료!")
+
+    if state.get("needs_rewrite", False):
+        result["rewrite_count"] = state.get("rewrite_count", 0) + 1
+        run.success("✅ 작성가 에이전트: 포스트 재작성 완료!")
     else:
         result["rewrite_count"] = 0
-        st.success("✅ 작성가 에이전트: 포스트 초안 작성 완료!")
-    
+        run.success("✅ 작성가 에이전트: 포스트 초안 작성 완료!")
+
     return result
 
 
-def blog_indexer_node(state: AgentState):
-    """블로그 지수를 계산하는 에이전트"""
-    st.write("▶️ 블로그 지수 에이전트")
-    st.success("✅ 블로그 지수 계산 중...")
+def writer_node(state: AgentState, config: RunnableConfig):
+    run = get_run_context(config)
+    plan = _writer_plan(state, config, run)
+    if plan is None:
+        return _no_draft()
+    title_chain, title_inputs, subtitle_chain, draft_chain, draft_context = plan
+    if title_chain is not None:
+        draft_context["main_title"] = _clean_title(title_chain.invoke(title_inputs).content)
+
+    with make_executor(1) as pool:
+        # 부제목과 본문은 모두 제목에만 의존하므로 부제목은 백그라운드에서 동시에 생성
+        subtitle_future = None if subtitle_chain is None else pool.submit(subtitle_chain.invoke, draft_context)
+        if run.get("stream_output", STREAM_OUTPUT):
+            with run.section("📝 실시간 초안"):
+                draft_post = run.stream(draft_chain, draft_context)
+        else:
+            draft_post = draft_chain.invoke(draft_context).content
+        subtitles = None if subtitle_future is None else subtitle_future.result().content
 
-    draft_post = state["draft_post"]
+    return _writer_result(state, run, draft_post, draft_context["main_title"], subtitles)
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """당신은 블로그 콘텐츠 전문가입니다. 주어진 블로그 게시물을 분석하여 블로그 지수(Blog Index)를 계산해주세요.
 
-다음 10개 항목을 각각 0-10점으로 평가하여 총 100점 만점으로 채점하고, 각 항목별 평가 근거와 개선점을 제시해주세요.
+async def awriter_node(state: AgentState, config: RunnableConfig):
+    """writer_node의 비동기 버전 (부제목은 본문과 같은 이벤트 루프에서 동시에 생성)"""
+    run = get_run_context(config)
+    plan = _writer_plan(state, config, run)
+    if plan is None:
+        return _no_draft()
+    title_chain, title_inputs, subtitle_chain, draft_chain, draft_context = plan
+    if title_chain is not None:
+        draft_context["main_title"] = _clean_title((await title_chain.ainvoke(title_inputs)).content)
 
-## 평가 기준
+    subtitle_task = None if subtitle_chain is None else asyncio.ensure_future(subtitle_chain.ainvoke(draft_context))
+    try:
+        if run.get("stream_output", STREAM_OUTPUT):
+            with run.section("📝 실시간 초안"):
+                draft_post = await run.astream(draft_chain, draft_context)
+        else:
+            draft_post = (await draft_chain.ainvoke(draft_context)).content
+    except BaseException:
+        if subtitle_task is not None:
+            subtitle_task.cancel()
+        raise
+    subtitles = None if subtitle_task is None else (await subtitle_task).content
 
-### 1. 검색 최적화 제목 작성 
-- 핵심 키워드가 앞부분에 위치하는가? 
-- 숫자, 시간, 지역명을 활용했는가? 
-- 클릭을 유도하는 감정 단어가 포함되어 있는가? 
+    return _writer_result(state, run, draft_post, draft_context["main_title"], subtitles)
 
-### 2. 첫 문단에서 핵심 요약 
-- 3줄 이내에 글 전체를 이해할 수 있도록 정리되었는가? 
-- 질문형으로 시작하여 호기심을 자극하는가? 
 
-### 3. 독자 공감 포인트 확보 
-- 실제 사례, 경험담, 에피소드가 포함되어 있는가? 
-- "저도 처음엔 몰랐는데…" 같은 톤으로 신뢰감을 형성하는가? 
+def _planned_images(state: AgentState, config: RunnableConfig) -> List[str]:
+    """블로그 지수 평가 이후 아트 디렉터가 만들 이미지가 나타내는 제목/부제목 (메인 1장 + 부제목 최대 3장)
 
-### 4. 본문 구조화 
-- 소제목에 키워드가 포함되어 있는가? 
-- 목록/번호를 활용하여 가독성을 강화했는가? 
-- 긴 문장을 2~3줄로 끊어 썼는가? 
+    이미지를 만들 수 없는 설정(DALL·E 3인데 OpenAI API Key 없음)이면 빈 목록입니다.
+    """
+    run = get_run_context(config)
+    image_model_provider = run.get("image_model_provider", "DALL·E 3")
+    if image_model_provider == "DALL·E 3" and not run.get("openai_api_key"):
+        return []
+    return [state.get("final_title", "")] + state.get("naver_seo_subtitles", [])[:3]
 
-### 5. 꾸준한 구독자 유입을 위한 시리즈화 
-- 단발성이 아닌 연재 시리즈로 구성되었는가? 
-- 예: "초보자를 위한 ○○ 1편", "실전 응용 2편"
 
-### 6. 내부 링크 & 외부 링크 전략 
-- 블로그 내 다른 글로 자연스럽게 연결되어 있는가? 
-- 신뢰할 수 있는 외부 출처 1~2개 인용
+def _blog_index_prompt(config: RunnableConfig) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages([
+        system_prompt(BLOG_INDEX_SYSTEM_PROMPT, config),
+        ("human", "**제목:** {title}\n\n다음 블로그 게시물을 평가해주세요:\n\n{draft_post}")
+    ])
 
-### 7. 이미지 활용법 
-- 글당 최소 3장 이상의 이미지를 사용했는가? 
-- 핵심 키워드를 포함한 그림 파일명을 작성했는가? 
-- ALT 텍스트에 설명을 추가했는가? 
 
-### 8. CTA(Call To Action) 삽입 
-- 공감/구독/이웃추가를 유도하는 문구가 있는가? 
-- 댓글을 유도하는 질문이 포함되어 있는가? 
+def _blog_index_result(content: str, local_scores: dict, run: RunContext) -> dict:
+    llm_scores = {n: v for n, v in parse_llm_scores(content).items() if n in LLM_CRITERIA}
+    total_score, blog_details = format_details({**llm_scores, **local_scores})
 
-### 9. 메타데이터와 태그 최적화 
-- 글의 카테고리, 해시태그가 키워드와 일치하는가? 
-- 불필요한 태그 남발은 피하고 핵심 키워드 3~5개만 집중하여 태그를 설정했는가?
+    run.success(f"✅ 블로그 지수 계산 완료. {total_score}점")
+    return {
+        "blog_index": total_score,
+        "blog_details": blog_details
+    }
 
-### 10. 콘텐츠 차별화 요소 추가 
-- 직접 촬영한 사진, 인포그래픽, 표, 차트를 활용했는가? 
-- 단순 요약형이 아닌 경험+인사이트를 담아 독창성을 강화했는가? 
 
-## 출력 형식
-다음 형식으로 출력해주세요:
+def _blog_index_plan(state: AgentState, config: RunnableConfig):
+    """(RunContext, 평가 체인, 체인 입력, 로컬 점수), LLM이 없으면 체인이 None
 
-평가 기준 1: [점수]/10 - [평가 이유]
-평가 기준 2: [점수]/10 - [평가 이유]
-...
-평가 기준 10: [점수]/10 - [평가 이유]
-총점: [총점]/100
+    구조화, 링크, 이미지, CTA, 태그 항목은 blog_index.prescore로 마크다운에서 직접 측정하고,
+    나머지 주관적인 항목만 LLM에 평가를 요청합니다.
+    """
+    run = get_run_context(config)
+    run.write("▶️ 블로그 지수 에이전트")
+    run.success("✅ 블로그 지수 계산 중...")
 
-위의 평가 기준에 따라 주어진 블로그 게시물을 분석하고, 각 항목별로 상세한 평가를 제공해주세요."""),
-        ("human", "다음 블로그 게시물의 블로그 지수를 분석해주세요:\n\n{draft_post}")
-    ])
+    draft_post = state["draft_post"]
+    local_scores = prescore(draft_post, state.get("seo_tags", []), _planned_images(state, config))
 
-    llm = get_llm()
+    llm = get_llm(config=config, node="blog_indexer")
     if llm is None:
-        return {"blog_index": 0, "blog_details": "LLM 초기화 실패"}
+        return run, None, None, local_scores
+    inputs = {"title": state.get("final_title", ""), "draft_post": draft_post}
+    return run, _blog_index_prompt(config) | llm, inputs, local_scores
+
+
+def _blog_index_failed(error: Exception, run: RunContext) -> dict:
+    run.error(f"❌ 블로그 지수 계산에 실패했습니다: {error}")
+    return {"blog_index": 0, "blog_details": f"계산 실패: {str(error)}"}
 
+
+def blog_indexer_node(state: AgentState, config: RunnableConfig):
+    """블로그 지수를 계산하는 에이전트 (_blog_index_plan 참고)"""
+    run, chain, inputs, local_scores = _blog_index_plan(state, config)
+    if chain is None:
+        return {"blog_index": 0, "blog_details": "LLM 초기화 실패"}
     try:
-        chain = prompt | llm
-        response = chain.invoke({"draft_post": draft_post})
-        
-        content = response.content
-        
-        # 총점 추출
-        total_score = 0
-        if "총점:" in content:
-            total_part = content.split("총점:")[1].split("/")[0].strip()
-            try:
-                total_score = int(total_part)
-            except:
-                total_score = 0
-
-        st.success(f"✅ 블로그 지수 계산 완료. {total_score}점")
-        return {
-            "blog_index": total_score,
-            "blog_details": content
-        }
+        return _blog_index_result(chain.invoke(inputs).content, local_scores, run)
+    except Exception as e:
+        return _blog_index_failed(e, run)
 
+
+async def ablog_indexer_node(state: AgentState, config: RunnableConfig):
+    """blog_indexer_node의 비동기 버전"""
+    run, chain, inputs, local_scores = _blog_index_plan(state, config)
+    if chain is None:
+        return {"blog_index": 0, "blog_details": "LLM 초기화 실패"}
+    try:
+        return _blog_index_result((await chain.ainvoke(inputs)).content, local_scores, run)
     except Exception as e:
-        st.error(f"❌ 블로그 지수 계산에 실패했습니다: {e}")
-        return {"blog_index": 0, "blog_details": f"계산 실패: {str(e)}"}
+        return _blog_index_failed(e, run)
 
 
-def art_director_node(state: AgentState):
-    st.write("▶️ 아트 디렉터 에이전트: 이미지 생성 중...")
-    title = state['final_title']
-    subtitles = state.get('naver_seo_subtitles', [])
-    image_model_provider = st.session_state.get("image_model_provider", "DALL·E 3")
+def _generate_image(image_model_provider: str, client, prompt: str, config: RunnableConfig = None) -> str:
+    """선택된 이미지 모델로 이미지 1장을 생성하고 URL을 반환"""
+    with trace_span("image", "image", provider=image_model_provider):
+        if image_model_provider == "DALL·E 3":
+            res = get_limiter("DALL·E 3", "dall-e-3").call(
+                client.images.generate, model="dall-e-3", prompt=prompt, size="1024x1024", quality="standard", n=1
+            )
+            return res.data[0].url
+        elif image_model_provider == "Pollinations.ai":
+            # Pollinations.ai 사용
+            return generate_image_with_gemini(prompt, "", config)
+        return ""
+
+
+async def _agenerate_image(image_model_provider: str, client, prompt: str, config: RunnableConfig = None) -> str:
+    """_generate_image의 비동기 버전 (client는 AsyncOpenAI)"""
+    with trace_span("image", "image", provider=image_model_provider):
+        if image_model_provider == "DALL·E 3":
+            res = await get_limiter("DALL·E 3", "dall-e-3").acall(
+                client.images.generate, model="dall-e-3", prompt=prompt, size="1024x1024", quality="standard", n=1
+            )
+            return res.data[0].url
+        elif image_model_provider == "Pollinations.ai":
+            return await agenerate_image_with_gemini(prompt, "", config)
+        return ""
+
+
+class ImagePromptBatch(BaseModel):
+    """이미지 키워드와 모든 이미지 프롬프트를 한 번에 받기 위한 구조화 출력 스키마"""
+    image_keywords: List[str] = Field(description="블로그 제목의 핵심 키워드 2개 (한국어)")
+    main_image_prompt: str = Field(description="블로그 제목에 어울리는 이미지 생성용 영어 프롬프트 한 문장")
+    subtitle_image_prompts: List[str] = Field(description="각 부제목에 어울리는 이미지 생성용 영어 프롬프트 한 문장씩, 부제목 순서대로")
+
+
+IMAGE_BATCH_PROMPT = ChatPromptTemplate.from_template(
+    "다음 블로그 제목과 부제목을 보고 아래 항목을 생성해주세요.\n"
+    "- image_keywords: 제목의 핵심 키워드 2개\n"
+    "- main_image_prompt: 제목에 어울리는 이미지 생성용 영어 프롬프트 한 문장\n"
+    "- subtitle_image_prompts: 각 부제목에 어울리는 이미지 생성용 영어 프롬프트 한 문장씩 (부제목 순서대로 {count}개)\n\n"
+    "**제목:** {title}\n\n"
+    "**부제목:**\n{subtitles}"
+)
+
+
+def _image_batch_inputs(title: str, subtitles: List[str]) -> dict:
+    return {
+        "title": title,
+        "count": len(subtitles),
+        "subtitles": "\n".join(f"{i}. {sub}" for i, sub in enumerate(subtitles, 1)),
+    }
+
+
+def _checked_image_batch(batch, subtitles: List[str], run: RunContext):
+    if (batch is None or not batch.main_image_prompt.strip() or not batch.image_keywords
+            or len(batch.subtitle_image_prompts) != len(subtitles)):
+        run.warning("⚠️ 이미지 프롬프트 일괄 생성 결과가 올바르지 않아 항목별로 생성합니다.")
+        return None
+    return batch
+
+
+def _batched_image_prompts(llm, title: str, subtitles: List[str], run: RunContext):
+    """키워드, 메인 이미지 프롬프트, 부제목 이미지 프롬프트를 한 번의 LLM 호출로 생성
+
+    구조화 출력의 파싱에 실패하거나 부제목 수와 프롬프트 수가 맞지 않으면 None을 반환하며,
+    이 경우 호출부에서 항목별 호출로 대체합니다.
+    """
+    chain = IMAGE_BATCH_PROMPT | llm.with_structured_output(ImagePromptBatch)
+    try:
+        batch = chain.invoke(_image_batch_inputs(title, subtitles))
+    except (OutputParserException, ValidationError) as e:
+        run.warning(f"⚠️ 이미지 프롬프트 일괄 생성 결과를 해석하지 못해 항목별로 생성합니다: {e}")
+        return None
+    return _checked_image_batch(batch, subtitles, run)
+
+
+async def _abatched_image_prompts(llm, title: str, subtitles: List[str], run: RunContext):
+    """_batched_image_prompts의 비동기 버전"""
+    chain = IMAGE_BATCH_PROMPT | llm.with_structured_output(ImagePromptBatch)
+    try:
+        batch = await chain.ainvoke(_image_batch_inputs(title, subtitles))
+    except (OutputParserException, ValidationError) as e:
+        run.warning(f"⚠️ 이미지 프롬프트 일괄 생성 결과를 해석하지 못해 항목별로 생성합니다: {e}")
+        return None
+    return _checked_image_batch(batch, subtitles, run)
+
+
+def _image_job(index: int, prompt_source, image_model_provider: str, client, prompts: dict, config: RunnableConfig = None):
+    """이미지 프롬프트 작성과 이미지 생성을 하나의 작업으로 실행
+
+    prompt_source가 문자열이면 그대로 프롬프트로 사용하고,
+    (체인, 입력) 튜플이면 체인을 호출해 프롬프트를 작성합니다.
+    작성된 프롬프트는 이미지 생성 전에 prompts[index]에 기록되어,
+    이미지 생성이 실패하더라도 프롬프트는 남습니다.
+
+    Returns:
+        (프롬프트, 이미지 URL, 작업 소요 시간(초))
+    """
+    started = time.perf_counter()
+    if isinstance(prompt_source, str):
+        prompt = prompt_source
+    else:
+        prompt_chain, inputs = prompt_source
+        prompt = prompt_chain.invoke(inputs).content
+    prompts[index] = prompt
+    url = _generate_image(image_model_provider, client, prompt, config)
+    return prompt, url, time.perf_counter() - started
+
+
+async def _aimage_job(index: int, prompt_source, image_model_provider: str, client, prompts: dict, limit: asyncio.Semaphore, config: RunnableConfig = None):
+    """_image_job의 비동기 버전 (limit으로 동시에 실행하는 이미지 작업 수를 제한)"""
+    async with limit:
+        started = time.perf_counter()
+        if isinstance(prompt_source, str):
+            prompt = prompt_source
+        else:
+            prompt_chain, inputs = prompt_source
+            prompt = (await prompt_chain.ainvoke(inputs)).content
+        prompts[index] = prompt
+        url = await _agenerate_image(image_model_provider, client, prompt, config)
+        return prompt, url, time.perf_counter() - started
+
+
+def _no_images(prompts: dict = None, image_keywords: List[str] = None) -> dict:
+    return {
+        "image_prompt": (prompts or {}).get(0, ""),
+        "image_url": "",
+        "subtitle_image_prompts": [],
+        "subtitle_image_urls": [],
+        "image_keywords": image_keywords or []
+    }
+
+
+def _image_source(state: AgentState, run: RunContext) -> dict:
+    """이미지 생성에 쓰이는 입력 (메인 이미지는 제목, 부제목 이미지는 부제목 3개에서 만들어짐)"""
+    return {
+        "title": state.get("final_title", ""),
+        "subtitles": state.get("naver_seo_subtitles", [])[:3],
+        "provider": run.get("image_model_provider", "DALL·E 3"),
+    }
+
+
+def _reuse_images(state: AgentState, run: RunContext) -> bool:
+    """제목과 부제목을 유지한 재작성이면 기존 이미지와 프롬프트를 그대로 사용"""
+    if not state.get("image_url") or state.get("image_source") != _image_source(state, run):
+        return False
+    run.success("✅ 아트 디렉터 에이전트: 제목과 부제목이 그대로여서 기존 이미지를 재사용합니다.")
+    return True
+
+
+def _art_director_plan(state: AgentState, config: RunnableConfig, run: RunContext):
+    """아트 디렉터 실행 설정: (제목, 부제목, 이미지 모델, 동시 실행 수, 일괄 생성 여부, OpenAI API 키, 프롬프트 LLM)
+
+    이미지를 생성할 수 없으면 None을 반환합니다.
+    """
+    run.write("▶️ 아트 디렉터 에이전트: 이미지 생성 중...")
+    image_model_provider = run.get("image_model_provider", "DALL·E 3")
+    openai_api_key = run.get("openai_api_key")
 
     # 모델별 API 키 확인
-    if image_model_provider == "DALL·E 3" and not st.session_state.get("openai_api_key"):
-        st.warning("⚠️ DALL·E 3 이미지 생성을 위해서는 OpenAI API Key가 필요합니다.")
-        return {"image_prompt": "", "image_url": "", "subtitle_image_prompts": [], "subtitle_image_urls": [], "image_keywords": []}
+    if image_model_provider == "DALL·E 3" and not openai_api_key:
+        run.warning("⚠️ DALL·E 3 이미지 생성을 위해서는 OpenAI API Key가 필요합니다.")
+        return None
     # Pollinations.ai는 API 키가 필요 없음
 
-    prompt_llm = get_llm()
+    prompt_llm = get_llm(config=config, node="art_director")
     if prompt_llm is None:
-        return {"image_prompt": "", "image_url": "", "subtitle_image_prompts": [], "subtitle_image_urls": [], "image_keywords": []}
+        return None
+
+    return (
+        state['final_title'],
+        state.get('naver_seo_subtitles', [])[:3],
+        image_model_provider,
+        int(run.get("image_concurrency", IMAGE_CONCURRENCY)),
+        run.get("batch_image_prompts", BATCH_IMAGE_PROMPTS),
+        openai_api_key,
+        prompt_llm,
+    )
+
+
+def _image_sources(batch, prompt_llm, title: str, subtitles: List[str]):
+    """(이미지 키워드, 이미지별 프롬프트 소스, 키워드 체인)
+
+    0번은 메인 이미지, 1번부터는 부제목 이미지입니다. 일괄 생성 결과가 없으면
+    항목별 프롬프트 체인과 키워드 체인을 만들며, 이때 키워드는 키워드 체인 실행 후 정해집니다.
+    """
+    if batch is not None:
+        return [k.strip() for k in batch.image_keywords[:2]], [batch.main_image_prompt] + batch.subtitle_image_prompts, None
 
     keyword_t = ChatPromptTemplate.from_template(
         "다음 블로그 제목에서 핵심 키워드 2개를 추출해주세요. 언더스코어(_)로 연결해서 출력하세요.\n예: '맛집_후기' 또는 '여행_팁'\n제목: {title}"
     )
-    kw_chain = keyword_t | prompt_llm
-    kw_resp = kw_chain.invoke({"title": title}).content.strip()
-    image_keywords = [k.strip() for k in kw_resp.split("_")[:2]]
+    main_t = ChatPromptTemplate.from_template("블로그 제목 '{title}'에 어울리는 이미지 생성용 영어 프롬프트를 한 문장으로 만들어줘.")
+    sub_t = ChatPromptTemplate.from_template("블로그 부제목 '{subtitle}'에 어울리는 이미지 생성용 영어 프롬프트를 한 문장으로 만들어줘.")
+    sources = [(main_t | prompt_llm, {"title": title})] + [(sub_t | prompt_llm, {"subtitle": sub}) for sub in subtitles]
+    return [], sources, keyword_t | prompt_llm
 
-    try:
-        st.write("  📸 메인 이미지 생성 중...")
-        main_t = ChatPromptTemplate.from_template("블로그 제목 '{title}'에 어울리는 이미지 생성용 영어 프롬프트를 한 문장으로 만들어줘.")
-        main_chain = main_t | prompt_llm
-        main_prompt = main_chain.invoke({"title": title}).content
 
-        # 이미지 생성 (모델별 분기)
-        main_url = ""
-        if image_model_provider == "DALL·E 3":
-            client = OpenAI(api_key=st.session_state.get("openai_api_key"))
-            main_res = client.images.generate(model="dall-e-3", prompt=main_prompt, size="1024x1024", quality="standard", n=1)
-            main_url = main_res.data[0].url
-        elif image_model_provider == "Pollinations.ai":
-            # Pollinations.ai 사용
-            main_url = generate_image_with_gemini(main_prompt, "")
-
-        st.write("  🎨 부제목 기반 이미지 3개 생성 중...")
-        sub_prompts, sub_urls = [], []
-        for i, sub in enumerate(subtitles[:3], 1):
-            st.write(f"    • 이미지 {i+1} 생성 중...")
-            sub_t = ChatPromptTemplate.from_template("블로그 부제목 '{subtitle}'에 어울리는 이미지 생성용 영어 프롬프트를 한 문장으로 만들어줘.")
-            sub_chain = sub_t | prompt_llm
-            sub_prompt = sub_chain.invoke({"subtitle": sub}).content
-            sub_prompts.append(sub_prompt)
-            
-            # 부제목 이미지 생성 (모델별 분기)
-            sub_url = ""
-            if image_model_provider == "DALL·E 3":
-                sub_res = client.images.generate(model="dall-e-3", prompt=sub_prompt, size="1024x1024", quality="standard", n=1)
-                sub_url = sub_res.data[0].url
-            elif image_model_provider == "Pollinations.ai":
-                # Pollinations.ai 사용
-                sub_url = generate_image_with_gemini(sub_prompt, "")
-
-            sub_urls.append(sub_url)
-
-        generated_count = sum(1 for url in [main_url] + sub_urls if url)
-        st.success(f"✅ 아트 디렉터 에이전트: {generated_count}개 이미지 생성 완료!")
-        return {
-            "image_prompt": main_prompt,
-            "image_url": main_url,
-            "subtitle_image_prompts": sub_prompts,
-            "subtitle_image_urls": sub_urls,
-            "image_keywords": image_keywords
-        }
+def _parse_image_keywords(content: str) -> List[str]:
+    return [k.strip() for k in content.strip().split("_")[:2]]
+
 
+def _art_director_result(results: list, elapsed: float, image_keywords: List[str], source: dict, run: RunContext) -> dict:
+    job_total = sum(duration for _, _, duration in results)
+    main_prompt, main_url, _ = results[0]
+    sub_prompts = [prompt for prompt, _, _ in results[1:]]
+    sub_urls = [url for _, url, _ in results[1:]]
+
+    generated_count = sum(1 for url in [main_url] + sub_urls if url)
+    run.info(f"⏱️ 이미지 단계 소요 시간: {elapsed:.1f}초 (개별 작업 합계 {job_total:.1f}초)")
+    run.success(f"✅ 아트 디렉터 에이전트: {generated_count}개 이미지 생성 완료!")
+    return {
+        "image_prompt": main_prompt,
+        "image_url": main_url,
+        "subtitle_image_prompts": sub_prompts,
+        "subtitle_image_urls": sub_urls,
+        "image_keywords": image_keywords,
+        "image_source": source
+    }
+
+
+def art_director_node(state: AgentState, config: RunnableConfig):
+    run = get_run_context(config)
+    if _reuse_images(state, run):
+        return {}
+    plan = _art_director_plan(state, config, run)
+    if plan is None:
+        return _no_images()
+    title, subtitles, image_model_provider, concurrency, batch_mode, openai_api_key, prompt_llm = plan
+
+    # 429 재시도는 ratelimit의 공유 한도에서 처리
+    client = OpenAI(api_key=openai_api_key, max_retries=0) if image_model_provider == "DALL·E 3" else None
+
+    batch = _batched_image_prompts(prompt_llm, title, subtitles, run) if batch_mode else None
+    image_keywords, sources, kw_chain = _image_sources(batch, prompt_llm, title, subtitles)
+    prompts = {}
+
+    started = time.perf_counter()
+    with make_executor(concurrency) as pool:
+        # 항목별 모드에서는 키워드 추출도 이미지 작업과 함께 실행
+        kw_future = pool.submit(kw_chain.invoke, {"title": title}) if kw_chain is not None else None
+        run.write(f"  📸 메인 이미지와 부제목 기반 이미지 {len(sources) - 1}개 생성 중... (동시 실행 {max(1, concurrency)}개)")
+        futures = [
+            pool.submit(_image_job, i, source, image_model_provider, client, prompts, config)
+            for i, source in enumerate(sources)
+        ]
+
+        if kw_future is not None:
+            image_keywords = _parse_image_keywords(kw_future.result().content)
+
+        try:
+            results = [f.result() for f in futures]
+        except Exception as e:
+            run.error(f"이미지 생성 실패: {e}")
+            return _no_images(prompts, image_keywords)
+
+    return _art_director_result(results, time.perf_counter() - started, image_keywords, _image_source(state, run), run)
+
+
+async def aart_director_node(state: AgentState, config: RunnableConfig):
+    """art_director_node의 비동기 버전 (AsyncOpenAI / httpx로 이미지 작업을 동시에 실행)"""
+    run = get_run_context(config)
+    if _reuse_images(state, run):
+        return {}
+    plan = _art_director_plan(state, config, run)
+    if plan is None:
+        return _no_images()
+    title, subtitles, image_model_provider, concurrency, batch_mode, openai_api_key, prompt_llm = plan
+
+    client = AsyncOpenAI(api_key=openai_api_key, max_retries=0) if image_model_provider == "DALL·E 3" else None
+
+    batch = await _abatched_image_prompts(prompt_llm, title, subtitles, run) if batch_mode else None
+    image_keywords, sources, kw_chain = _image_sources(batch, prompt_llm, title, subtitles)
+    prompts = {}
+    limit = asyncio.Semaphore(max(1, concurrency))
+
+    started = time.perf_counter()
+    run.write(f"  📸 메인 이미지와 부제목 기반 이미지 {len(sources) - 1}개 생성 중... (동시 실행 {max(1, concurrency)}개)")
+    jobs = asyncio.gather(*(
+        _aimage_job(i, source, image_model_provider, client, prompts, limit, config)
+        for i, source in enumerate(sources)
+    ))
+    try:
+        if kw_chain is not None:
+            image_keywords = _parse_image_keywords((await kw_chain.ainvoke({"title": title})).content)
+        results = await jobs
     except Exception as e:
-        st.error(f"이미지 생성 실패: {e}")
+        jobs.cancel()
+        run.error(f"이미지 생성 실패: {e}")
+        return _no_images(prompts, image_keywords)
+    finally:
+        if client is not None:
+            await client.close()
+
+    return _art_director_result(results, time.perf_counter() - started, image_keywords, _image_source(state, run), run)
+
+
+def _section_label(sections: list, index: int) -> str:
+    heading = section_heading(sections[index])
+    if not heading:
+        return "서론"
+    number = sum(1 for section in sections[:index + 1] if section_heading(section))
+    return f"{number}. {heading}"
+
+
+def _revise_sections(llm, sections: list, targets: list, user_feedback: str, title: str, seo_analysis: str, stream: bool, config: RunnableConfig = None) -> str:
+    """수정 요청이 가리키는 섹션만 다시 작성하여 원래 자리에 끼워 넣음"""
+    run = get_run_context(config)
+    section_prompt = ChatPromptTemplate.from_messages([
+        system_prompt(SECTION_REVISION_SYSTEM_PROMPT, config),
+        ("human",
+         """**블로그 제목:** {title}
+
+         **글 목차:**
+         {outline}
+
+         **SEO 키워드:**
+         {keywords}
+
+         **수정할 섹션:**
+         {section}
+
+         **사용자 수정 요청:**
+         {user_feedback}""")
+    ])
+    chain = section_prompt | llm
+    keywords = seo_keywords(seo_analysis)
+
+    def _inputs(index):
+        outline = "\n".join(
+            _section_label(sections, i) + ("  ← 수정 대상" if i == index else "")
+            for i in range(len(sections))
+        )
         return {
-            "image_prompt": locals().get("main_prompt", ""),
-            "image_url": "",
-            "subtitle_image_prompts": [],
-            "subtitle_image_urls": [],
-            "image_keywords": image_keywords
+            "title": title,
+            "outline": outline,
+            "keywords": keywords,
+            "section": sections[index],
+            "user_feedback": user_feedback,
         }
 
+    run.caption("✏️ 수정 대상: " + ", ".join(_section_label(sections, i) for i in targets))
+    if stream:
+        revised = {i: run.stream(chain, _inputs(i)) for i in targets}
+    else:
+        # 섹션끼리는 서로 독립적이므로 동시에 수정
+        with make_executor(len(targets)) as pool:
+            futures = {i: pool.submit(chain.invoke, _inputs(i)) for i in targets}
+            revised = {i: future.result().content for i, future in futures.items()}
+
+    return "".join(
+        splice_section(section, revised[i]) if i in revised else section
+        for i, section in enumerate(sections)
+    )
+
 
-def revise_with_feedback(current_post: str, user_feedback: str, title: str, seo_analysis: str) -> str:
+def revise_with_feedback(current_post: str, user_feedback: str, title: str, seo_analysis: str, stream: bool = False, scoped: bool = True, config: RunnableConfig = None) -> str:
     """사용자 피드백을 바탕으로 블로그 포스트를 수정하는 함수
 
+    요청이 특정 섹션("2번 섹션", 서론/결론, 소제목 문구 등)을 가리키면 그 섹션만 다시 작성하여 끼워 넣고,
+    글 전체에 대한 요청이거나 대상을 특정할 수 없으면 전체 포스트를 수정합니다.
+
     Args:
         current_post: 현재 블로그 포스트 내용
         user_feedback: 사용자의 수정 요청/피드백
         title: 블로그 제목
         seo_analysis: SEO 분석 내용
+        stream: True이면 수정된 글을 진행 상황 출력 대상에 토큰 단위로 표시
+        scoped: False이면 섹션 단위 수정 없이 항상 전체 포스트를 수정
+        config: 실행 설정과 진행 상황 출력 대상 (run_config 참고)
 
     Returns:
         수정된 블로그 포스트
     """
+    run = get_run_context(config)
     revision_prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """당신은 전문 블로그 작가입니다. 사용자가 작성된 블로그 포스트에 대해 수정 요청을 했습니다.
-
-         사용자의 피드백을 정확히 반영하여 블로그 포스트를 수정해주세요. 다음 사항을 유지하세요:
-         - 전체적인 블로그 구조와 스타일 유지
-         - 이모지와 친근한 어조 유지
-         - 마크다운 형식 유지
-         - SEO 최적화 유지
-
-         사용자가 요청한 부분만 수정하고, 나머지는 가능한 한 원본을 유지하세요.
-         수정된 전체 블로그 포스트를 출력해주세요."""),
+        system_prompt(REVISION_SYSTEM_PROMPT, config),
         ("human",
          """**현재 블로그 제목:** {title}
 
@@ -433,21 +961,32 @@ def revise_with_feedback(current_post: str, user_feedback: str, title: str, seo_
          위 수정 요청을 반영하여 블로그 포스트를 수정해주세요.""")
     ])
 
-    llm = get_llm()
+    llm = get_llm(config=config, node="revise")
     if llm is None:
         return current_post  # LLM 오류 시 원본 반환
 
+    sections = split_sections(current_post)
+    targets = select_sections(sections, user_feedback) if scoped else None
+    if targets:
+        try:
+            return _revise_sections(llm, sections, targets, user_feedback, title, seo_analysis, stream, config)
+        except Exception as e:
+            run.error(f"수정 중 오류 발생: {e}")
+            return current_post
+
     chain = revision_prompt | llm
+    inputs = {
+        "title": title,
+        "seo_analysis": seo_analysis,
+        "current_post": current_post,
+        "user_feedback": user_feedback
+    }
     try:
-        revised_post = chain.invoke({
-            "title": title,
-            "seo_analysis": seo_analysis,
-            "current_post": current_post,
-            "user_feedback": user_feedback
-        }).content
-        return revised_post
+        if stream:
+            return run.stream(chain, inputs)
+        return chain.invoke(inputs).content
     except Exception as e:
-        st.error(f"수정 중 오류 발생: {e}")
+        run.error(f"수정 중 오류 발생: {e}")
         return current_post
 
 
@@ -474,13 +1013,97 @@ def should_continue_from_indexer(state: AgentState):
     return "continue_to_art"
 
 
-def build_graph():
+def get_checkpointer(path: str = CHECKPOINT_DB) -> SqliteSaver:
+    """실행 ID(thread_id)별로 그래프 상태를 저장하는 SQLite 체크포인터 생성"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Streamlit 세션마다 다른 스레드에서 접근하므로 스레드 검사를 끔 (SqliteSaver가 내부적으로 잠금 처리)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    return SqliteSaver(conn)
+
+
+@asynccontextmanager
+async def get_async_checkpointer(path: str = CHECKPOINT_DB):
+    """비동기 실행(ainvoke/astream)용 SQLite 체크포인터 (get_checkpointer와 같은 파일 형식)
+
+    연결이 이벤트 루프에 묶이므로 실행할 이벤트 루프 안에서 async with로 엽니다.
+
+        async with get_async_checkpointer() as checkpointer:
+            app = build_graph(checkpointer)
+            await app.ainvoke({"url": url}, run_config(run_id, settings))
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        yield saver
+
+
+def run_config(run_id: str, settings: dict = None, sink: ProgressSink = None) -> dict:
+    """그래프 실행 설정 생성
+
+    Args:
+        run_id: 체크포인트를 구분하는 실행 ID
+        settings: 모델 제공자, API 키, temperature 등 실행별 설정
+        sink: 진행 상황 출력 대상 (없으면 Streamlit 스크립트 안에서는 StreamlitSink, 밖에서는 LoggingSink)
+
+    실행별 설정과 출력 대상은 configurable["run_context"]의 RunContext로 전달합니다.
+    체크포인터는 configurable의 문자열/숫자 값을 체크포인트 메타데이터로 저장하므로,
+    API 키가 디스크에 기록되지 않도록 최상위 값이 아닌 객체 안에 넣습니다.
+    """
+    run = RunContext(dict(settings or {}), sink or default_sink())
+    return {"configurable": {"thread_id": run_id, "run_context": run}}
+
+
+def resume_rewrite(app, run_id: str, rewrite_reason: str, refresh_title: bool = False, settings: dict = None, sink: ProgressSink = None):
+    """저장된 체크포인트에서 writer 노드부터 재작성을 이어서 실행
+
+    리서처와 SEO 전문가 노드의 결과는 체크포인트에 이미 저장되어 있으므로,
+    SEO 전문가 노드가 방금 끝난 것처럼 상태를 갱신한 뒤 다음 노드(writer)부터 실행합니다.
+
+    Args:
+        app: 체크포인터와 함께 컴파일된 그래프
+        run_id: 최초 실행 시 사용한 실행 ID
+        rewrite_reason: 재작성 시 반영할 개선사항
+        refresh_title: 제목과 부제목도 새로 생성할지 여부
+        settings: 실행별 설정 (run_config 참고)
+        sink: 진행 상황 출력 대상 (run_config 참고)
+
+    Returns:
+        재작성이 반영된 최종 상태
+    """
+    config = run_config(run_id, settings, sink)
+    app.update_state(
+        config,
+        {"needs_rewrite": True, "rewrite_reason": rewrite_reason, "refresh_title_on_rewrite": refresh_title},
+        as_node="seo_specialist",
+    )
+    return app.invoke(None, config)
+
+
+async def aresume_rewrite(app, run_id: str, rewrite_reason: str, refresh_title: bool = False, settings: dict = None, sink: ProgressSink = None):
+    """resume_rewrite의 비동기 버전 (get_async_checkpointer로 컴파일한 그래프에 사용)"""
+    config = run_config(run_id, settings, sink)
+    await app.aupdate_state(
+        config,
+        {"needs_rewrite": True, "rewrite_reason": rewrite_reason, "refresh_title_on_rewrite": refresh_title},
+        as_node="seo_specialist",
+    )
+    return await app.ainvoke(None, config)
+
+
+def _node(name: str, fn, afn):
+    """invoke에서는 fn, ainvoke/astream에서는 afn을 실행하는 노드 (노드마다 실행 시간 스팬 기록, tracing.py)"""
+    return RunnableLambda(traced_node(name, fn), afunc=atraced_node(name, afn), name=name)
+
+
+def build_graph(checkpointer=None):
     workflow = StateGraph(AgentState)
-    workflow.add_node("researcher", researcher_node)
-    workflow.add_node("seo_specialist", seo_specialist_node)
-    workflow.add_node("writer", writer_node)
-    workflow.add_node("art_director", art_director_node)
-    workflow.add_node("blog_indexer", blog_indexer_node)
+    # 같은 그래프를 invoke(스레드)와 ainvoke(이벤트 루프) 모두로 실행할 수 있도록 노드마다 동기/비동기 함수를 함께 등록
+    workflow.add_node("researcher", _node("researcher", researcher_node, aresearcher_node))
+    workflow.add_node("seo_specialist", _node("seo_specialist", seo_specialist_node, aseo_specialist_node))
+    workflow.add_node("writer", _node("writer", writer_node, awriter_node))
+    workflow.add_node("art_director", _node("art_director", art_director_node, aart_director_node))
+    workflow.add_node("blog_indexer", _node("blog_indexer", blog_indexer_node, ablog_indexer_node))
     
     workflow.set_entry_point("researcher")
     
@@ -506,4 +1129,4 @@ def build_graph():
     
     workflow.add_edge("art_director", END)
     
-    return workflow.compile()
\ No newline at end of file
+    return workflow.compile(checkpointer=checkpointer)
\ No newline at end of file
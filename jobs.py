@@ -0,0 +1,455 @@
+"""로컬 백그라운드 작업 큐 (SQLite)
+
+블로그 생성과 재작성을 Streamlit 스크립트 스레드 밖의 워커에서 실행합니다.
+작업, 진행 상황 이벤트, 결과는 모두 JOBS_DB에 저장되므로 화면을 새로고침하거나
+위젯을 조작해 스크립트가 다시 실행되어도 진행 중인 작업과 결과가 사라지지 않습니다.
+
+- app.py는 작업 ID를 받아 진행 상황 이벤트를 주기적으로 읽어 표시합니다.
+- JOB_WORKERS개의 워커 스레드가 Streamlit 프로세스 안에서 작업을 처리하며,
+  별도 프로세스로 워커를 더 띄울 수도 있습니다 (python jobs.py --workers 4).
+- 실행 ID는 작업 ID와 같아서, 워커가 중간에 죽은 작업은 다른 워커가 체크포인트부터 이어서 실행합니다.
+  재작성 작업은 원래 실행의 체크포인트(thread_id)를 이어 쓰므로, 같은 실행의 작업은 제출 순서대로 하나씩만 실행합니다.
+- API 키는 디스크에 저장하지 않습니다. 화면에서 받은 키는 제출한 프로세스의 메모리에만 있으므로
+  그런 작업은 제출한 프로세스(owner)의 워커만 가져가며, 그 프로세스가 없어지면 실패로 처리합니다.
+  키 없이 제출한 작업은 어느 워커든 가져가서 환경 변수(.env)의 키로 실행합니다.
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from cache import CACHE_DIR, SqliteStore
+from graph import build_graph, get_checkpointer, resume_rewrite, run_config
+from run_context import ProgressSink
+from tools import ENV_SETTINGS, env_settings
+
+# 작업 큐 SQLite 파일
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(CACHE_DIR, "jobs.sqlite"))
+# Streamlit 프로세스 안에서 실행할 워커 수 (0이면 별도 프로세스 워커만 사용)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# 대기 중인 작업을 확인하는 주기(초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# 이 시간(초) 동안 워커 신호가 없는 실행 중 작업은 워커가 죽은 것으로 보고 다시 대기열에 넣음
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+# 스트리밍 조각을 모아서 기록하는 간격(초)
+JOB_STREAM_FLUSH = float(os.getenv("JOB_STREAM_FLUSH", "0.5"))
+
+# 이 프로세스의 작업 소유자 ID (호스트-PID-임의값, 재시작 후 같은 PID를 받아도 다른 ID)
+PROCESS_OWNER = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+# 소유자 프로세스가 없어져 실행할 수 없는 작업의 오류 메시지
+ORPHANED_ERROR = "작업을 제출한 프로세스가 종료되어 화면에서 입력한 API 키가 없습니다. 작업을 다시 제출해주세요."
+
+logger = logging.getLogger(__name__)
+
+
+def _owner_alive(owner: str) -> bool:
+    """소유자 프로세스가 살아 있는지 (다른 호스트의 프로세스는 확인할 수 없으므로 살아 있다고 봄)"""
+    if owner == PROCESS_OWNER:
+        return True
+    host, pid, _ = owner.rsplit("-", 2)
+    if host != socket.gethostname():
+        return True
+    if int(pid) == os.getpid():
+        # 같은 PID로 다시 시작한 프로세스 (컨테이너의 PID 1 등)
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore(SqliteStore):
+    """작업과 진행 상황 이벤트 저장소
+
+    작업 상태: queued → running → done / failed
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            settings TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            worker TEXT,
+            owner TEXT,
+            thread_id TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            heartbeat_at REAL,
+            finished_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+        CREATE TABLE IF NOT EXISTS job_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            ts REAL NOT NULL,
+            level TEXT NOT NULL,
+            message TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq);
+    """
+
+    def __init__(self, path: str = None):
+        super().__init__(path or JOBS_DB)
+        with self._lock, self._conn:
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                # owner 열이 없던 이전 버전의 작업 DB
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            if "thread_id" not in columns:
+                # thread_id 열이 없던 이전 버전의 작업 DB: 재작성은 원래 실행 ID, 생성은 작업 ID
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN thread_id TEXT")
+                self._conn.execute("UPDATE jobs SET thread_id = COALESCE(json_extract(payload, '$.run_id'), id)")
+            # 이전 버전 DB에는 위에서 열을 추가한 뒤에 만들 수 있으므로 schema가 아닌 여기서 생성
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_thread ON jobs (thread_id, status)")
+
+    def submit(self, kind: str, payload: dict, settings: dict = None, owner: str = None, job_id: str = None) -> str:
+        """작업을 대기열에 넣고 작업 ID를 반환 (API 키 등 ENV_SETTINGS는 저장하지 않음)
+
+        owner를 지정하면 그 프로세스의 워커만 작업을 가져갑니다 (claim 참고).
+        payload에 run_id가 있으면 그 실행의 체크포인트를 이어 쓰는 작업으로 기록합니다.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        public = {k: v for k, v in (settings or {}).items() if k not in ENV_SETTINGS}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, settings, owner, thread_id, created_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (
+                    job_id, kind, json.dumps(payload, ensure_ascii=False), json.dumps(public, ensure_ascii=False),
+                    owner, payload.get("run_id") or job_id, time.time(),
+                ),
+            )
+        return job_id
+
+    def claim(self, worker: str, owner: str = PROCESS_OWNER):
+        """가장 오래 기다린 작업 하나를 실행 중으로 바꾸고 반환 (없으면 None)
+
+        소유자가 없는 작업과 owner 프로세스가 제출한 작업만 가져갑니다.
+        같은 실행(thread_id)의 작업이 실행 중이거나 먼저 대기 중이면 건너뛰어, 두 워커가 한 체크포인트를 동시에 쓰지 않습니다.
+        한 문장의 UPDATE ... RETURNING으로 처리하므로 여러 프로세스의 워커가 같은 작업을 가져가지 않습니다.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                """
+                UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs AS j
+                    WHERE status = 'queued' AND (owner IS NULL OR owner = ?)
+                      AND NOT EXISTS (
+                        SELECT 1 FROM jobs AS busy
+                        WHERE busy.thread_id = j.thread_id AND busy.id != j.id
+                          AND (busy.status = 'running' OR (busy.status = 'queued' AND busy.created_at < j.created_at))
+                      )
+                    ORDER BY created_at LIMIT 1
+                )
+                  AND status = 'queued'
+                RETURNING *
+                """,
+                (worker, now, now, owner),
+            ).fetchone()
+        return self._decode(row)
+
+    def heartbeat(self, job_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id))
+
+    def finish(self, job_id: str, result: dict):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?", (error, time.time(), job_id)
+            )
+
+    def requeue_stale(self, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+        """워커 신호가 끊긴 실행 중 작업을 다시 대기열에 넣고 그 수를 반환
+
+        소유자가 있는 작업은 API 키가 그 워커와 함께 사라졌으므로 다시 넣지 않고 실패로 처리합니다.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE status = 'running' AND heartbeat_at < ? AND owner IS NOT NULL",
+                (ORPHANED_ERROR, now, now - stale_seconds),
+            )
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (now - stale_seconds,),
+            )
+        return cursor.rowcount
+
+    def fail_orphaned(self) -> int:
+        """소유자 프로세스가 종료되어 아무도 가져갈 수 없는 대기 작업을 실패로 처리하고 그 수를 반환"""
+        with self._lock:
+            owners = [row["owner"] for row in self._conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = 'queued' AND owner IS NOT NULL"
+            )]
+        dead = [owner for owner in owners if not _owner_alive(owner)]
+        if not dead:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                f"WHERE status = 'queued' AND owner IN ({', '.join('?' * len(dead))})",
+                (ORPHANED_ERROR, time.time(), *dead),
+            )
+        return cursor.rowcount
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row)
+
+    def add_event(self, job_id: str, level: str, message: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO job_events (job_id, ts, level, message) VALUES (?, ?, ?, ?)",
+                (job_id, time.time(), level, message),
+            )
+
+    def events(self, job_id: str, after: int = 0) -> list:
+        """after 이후의 진행 상황 이벤트 (seq 순서)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, ts, level, message FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _decode(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for key in ("payload", "settings", "result"):
+            if job.get(key) is not None:
+                job[key] = json.loads(job[key])
+        return job
+
+
+class JobSink(ProgressSink):
+    """진행 상황을 작업 이벤트로 저장 (스트리밍 조각은 JOB_STREAM_FLUSH초 단위로 모아서 저장)"""
+
+    def __init__(self, store: JobStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+
+    def emit(self, level: str, message: str):
+        self.store.add_event(self.job_id, level, message)
+
+    def stream(self, chunks):
+        buffer, flushed_at = [], time.monotonic()
+        for chunk in chunks:
+            buffer.append(chunk)
+            if time.monotonic() - flushed_at >= JOB_STREAM_FLUSH:
+                self.store.add_event(self.job_id, "stream", "".join(buffer))
+                buffer, flushed_at = [], time.monotonic()
+        if buffer:
+            self.store.add_event(self.job_id, "stream", "".join(buffer))
+
+    async def astream(self, chunks):
+        buffer, flushed_at = [], time.monotonic()
+        async for chunk in chunks:
+            buffer.append(chunk)
+            if time.monotonic() - flushed_at >= JOB_STREAM_FLUSH:
+                self.store.add_event(self.job_id, "stream", "".join(buffer))
+                buffer, flushed_at = [], time.monotonic()
+        if buffer:
+            self.store.add_event(self.job_id, "stream", "".join(buffer))
+
+    def section(self, title: str):
+        self.store.add_event(self.job_id, "section", title)
+        return super().section(title)
+
+
+_secrets = {}  # 작업 ID -> 같은 프로세스 워커에 전달할 API 키
+_secrets_lock = threading.Lock()
+
+
+def _run_settings(job: dict) -> dict:
+    """저장된 설정에 API 키를 합친 실행 설정
+
+    소유자가 있는 작업은 메모리의 API 키로만 실행하며, 키가 없으면 환경 변수의 키로 대신 실행하지 않고 실패합니다.
+    소유자가 없는 작업은 환경 변수의 키를 사용합니다.
+    """
+    with _secrets_lock:
+        secrets = _secrets.get(job["id"])
+    if job.get("owner") and secrets is None:
+        raise RuntimeError(ORPHANED_ERROR)
+    return {**env_settings(), **job["settings"], **(secrets or {})}
+
+
+def _result_state(state: dict) -> dict:
+    # 메시지 객체는 화면에서 사용하지 않으므로 결과에서 제외
+    return {k: v for k, v in state.items() if k != "messages"}
+
+
+def run_job(app, store: JobStore, job: dict) -> dict:
+    """작업 하나를 실행하고 최종 상태를 반환 (이전 워커가 남긴 체크포인트가 있으면 이어서 실행)"""
+    payload, settings = job["payload"], _run_settings(job)
+    sink = JobSink(store, job["id"])
+    run_id = payload.get("run_id") or job["id"]
+    config = run_config(run_id, settings, sink)
+    snapshot = app.get_state(config)
+    if snapshot.next:
+        sink.emit("info", "🔁 중단된 작업을 마지막 단계부터 이어서 실행합니다.")
+        return app.invoke(None, config)
+    if job["kind"] == "generate" and snapshot.values.get("url") == payload["url"]:
+        # 그래프는 끝났지만 결과를 저장하기 전에 워커가 멈춘 경우
+        return snapshot.values
+    if job["kind"] == "rewrite":
+        return resume_rewrite(app, run_id, payload["rewrite_reason"], payload.get("refresh_title", False), settings, sink)
+    return app.invoke({"url": payload["url"]}, config)
+
+
+class WorkerPool:
+    """작업 큐를 처리하는 워커 스레드 묶음"""
+
+    def __init__(self, app, store: JobStore, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.app = app
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        requeued = self.store.requeue_stale()
+        if requeued:
+            logger.info("중단된 작업 %d개를 다시 대기열에 넣었습니다.", requeued)
+        orphaned = self.store.fail_orphaned()
+        if orphaned:
+            logger.warning("제출한 프로세스가 종료된 작업 %d개를 실패로 처리했습니다.", orphaned)
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, args=(f"{prefix}-{i}",), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self, worker: str):
+        while not self._stop.is_set():
+            job = self.store.claim(worker)
+            if job is None:
+                # 다른 워커가 죽어 남은 작업도 가져갈 수 있도록 대기 중에 확인
+                self.store.requeue_stale()
+                self.store.fail_orphaned()
+                self._stop.wait(self.poll_interval)
+                continue
+            self._process(job)
+
+    def _process(self, job: dict):
+        beating = threading.Event()
+
+        def _heartbeat():
+            while not beating.wait(JOB_STALE_SECONDS / 4):
+                self.store.heartbeat(job["id"])
+
+        threading.Thread(target=_heartbeat, name=f"job-heartbeat-{job['id'][:8]}", daemon=True).start()
+        try:
+            state = run_job(self.app, self.store, job)
+            self.store.finish(job["id"], _result_state(state))
+        except Exception as e:
+            logger.exception("작업 %s 실패", job["id"])
+            self.store.add_event(job["id"], "error", f"작업 실패: {e}")
+            self.store.fail(job["id"], f"{type(e).__name__}: {e}")
+        finally:
+            beating.set()
+            with _secrets_lock:
+                _secrets.pop(job["id"], None)
+
+
+_store = None
+_pool = None
+_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """프로세스 전역 작업 저장소 (지연 생성)"""
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
+
+
+def start_workers(app, workers: int = JOB_WORKERS):
+    """프로세스 안의 워커 풀을 한 번만 시작 (workers가 0이면 시작하지 않음)"""
+    global _pool
+    store = get_job_store()
+    with _lock:
+        if _pool is None and workers > 0:
+            _pool = WorkerPool(app, store, workers).start()
+    return _pool
+
+
+def _submit(kind: str, payload: dict, settings: dict) -> str:
+    secrets = {k: v for k, v in (settings or {}).items() if k in ENV_SETTINGS and v}
+    if not secrets:
+        return get_job_store().submit(kind, payload, settings)
+    # 키를 워커보다 먼저 등록해야 같은 프로세스의 워커가 바로 가져가도 키를 찾을 수 있음
+    job_id = uuid.uuid4().hex
+    with _secrets_lock:
+        _secrets[job_id] = secrets
+    try:
+        return get_job_store().submit(kind, payload, settings, owner=PROCESS_OWNER, job_id=job_id)
+    except BaseException:
+        with _secrets_lock:
+            _secrets.pop(job_id, None)
+        raise
+
+
+def submit_generate(url: str, settings: dict = None) -> str:
+    """URL로 블로그 글 생성 작업을 제출하고 작업 ID를 반환 (실행 ID = 작업 ID)"""
+    return _submit("generate", {"url": url}, settings)
+
+
+def submit_rewrite(run_id: str, rewrite_reason: str, refresh_title: bool = False, settings: dict = None) -> str:
+    """기존 실행의 체크포인트에서 재작성하는 작업을 제출하고 작업 ID를 반환"""
+    return _submit("rewrite", {"run_id": run_id, "rewrite_reason": rewrite_reason, "refresh_title": refresh_title}, settings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="블로그 생성 작업 큐 워커 실행")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS), help="이 프로세스에서 실행할 워커 수")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    pool = WorkerPool(build_graph(get_checkpointer()), get_job_store(), args.workers).start()
+    logger.info("워커 %d개 실행 중 (%s)", args.workers, JOBS_DB)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import AsyncIterator, Iterator
+
+from langchain_core.messages import convert_to_messages, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+from langchain_core.runnables.config import get_async_callback_manager_for_config, get_callback_manager_for_config
+
+from cache import CACHE_DIR, SqliteStore
+
+# LLM 응답 캐시 사용 여부 기본값 (사이드바/실행 설정이 우선)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "false").lower() == "true"
+# 응답 캐시 최대 크기(MB)
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "128"))
+
+# 캐시를 사용하는 노드 기본값: 같은 입력이면 같은 결과를 써도 되는 분석/평가 노드
+LLM_CACHE_NODES = frozenset({"seo_specialist", "blog_indexer", "art_director"})
+# 설정과 관계없이 항상 캐시를 건너뛰는 노드: 매번 새로운 글을 받아야 하는 작성/수정 단계
+LLM_CACHE_BYPASS_NODES = frozenset({"writer", "revise"})
+
+
+class LLMResponseCache(SqliteStore):
+    """LLM 응답 완전 일치(exact-match) 캐시
+
+    키는 (제공자, 모델, temperature, 렌더링된 전체 메시지)의 SHA-256이며,
+    전체 크기가 max_bytes를 넘으면 가장 오래 사용되지 않은 응답부터 삭제합니다 (LRU).
+    노드별 적중/미적중 횟수를 기록합니다.
+    """
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            node TEXT,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used);
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        super().__init__(path or os.path.join(CACHE_DIR, "llm_cache.sqlite"))
+        self.max_bytes = int(max_bytes if max_bytes is not None else LLM_CACHE_MAX_MB * 1024 * 1024)
+        self._stats = {}  # node -> {"hits": n, "misses": n}
+
+    @staticmethod
+    def make_key(namespace: tuple, messages: list) -> str:
+        payload = json.dumps([list(namespace), messages_to_dict(messages)], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str, node: str = None):
+        """저장된 응답 메시지 조회 (없으면 None)"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._record(node, "hits" if row is not None else "misses")
+        if row is None:
+            return None
+        return messages_from_dict(json.loads(row["value"]))[0]
+
+    def update(self, key: str, node: str, message):
+        value = json.dumps(messages_to_dict([message]), ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, node, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for row in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used").fetchall():
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (row["key"],))
+            total -= row["size"]
+            if total <= self.max_bytes:
+                break
+
+    def _record(self, node: str, kind: str):
+        counts = self._stats.setdefault(node or "unknown", {"hits": 0, "misses": 0})
+        counts[kind] += 1
+
+    def stats(self) -> dict:
+        """노드별 적중/미적중 횟수와 적중률"""
+        with self._lock:
+            stats = {node: dict(counts) for node, counts in self._stats.items()}
+        for counts in stats.values():
+            total = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = counts["hits"] / total if total else 0.0
+        return stats
+
+
+class CachedChatModel(Runnable):
+    """get_llm()이 반환하는 채팅 모델을 감싸 응답을 캐시하는 Runnable
+
+    `prompt | llm` 형태의 체인에서 그대로 사용할 수 있으며,
+    캐시에 없는 입력만 실제 모델을 호출합니다. 그 외 속성은 원래 모델로 위임합니다.
+    캐시 적중도 config의 콜백에 LLM 호출 시작/종료로 알리며, 종료 결과의 llm_output에 llm_cache_hit=True를 표시합니다.
+    """
+
+    def __init__(self, llm, cache: LLMResponseCache, namespace: tuple, node: str):
+        self.llm = llm
+        self.cache = cache
+        self.namespace = namespace
+        self.node = node
+
+    @staticmethod
+    def _to_messages(input) -> list:
+        if isinstance(input, PromptValue):
+            return input.to_messages()
+        if isinstance(input, str):
+            return convert_to_messages([("human", input)])
+        return convert_to_messages(input)
+
+    @staticmethod
+    def _hit_result(cached) -> LLMResult:
+        return LLMResult(generations=[[ChatGeneration(message=cached)]], llm_output={"llm_cache_hit": True})
+
+    def _report_hit(self, messages: list, cached, config):
+        """캐시 적중을 콜백(토큰 사용량, 추적 스팬)에 알림"""
+        callback_manager = get_callback_manager_for_config(config or {})
+        for run_manager in callback_manager.on_chat_model_start({"name": "llm_cache"}, [messages]):
+            run_manager.on_llm_end(self._hit_result(cached))
+
+    async def _areport_hit(self, messages: list, cached, config):
+        callback_manager = get_async_callback_manager_for_config(config or {})
+        for run_manager in await callback_manager.on_chat_model_start({"name": "llm_cache"}, [messages]):
+            await run_manager.on_llm_end(self._hit_result(cached))
+
+    def invoke(self, input, config=None, **kwargs):
+        messages = self._to_messages(input)
+        key = self.cache.make_key(self.namespace, messages)
+        cached = self.cache.lookup(key, self.node)
+        if cached is not None:
+            self._report_hit(messages, cached, config)
+            return cached
+        result = self.llm.invoke(input, config, **kwargs)
+        self.cache.update(key, self.node, result)
+        return result
+
+    def stream(self, input, config=None, **kwargs) -> Iterator:
+        messages = self._to_messages(input)
+        key = self.cache.make_key(self.namespace, messages)
+        cached = self.cache.lookup(key, self.node)
+        if cached is not None:
+            self._report_hit(messages, cached, config)
+            yield cached
+            return
+        full = None
+        for chunk in self.llm.stream(input, config, **kwargs):
+            full = chunk if full is None else full + chunk
+            yield chunk
+        if full is not None:
+            self.cache.update(key, self.node, full)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        messages = self._to_messages(input)
+        key = self.cache.make_key(self.namespace, messages)
+        cached = self.cache.lookup(key, self.node)
+        if cached is not None:
+            await self._areport_hit(messages, cached, config)
+            return cached
+        result = await self.llm.ainvoke(input, config, **kwargs)
+        self.cache.update(key, self.node, result)
+        return result
+
+    async def astream(self, input, config=None, **kwargs) -> AsyncIterator:
+        messages = self._to_messages(input)
+        key = self.cache.make_key(self.namespace, messages)
+        cached = self.cache.lookup(key, self.node)
+        if cached is not None:
+            await self._areport_hit(messages, cached, config)
+            yield cached
+            return
+        full = None
+        async for chunk in self.llm.astream(input, config, **kwargs):
+            full = chunk if full is None else full + chunk
+            yield chunk
+        if full is not None:
+            self.cache.update(key, self.node, full)
+
+    def with_structured_output(self, *args, **kwargs):
+        # 구조화 출력은 파서가 붙은 별도 체인이므로 캐시 없이 원래 모델을 사용
+        return self.llm.with_structured_output(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """프로세스 전역 LLM 응답 캐시 (지연 생성)"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache()
+    return _llm_cache
+
+
+def should_cache(node: str, enabled: bool, nodes=None) -> bool:
+    """노드의 응답 캐시 사용 여부
+
+    Args:
+        node: 호출하는 노드 이름
+        enabled: 실행 설정의 캐시 사용 여부 (opt-in)
+        nodes: 캐시를 사용할 노드 목록 (None이면 LLM_CACHE_NODES)
+    """
+    if not enabled or not node or node in LLM_CACHE_BYPASS_NODES:
+        return False
+    return node in (LLM_CACHE_NODES if nodes is None else set(nodes))
+
+
+def with_response_cache(llm, namespace: tuple, node: str, enabled: bool, nodes=None):
+    """캐시 정책에 해당하는 노드이면 응답 캐시로 감싼 모델을, 아니면 원래 모델을 반환"""
+    if llm is None or not should_cache(node, enabled, nodes):
+        return llm
+    return CachedChatModel(llm, get_llm_cache(), namespace, node)
@@ -0,0 +1,456 @@
+"""제공자/모델별 프로세스 전역 요청 한도 관리
+
+여러 Streamlit 세션, 백그라운드 작업 워커, 배치 실행이 같은 API 한도를 나눠 쓰므로
+(제공자, 모델)마다 하나의 RateLimiter를 프로세스 전체에서 공유합니다.
+
+- 분당 요청 수(RPM)와 분당 토큰 수(TPM)를 각각 토큰 버킷으로 제한
+- 동시 실행 수는 AIMD로 조절: 429(또는 Retry-After)를 받으면 절반으로 줄이고 모두 잠시 멈춘 뒤,
+  성공할 때마다 조금씩 다시 늘림
+- 429와 일시적인 오류(5xx, 연결 오류, 타임아웃)는 여기서 재시도하므로 SDK 자체 재시도는 끄고 사용
+  (SDK 안에서 재시도하면 한도 초과를 알 수 없어 모든 호출이 제각각 재시도하게 됨)
+
+동기 호출(스레드)과 비동기 호출(asyncio)이 같은 한도를 공유합니다.
+"""
+import asyncio
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+from langchain_core.messages import convert_to_messages
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+# 제공자별 (분당 요청 수, 분당 토큰 수) 한도, 0이면 제한하지 않음 (모델마다 따로 적용)
+RATE_LIMITS = {
+    "OpenAI": (_env_int("OPENAI_RPM", 500), _env_int("OPENAI_TPM", 450000)),
+    "Gemini": (_env_int("GEMINI_RPM", 1000), _env_int("GEMINI_TPM", 1000000)),
+    "Claude": (_env_int("ANTHROPIC_RPM", 50), _env_int("ANTHROPIC_TPM", 40000)),
+    "DALL·E 3": (_env_int("DALLE_RPM", 7), 0),
+    "Pollinations.ai": (_env_int("POLLINATIONS_RPM", 60), 0),
+    "Tavily": (_env_int("TAVILY_RPM", 100), 0),
+}
+# 제공자/모델별 최대 동시 실행 수 (AIMD로 줄었다가 이 값까지 다시 늘어남)
+RATE_LIMIT_CONCURRENCY = _env_int("RATE_LIMIT_CONCURRENCY", 64)
+# 429/일시적 오류 재시도 횟수와 Retry-After가 없을 때의 첫 대기 시간(초)
+RATE_LIMIT_MAX_RETRIES = _env_int("RATE_LIMIT_MAX_RETRIES", 4)
+RATE_LIMIT_BACKOFF = float(os.getenv("RATE_LIMIT_BACKOFF", "1.0"))
+# LLM 호출 한 번의 출력 토큰 추정치 (실제 사용량은 응답을 받은 뒤 TPM 버킷에 반영)
+RATE_LIMIT_OUTPUT_TOKENS = _env_int("RATE_LIMIT_OUTPUT_TOKENS", 1000)
+
+_RETRYABLE_STATUS = {408, 409, 500, 502, 503, 504, 529}
+# 예외 클래스 이름에 이 문자열이 들어가면 일시적 오류로 처리 (openai/anthropic/httpx/requests/google 공통)
+_TRANSIENT_NAMES = ("Timeout", "Connect", "ServiceUnavailable", "InternalServerError")
+
+
+class TokenBucket:
+    """분당 capacity만큼 채워지는 토큰 버킷
+
+    reserve는 토큰을 먼저 가져가고 부족분이 채워질 때까지 기다릴 시간을 반환하므로,
+    스레드와 이벤트 루프가 각자의 방식(time.sleep / asyncio.sleep)으로 기다릴 수 있습니다.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, amount: float):
+        """예약한 양과 실제 사용량의 차이를 반영 (양수면 추가 차감, 음수면 환급)"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AdaptiveConcurrency:
+    """AIMD(가산 증가 / 곱셈 감소) 동시 실행 제한 (스레드와 asyncio 태스크가 함께 사용)"""
+
+    def __init__(self, maximum: int, decrease: float = 0.5):
+        self.maximum = max(1, maximum)
+        self.limit = float(self.maximum)
+        self.decrease = decrease
+        self.active = 0
+        self._lock = threading.Lock()
+        self._waiters = deque()  # threading.Event 또는 asyncio.Future
+
+    def _admit(self) -> bool:
+        if self.active < int(self.limit):
+            self.active += 1
+            return True
+        return False
+
+    def _wake(self):
+        # 호출부에서 self._lock을 잡고 있어야 함. 빈 자리를 대기 순서대로 넘겨줌
+        while self._waiters and self.active < int(self.limit):
+            waiter = self._waiters.popleft()
+            self.active += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+
+    def _hand_over(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def acquire(self):
+        with self._lock:
+            if self._admit():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self):
+        with self._lock:
+            if self._admit():
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+                    raise
+            # 자리를 넘겨받은 뒤 취소된 경우 (아직 넘겨주는 중이면 _hand_over가 반납)
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+            self._wake()
+
+    def succeeded(self):
+        with self._lock:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._wake()
+
+    def throttled(self) -> tuple:
+        """(이전 한도, 새 한도)"""
+        with self._lock:
+            before = int(self.limit)
+            self.limit = max(1.0, self.limit * self.decrease)
+            return before, int(self.limit)
+
+
+def _status_code(error: Exception):
+    for candidate in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code"):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int):
+                return value
+    # langchain_tavily는 "Error 429: ..." 형식의 ValueError를 돌려줌
+    match = re.match(r"Error (\d{3}):", str(error))
+    return int(match.group(1)) if match else None
+
+
+def _retry_after(error: Exception):
+    """응답 헤더의 Retry-After(초 또는 HTTP 날짜) / retry-after-ms"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: Exception):
+    """"throttle"(한도 초과), "transient"(일시적 오류) 또는 None(재시도하지 않음)"""
+    status = _status_code(error)
+    names = [cls.__name__ for cls in type(error).__mro__]
+    if status == 429 or "RateLimitError" in names or "ResourceExhausted" in names:
+        return "throttle"
+    if status in _RETRYABLE_STATUS or any(part in name for name in names for part in _TRANSIENT_NAMES):
+        return "transient"
+    return None
+
+
+class RateLimiter:
+    """제공자/모델 하나의 RPM·TPM 버킷과 AIMD 동시 실행 제한"""
+
+    def __init__(self, name: str, rpm: int = 0, tpm: int = 0, concurrency: int = RATE_LIMIT_CONCURRENCY):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = AdaptiveConcurrency(concurrency)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "throttled": 0, "retries": 0, "waited_s": 0.0}
+
+    def _wait_time(self, tokens: float) -> float:
+        wait = max(self._paused_until - time.monotonic(), 0.0)
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["waited_s"] += wait
+        return wait
+
+    def acquire(self, tokens: float = 0):
+        """동시 실행 자리를 얻고 RPM/TPM 한도와 429 이후 일시 정지가 풀릴 때까지 대기"""
+        self.concurrency.acquire()
+        try:
+            time.sleep(self._wait_time(tokens))
+        except BaseException:
+            self.concurrency.release()
+            raise
+
+    async def aacquire(self, tokens: float = 0):
+        await self.concurrency.aacquire()
+        try:
+            await asyncio.sleep(self._wait_time(tokens))
+        except BaseException:
+            self.concurrency.release()
+            raise
+
+    def release(self, error: Exception = None, attempt: int = 0):
+        """호출 결과를 반영하고 자리를 반납
+
+        Returns:
+            재시도 전에 기다릴 시간(초). 재시도하지 않을 오류이면 None
+        """
+        try:
+            if error is None:
+                self.concurrency.succeeded()
+                return None
+            kind = classify_error(error)
+            if kind is None:
+                return None
+            delay = _retry_after(error) if kind == "throttle" else None
+            if delay is None:
+                delay = min(RATE_LIMIT_BACKOFF * 2 ** attempt + random.uniform(0, RATE_LIMIT_BACKOFF), 60.0)
+            decrease = False
+            with self._lock:
+                self._stats["retries"] += 1
+                if kind == "throttle":
+                    self._stats["throttled"] += 1
+                    # 같은 시점에 몰려 온 429는 한 번만 줄임 (이미 멈춘 동안 받은 429는 대기 시간만 연장)
+                    decrease = time.monotonic() >= self._paused_until
+                    # 같은 제공자/모델을 쓰는 모든 호출이 함께 멈춤
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            if decrease:
+                before, after = self.concurrency.throttled()
+                logger.warning("%s 요청 한도 초과: 동시 실행 %d -> %d, %.1f초 후 재시도", self.name, before, after, delay)
+            return delay
+        finally:
+            self.concurrency.release()
+
+    def settle(self, estimated: float, actual: float):
+        """TPM 버킷에 예약한 추정치를 실제 토큰 사용량으로 보정"""
+        if self.tokens is not None and actual:
+            self.tokens.adjust(actual - estimated)
+
+    def call(self, fn, *args, tokens: float = 0, **kwargs):
+        """한도 안에서 fn(*args, **kwargs)를 호출하고, 429/일시적 오류는 재시도"""
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            self.acquire(tokens)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self.release(e, attempt)
+                if delay is None or attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                time.sleep(delay)
+            except BaseException:
+                self.concurrency.release()
+                raise
+            else:
+                self.release()
+                return result
+
+    async def acall(self, fn, *args, tokens: float = 0, **kwargs):
+        """call의 비동기 버전 (fn은 코루틴 함수)"""
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            await self.aacquire(tokens)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self.release(e, attempt)
+                if delay is None or attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # 작업 취소 등: 한도 조절 없이 자리만 반납
+                self.concurrency.release()
+                raise
+            else:
+                self.release()
+                return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["concurrency"] = int(self.concurrency.limit)
+        stats["active"] = self.concurrency.active
+        return stats
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str, model: str = None) -> RateLimiter:
+    """(제공자, 모델)별 프로세스 전역 RateLimiter (지연 생성)"""
+    key = (provider, model)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                rpm, tpm = RATE_LIMITS.get(provider, (0, 0))
+                limiter = _limiters[key] = RateLimiter(f"{provider}/{model}" if model else provider, rpm, tpm)
+    return limiter
+
+
+def rate_limit_stats() -> dict:
+    """사용된 제공자/모델별 호출, 한도 초과, 재시도 횟수와 현재 동시 실행 한도"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+def _prompt_text(input) -> str:
+    if isinstance(input, PromptValue):
+        messages = input.to_messages()
+    elif isinstance(input, str):
+        return input
+    else:
+        messages = convert_to_messages(input)
+    parts = []
+    for message in messages:
+        content = message.content
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+    return "".join(parts)
+
+
+def estimate_tokens(input) -> int:
+    """TPM 버킷에 미리 예약할 토큰 수 (입력은 글자 수로 넉넉하게 추정 + 출력 추정치)"""
+    return math.ceil(len(_prompt_text(input)) / 2) + RATE_LIMIT_OUTPUT_TOKENS
+
+
+def _used_tokens(result) -> int:
+    usage = getattr(result, "usage_metadata", None) or {}
+    return usage.get("total_tokens", 0)
+
+
+class RateLimitedChatModel(Runnable):
+    """get_llm()의 채팅 모델(또는 구조화 출력 체인)을 감싸 RateLimiter 안에서 호출하는 Runnable
+
+    스트리밍은 첫 조각을 받기 전의 429/일시적 오류만 재시도하며, 스트리밍이 끝날 때까지 동시 실행 자리를 차지합니다.
+    그 외 속성은 원래 모델로 위임합니다.
+    """
+
+    def __init__(self, llm, limiter: RateLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    def invoke(self, input, config=None, **kwargs):
+        estimated = estimate_tokens(input)
+        result = self.limiter.call(self.llm.invoke, input, config, tokens=estimated, **kwargs)
+        self.limiter.settle(estimated, _used_tokens(result))
+        return result
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        estimated = estimate_tokens(input)
+        result = await self.limiter.acall(self.llm.ainvoke, input, config, tokens=estimated, **kwargs)
+        self.limiter.settle(estimated, _used_tokens(result))
+        return result
+
+    def stream(self, input, config=None, **kwargs):
+        estimated = estimate_tokens(input)
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            self.limiter.acquire(estimated)
+            released, full = False, None
+            try:
+                for chunk in self.llm.stream(input, config, **kwargs):
+                    full = chunk if full is None else full + chunk
+                    yield chunk
+            except Exception as e:
+                released = True
+                delay = self.limiter.release(e, attempt)
+                if full is not None or delay is None or attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                time.sleep(delay)
+                continue
+            finally:
+                if not released:
+                    self.limiter.release()
+            self.limiter.settle(estimated, _used_tokens(full))
+            return
+
+    async def astream(self, input, config=None, **kwargs):
+        estimated = estimate_tokens(input)
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            await self.limiter.aacquire(estimated)
+            released, full = False, None
+            try:
+                async for chunk in self.llm.astream(input, config, **kwargs):
+                    full = chunk if full is None else full + chunk
+                    yield chunk
+            except Exception as e:
+                released = True
+                delay = self.limiter.release(e, attempt)
+                if full is not None or delay is None or attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                if not released:
+                    self.limiter.release()
+            self.limiter.settle(estimated, _used_tokens(full))
+            return
+
+    def with_structured_output(self, *args, **kwargs):
+        return RateLimitedChatModel(self.llm.with_structured_output(*args, **kwargs), self.limiter)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def with_rate_limit(llm, provider: str, model: str):
+    """채팅 모델을 (제공자, 모델)의 프로세스 전역 RateLimiter로 감쌈"""
+    if llm is None:
+        return None
+    return RateLimitedChatModel(llm, get_limiter(provider, model))
@@ -0,0 +1,114 @@
+import re
+
+# "2번 섹션", "두 번째 소제목", "섹션 3" 처럼 섹션 번호를 지정하는 표현
+_SECTION_WORDS = r"(?:섹션|소제목|단락|문단|파트|챕터|부분)"
+_KOREAN_ORDINALS = {"첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+_NUMBERED_PATTERNS = [
+    re.compile(r"(\d+)\s*(?:번째|번)\s*" + _SECTION_WORDS),
+    re.compile(_SECTION_WORDS + r"\s*(\d+)"),
+    re.compile(r"(" + "|".join(_KOREAN_ORDINALS) + r")\s*번째\s*" + _SECTION_WORDS),
+]
+_INTRO_PATTERN = re.compile(r"서론|도입부?|인트로|첫\s*부분")
+_CONCLUSION_PATTERN = re.compile(r"결론|마무리|맺음말|마지막\s*" + _SECTION_WORDS)
+_CONCLUSION_HEADING = re.compile(r"결론|마무리|맺음|정리")
+# 글 전체를 다시 써야 하는 요청 (특정 섹션 지정보다 우선)
+_WHOLE_POST_PATTERN = re.compile(r"전체|전반|전부|모든\s*" + _SECTION_WORDS + r"|글\s*구조|순서를")
+_QUOTED_PATTERN = re.compile(r"[\"'“”‘’「」『』]([^\"'“”‘’「」『』]{2,})[\"'“”‘’「」『』]")
+
+
+def split_sections(post: str) -> list:
+    """마크다운 포스트를 `## ` 소제목 단위로 분할
+
+    writer_node가 final_subheadings를 뽑을 때와 같은 기준(`## `로 시작하는 줄)을 사용하며,
+    첫 소제목 앞의 내용(서론)은 첫 번째 항목이 됩니다. "".join(sections)는 원본과 같습니다.
+    """
+    sections, current = [], []
+    for line in post.splitlines(keepends=True):
+        if line.startswith("## ") and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+
+def _is_heading_section(section: str) -> bool:
+    return section.startswith("## ")
+
+
+def section_heading(section: str) -> str:
+    """섹션의 소제목 텍스트 (서론이면 빈 문자열)"""
+    if not _is_heading_section(section):
+        return ""
+    return section.split("\n", 1)[0].replace("## ", "").strip()
+
+
+def _normalize(text: str) -> str:
+    # 이모지, 문장부호, 공백을 제거하여 소제목과 요청 문구를 비교
+    return re.sub(r"[^\w]", "", text.lower())
+
+
+def select_sections(sections: list, feedback: str):
+    """수정 요청이 가리키는 섹션 인덱스 목록
+
+    섹션 번호("2번 섹션"), 서론/결론, 소제목 텍스트, 따옴표로 인용한 문구로 대상을 찾습니다.
+    글 전체에 대한 요청이거나 대상을 특정할 수 없으면 None을 반환합니다 (전체 수정으로 대체).
+    """
+    if not sections or _WHOLE_POST_PATTERN.search(feedback):
+        return None
+
+    body = [i for i, section in enumerate(sections) if _is_heading_section(section)]
+    targets = set()
+
+    for pattern in _NUMBERED_PATTERNS:
+        for match in pattern.finditer(feedback):
+            value = match.group(1)
+            number = int(value) if value.isdigit() else _KOREAN_ORDINALS[value]
+            if 1 <= number <= len(body):
+                targets.add(body[number - 1])
+
+    # 글이 바로 소제목으로 시작하면 서론이 없으므로 첫 소제목 섹션을 서론으로 취급하지 않음
+    if _INTRO_PATTERN.search(feedback) and not _is_heading_section(sections[0]):
+        targets.add(0)
+
+    if _CONCLUSION_PATTERN.search(feedback) and body:
+        named = [i for i in body if _CONCLUSION_HEADING.search(section_heading(sections[i]))]
+        targets.add(named[-1] if named else body[-1])
+
+    normalized_feedback = _normalize(feedback)
+    for i in body:
+        heading = _normalize(section_heading(sections[i]))
+        if len(heading) >= 2 and heading in normalized_feedback:
+            targets.add(i)
+
+    for quoted in _QUOTED_PATTERN.findall(feedback):
+        targets.update(i for i, section in enumerate(sections) if quoted.strip() in section)
+
+    # 대부분의 섹션을 고쳐야 한다면 한 번에 전체를 수정하는 편이 일관성이 좋음
+    if not targets or len(targets) > len(sections) // 2 + 1:
+        return None
+    return sorted(targets)
+
+
+def splice_section(original: str, revised: str) -> str:
+    """모델이 다시 쓴 섹션을 원래 자리에 맞게 정리
+
+    코드 블록 울타리를 벗기고, 소제목 줄이 빠졌으면 원래 소제목을 붙이며,
+    원래 섹션 끝의 줄바꿈을 유지하여 앞뒤 섹션과의 간격이 바뀌지 않도록 합니다.
+    """
+    text = revised.strip()
+    fence = re.match(r"^```[\w-]*\n(.*?)\n?```$", text, re.DOTALL)
+    if fence:
+        text = fence.group(1).strip()
+    if _is_heading_section(original) and not text.startswith("## "):
+        text = original.split("\n", 1)[0] + "\n" + text
+    trailing = original[len(original.rstrip()):] or "\n"
+    return text + trailing
+
+
+def seo_keywords(seo_analysis: str, limit: int = 400) -> str:
+    """SEO 분석에서 추천 태그 부분만 잘라 섹션 수정 프롬프트에 사용"""
+    parts = (seo_analysis or "").split("[추천 태그]")
+    keywords = parts[1] if len(parts) > 1 else parts[0]
+    return keywords.strip()[:limit]
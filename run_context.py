@@ -0,0 +1,209 @@
+"""그래프 실행 컨텍스트 (실행 설정 + 진행 상황 출력 대상)
+
+노드와 도구 함수는 Streamlit을 직접 호출하지 않고 RunContext를 통해 설정을 읽고 진행 상황을 알립니다.
+RunContext는 run_config로 LangGraph config의 configurable["run_context"]에 담겨 전달되며,
+진행 상황은 실행 환경에 맞는 출력 대상(sink)으로 보내집니다.
+
+- StreamlitSink: 현재 Streamlit 페이지에 st.write / st.info 등으로 표시 (app.py)
+- LoggingSink: logging으로 기록 (cli.py 등 헤드리스 실행)
+- QueueSink: queue.Queue에 이벤트로 넣음 (백그라운드 워커의 진행 상황을 다른 스레드에서 읽을 때)
+- ProgressSink: 아무것도 출력하지 않음
+"""
+import logging
+import queue
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# 진행 상황 메시지 수준 (Streamlit 출력 함수 이름과 같음)
+LEVELS = ("write", "caption", "info", "success", "warning", "error")
+_LOG_LEVELS = {"warning": logging.WARNING, "error": logging.ERROR}
+
+
+class ProgressSink:
+    """진행 상황 출력 대상 기본 클래스 (아무것도 출력하지 않음)"""
+
+    def emit(self, level: str, message: str):
+        pass
+
+    def stream(self, chunks):
+        """생성되는 텍스트 조각을 표시 (반드시 chunks를 끝까지 소비해야 함)"""
+        for _ in chunks:
+            pass
+
+    async def astream(self, chunks):
+        """비동기로 생성되는 텍스트 조각을 표시 (기본: 모두 받은 뒤 stream으로 전달)"""
+        pieces = [chunk async for chunk in chunks]
+        self.stream(iter(pieces))
+
+    def section(self, title: str):
+        """하위 출력을 묶는 구역 (Streamlit의 expander)"""
+        return nullcontext()
+
+
+class StreamlitSink(ProgressSink):
+    """현재 Streamlit 페이지에 출력
+
+    Streamlit 스크립트 스레드나 tools.make_executor로 만든 워커 스레드에서만 사용할 수 있습니다.
+    """
+
+    def emit(self, level: str, message: str):
+        import streamlit as st
+
+        getattr(st, level)(message)
+
+    def stream(self, chunks):
+        import streamlit as st
+
+        st.write_stream(chunks)
+
+    async def astream(self, chunks):
+        import streamlit as st
+
+        placeholder, text = st.empty(), ""
+        async for chunk in chunks:
+            text += chunk
+            placeholder.markdown(text + "▌")
+        placeholder.markdown(text)
+
+    def section(self, title: str):
+        import streamlit as st
+
+        return st.expander(title, expanded=True)
+
+
+class LoggingSink(ProgressSink):
+    """진행 상황을 logging으로 기록 (스트리밍 조각은 기록하지 않음)"""
+
+    def __init__(self, name: str = "blog_agent.progress"):
+        self.logger = logging.getLogger(name)
+
+    def emit(self, level: str, message: str):
+        self.logger.log(_LOG_LEVELS.get(level, logging.INFO), "%s", message)
+
+    @contextmanager
+    def section(self, title: str):
+        self.logger.info("%s", title)
+        yield
+
+
+@dataclass
+class ProgressEvent:
+    level: str  # LEVELS 중 하나, 스트리밍 조각은 "stream", 구역 시작은 "section"
+    message: str
+    ts: float = field(default_factory=time.time)
+
+
+class QueueSink(ProgressSink):
+    """진행 상황을 ProgressEvent로 큐에 넣음 (워커 스레드에서 실행하고 UI 스레드에서 꺼내 표시)"""
+
+    def __init__(self, events: queue.Queue = None):
+        self.events = events if events is not None else queue.Queue()
+
+    def emit(self, level: str, message: str):
+        self.events.put(ProgressEvent(level, message))
+
+    def stream(self, chunks):
+        for chunk in chunks:
+            self.events.put(ProgressEvent("stream", chunk))
+
+    async def astream(self, chunks):
+        async for chunk in chunks:
+            self.events.put(ProgressEvent("stream", chunk))
+
+    @contextmanager
+    def section(self, title: str):
+        self.events.put(ProgressEvent("section", title))
+        yield
+
+
+def _chunk_text(chunk) -> str:
+    """스트리밍 청크(AIMessageChunk)에서 텍스트만 추출 (Claude의 content 블록 목록 포함)"""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+@dataclass
+class RunContext:
+    """그래프 실행 한 번의 설정(모델 제공자, API 키, 모델 선택 등)과 진행 상황 출력 대상"""
+
+    settings: dict = field(default_factory=dict)
+    sink: ProgressSink = field(default_factory=ProgressSink)
+
+    def get(self, key: str, default=None):
+        return self.settings.get(key, default)
+
+    def write(self, message: str):
+        self.sink.emit("write", message)
+
+    def caption(self, message: str):
+        self.sink.emit("caption", message)
+
+    def info(self, message: str):
+        self.sink.emit("info", message)
+
+    def success(self, message: str):
+        self.sink.emit("success", message)
+
+    def warning(self, message: str):
+        self.sink.emit("warning", message)
+
+    def error(self, message: str):
+        self.sink.emit("error", message)
+
+    def section(self, title: str):
+        return self.sink.section(title)
+
+    def stream(self, chain, inputs: dict) -> str:
+        """체인 출력을 토큰 단위로 출력 대상에 보내고 전체 텍스트를 반환"""
+        pieces = []
+
+        def _tokens():
+            for chunk in chain.stream(inputs):
+                text = _chunk_text(chunk)
+                if text:
+                    pieces.append(text)
+                    yield text
+
+        self.sink.stream(_tokens())
+        return "".join(pieces)
+
+    async def astream(self, chain, inputs: dict) -> str:
+        """stream의 비동기 버전 (chain.astream 사용)"""
+        pieces = []
+
+        async def _tokens():
+            async for chunk in chain.astream(inputs):
+                text = _chunk_text(chunk)
+                if text:
+                    pieces.append(text)
+                    yield text
+
+        await self.sink.astream(_tokens())
+        return "".join(pieces)
+
+
+def default_sink() -> ProgressSink:
+    """Streamlit 스크립트 실행 중이면 StreamlitSink, 아니면 LoggingSink"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return LoggingSink()
+    return StreamlitSink() if get_script_run_ctx(suppress_warning=True) is not None else LoggingSink()
+
+
+def get_run_context(config) -> RunContext:
+    """그래프 실행 config에서 RunContext를 꺼냄
+
+    run_config 없이 만든 config(설정 딕셔너리만 있거나 config가 없는 경우)는
+    configurable["settings"]와 현재 실행 환경의 기본 출력 대상으로 새 RunContext를 만듭니다.
+    """
+    configurable = (config or {}).get("configurable") or {}
+    run = configurable.get("run_context")
+    if isinstance(run, RunContext):
+        return run
+    return RunContext(dict(configurable.get("settings") or {}), default_sink())
@@ -1,100 +1,361 @@
+import asyncio
+import hashlib
 import os
+import random
+import ssl
+import threading
+import time
+import weakref
+
+import httpx
 import requests
-import streamlit as st
-from bs4 import BeautifulSoup
+from lxml import etree
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from requests.adapters import HTTPAdapter
 from requests.exceptions import SSLError, RequestException
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError, SSLError as Urllib3SSLError
+from urllib3.util.retry import Retry
 
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableBinding
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_anthropic import ChatAnthropic
 import trafilatura
-from urllib.parse import urlparse, urljoin, parse_qs
+from trafilatura.utils import load_html
+from urllib.parse import urlparse, urljoin, parse_qs, quote
+
+from cache import get_scrape_cache, normalize_url
+from llm_cache import LLM_CACHE_ENABLED, with_response_cache
+from ratelimit import get_limiter, with_rate_limit
+from run_context import get_run_context
+from tracing import TracingCallback, trace_span
+
+
+def make_executor(max_workers: int) -> ContextThreadPoolExecutor:
+    """호출 스레드의 실행 환경을 공유하는 스레드 풀 생성
+
+    Streamlit 스크립트 안에서 만들면 워커 스레드에 ScriptRunContext를 연결하여,
+    작업 중 StreamlitSink로 보내는 진행 상황이 현재 페이지에 그대로 표시되도록 합니다.
+    작업마다 호출 시점의 contextvars(추적 중인 실행 ID/노드 등)도 복사됩니다.
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def _attach_ctx():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    return ContextThreadPoolExecutor(max_workers=max(1, max_workers), initializer=_attach_ctx)
+
+
+def get_setting(config, key: str, default=None):
+    """실행 설정 값 조회 (config의 RunContext 설정, 없으면 default)"""
+    return get_run_context(config).get(key, default)
+
+
+# 환경 변수에서도 읽는 실행 설정 (app.py의 .env 자동 로드와 같은 이름)
+# API 키이므로 작업 큐 등 디스크에는 저장하지 않습니다.
+ENV_SETTINGS = {
+    "openai_api_key": "OPENAI_API_KEY",
+    "gemini_api_key": "GEMINI_API_KEY",
+    "anthropic_api_key": "ANTHROPIC_API_KEY",
+    "tavily_api_key": "TAVILY_API_KEY",
+}
+
+
+def env_settings() -> dict:
+    """환경 변수에 값이 있는 ENV_SETTINGS 실행 설정"""
+    return {key: os.getenv(name) for key, name in ENV_SETTINGS.items() if os.getenv(name)}
+
+
+# 사용하지 않은 LLM 클라이언트를 레지스트리에서 제거하기까지의 유휴 시간(초)
+LLM_CLIENT_IDLE_TTL = float(os.getenv("LLM_CLIENT_IDLE_TTL", "900"))
+
+
+class LLMClientRegistry:
+    """LLM 클라이언트를 재사용하는 프로세스 전역 레지스트리
+
+    (제공자, API 키 지문, 모델, temperature)가 같은 클라이언트를 노드와 실행 사이에서 공유하여
+    클라이언트 내부의 HTTP 연결 풀(keep-alive)을 재사용합니다.
+    idle_ttl초 동안 사용되지 않은 클라이언트는 다음 조회 시 제거됩니다.
+    """
+
+    def __init__(self, idle_ttl: float = LLM_CLIENT_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._clients = {}  # key -> [client, 마지막 사용 시각]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(api_key: str) -> str:
+        """API 키 원문 대신 레지스트리 키로 사용할 지문"""
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    def get(self, key: tuple, factory):
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = self._clients[key] = [factory(), now]
+            entry[1] = now
+            return entry[0]
+
+    def _evict_idle(self, now: float):
+        idle = [key for key, (_, last_used) in self._clients.items() if now - last_used > self.idle_ttl]
+        for key in idle:
+            del self._clients[key]
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
 
+llm_clients = LLMClientRegistry()
 
-def get_llm(temperature: float = 0.7):
-    model_provider = st.session_state.get("model_provider", "OpenAI")
+
+# 제공자별 사용 모델
+LLM_MODELS = {"OpenAI": "gpt-4o", "Gemini": "gemini-2.5-flash", "Claude": "claude-4-sonnet"}
+
+
+def get_llm(temperature: float = None, config=None, node: str = None):
+    """실행 설정에 맞는 채팅 모델 반환
+
+    Args:
+        temperature: 샘플링 온도 (None이면 실행 설정 또는 0.7)
+        config: 그래프 실행 config (실행 설정과 오류 메시지 출력 대상, run_context 참고)
+        node: 호출하는 노드 이름. LLM 응답 캐시(llm_cache)가 켜져 있으면 노드별 정책에 따라 캐시를 적용
+    """
+    run = get_run_context(config)
+    model_provider = run.get("model_provider", "OpenAI")
+    if temperature is None:
+        temperature = run.get("temperature", 0.7)
     
     if model_provider == "OpenAI":
-        api_key = st.session_state.get("openai_api_key")
+        api_key = run.get("openai_api_key")
         if not api_key:
-            st.error("OpenAI API Key가 설정되지 않았습니다.")
+            run.error("OpenAI API Key가 설정되지 않았습니다.")
             return None
-        os.environ["OPENAI_API_KEY"] = api_key
         try:
-            return ChatOpenAI(model="gpt-4o", temperature=temperature)
+            # 환경 변수(os.environ)를 쓰지 않고 키를 직접 전달하여 세션 간 키가 섞이지 않도록 함
+            llm = llm_clients.get(
+                ("OpenAI", llm_clients.fingerprint(api_key), LLM_MODELS["OpenAI"], temperature),
+                # stream_usage: 스트리밍 응답에도 토큰 사용량(캐시 적중 토큰 포함)을 받음
+                # max_retries=0: 429와 일시적 오류는 SDK 대신 ratelimit의 공유 한도에서 재시도
+                lambda: ChatOpenAI(model=LLM_MODELS["OpenAI"], api_key=api_key, temperature=temperature, stream_usage=True, max_retries=0),
+            )
         except Exception as e:
-            st.error(f"OpenAI LLM 초기화 실패: {e}")
+            run.error(f"OpenAI LLM 초기화 실패: {e}")
             return None
             
     elif model_provider == "Gemini":
-        api_key = st.session_state.get("gemini_api_key")
+        api_key = run.get("gemini_api_key")
         if not api_key:
-            st.error("Google API Key가 설정되지 않았습니다.")
+            run.error("Google API Key가 설정되지 않았습니다.")
             return None
         try:
-            return ChatGoogleGenerativeAI(
-                model="gemini-2.5-flash", 
-                google_api_key=api_key,
-                temperature=temperature,
-                convert_system_message_to_human=True
+            llm = llm_clients.get(
+                ("Gemini", llm_clients.fingerprint(api_key), LLM_MODELS["Gemini"], temperature),
+                lambda: ChatGoogleGenerativeAI(
+                    model=LLM_MODELS["Gemini"], 
+                    google_api_key=api_key,
+                    temperature=temperature,
+                    convert_system_message_to_human=True,
+                    max_retries=0,
+                ),
             )
         except Exception as e:
-            st.error(f"Gemini LLM 초기화 실패: {e}")
+            run.error(f"Gemini LLM 초기화 실패: {e}")
             return None
 
     elif model_provider == "Claude":
-        api_key = st.session_state.get("anthropic_api_key")
+        api_key = run.get("anthropic_api_key")
         if not api_key:
-            st.error("Anthropic API Key가 설정되지 않았습니다.")
+            run.error("Anthropic API Key가 설정되지 않았습니다.")
             return None
         try:
-            return ChatAnthropic(
-                model="claude-4-sonnet",
-                api_key=api_key,
-                temperature=temperature,
+            llm = llm_clients.get(
+                ("Claude", llm_clients.fingerprint(api_key), LLM_MODELS["Claude"], temperature),
+                lambda: ChatAnthropic(
+                    model=LLM_MODELS["Claude"],
+                    api_key=api_key,
+                    temperature=temperature,
+                    max_retries=0,
+                ),
             )
         except Exception as e:
-            st.error(f"Claude LLM 초기화 실패: {e}")
+            run.error(f"Claude LLM 초기화 실패: {e}")
             return None
-    
-    return None
 
+    else:
+        return None
+
+    # 같은 제공자/모델을 쓰는 모든 세션과 워커가 요청/토큰 한도를 함께 사용 (캐시 적중은 한도에 포함되지 않음)
+    llm = with_rate_limit(llm, model_provider, LLM_MODELS[model_provider])
+    llm = with_response_cache(
+        llm,
+        (model_provider, LLM_MODELS[model_provider], temperature),
+        node,
+        enabled=run.get("llm_cache", LLM_CACHE_ENABLED),
+        nodes=run.get("llm_cache_nodes"),
+    )
+    return _CallbackBinding(bound=llm, config={"callbacks": [
+        TokenUsageCallback(node),
+        TracingCallback(node, model_provider, LLM_MODELS[model_provider]),
+    ]})
+
+
+class _CallbackBinding(RunnableBinding):
+    """get_llm이 붙인 콜백을 with_structured_output으로 만든 체인에도 유지
+
+    RunnableBinding은 with_structured_output을 원래 모델로 그대로 넘겨 config(콜백)가 빠지므로 다시 적용합니다.
+    """
+
+    def with_structured_output(self, *args, **kwargs):
+        return self.bound.with_structured_output(*args, **kwargs).with_config(self.config)
+
+
+def system_prompt(text: str, config=None) -> SystemMessage:
+    """고정 시스템 프롬프트 메시지 (prompts.py)
+
+    시스템 프롬프트를 프롬프트 맨 앞에 두어 OpenAI / Gemini의 자동 프롬프트 캐시가 재사용할 수 있게 하고,
+    Claude는 명시적 캐시 지점(cache_control)을 표시합니다.
+    템플릿 변수를 쓰지 않는 완성된 메시지이므로 ChatPromptTemplate.from_messages에 그대로 넣을 수 있습니다.
+    """
+    if get_setting(config, "model_provider", "OpenAI") == "Claude":
+        return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+    return SystemMessage(content=text)
+
+
+class TokenUsageStats:
+    """노드별 입력 토큰과 제공자 프롬프트 캐시 토큰 집계
+
+    응답의 usage_metadata["input_token_details"]에서 캐시에서 읽은 토큰(cache_read)과
+    Claude가 캐시에 새로 기록한 토큰(cache_creation)을 모읍니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, node: str, usage: dict):
+        details = usage.get("input_token_details") or {}
+        with self._lock:
+            counts = self._counts(node)
+            counts["calls"] += 1
+            counts["input_tokens"] += usage.get("input_tokens") or 0
+            counts["output_tokens"] += usage.get("output_tokens") or 0
+            counts["cache_read"] += details.get("cache_read") or 0
+            counts["cache_creation"] += details.get("cache_creation") or 0
+
+    def record_cache_hit(self, node: str):
+        """LLM 응답 캐시(llm_cache) 적중: 제공자를 호출하지 않았으므로 토큰 없이 횟수만 기록"""
+        with self._lock:
+            self._counts(node)["llm_cache_hits"] += 1
+
+    def _counts(self, node: str) -> dict:
+        return self._stats.setdefault(node or "unknown", {
+            "calls": 0, "input_tokens": 0, "output_tokens": 0, "cache_read": 0, "cache_creation": 0, "llm_cache_hits": 0,
+        })
 
-def generate_image_with_gemini(prompt: str, api_key: str):
+    def stats(self) -> dict:
+        """노드별 집계와 입력 토큰 중 캐시에서 읽은 비율"""
+        with self._lock:
+            stats = {node: dict(counts) for node, counts in self._stats.items()}
+        for counts in stats.values():
+            counts["cached_ratio"] = counts["cache_read"] / counts["input_tokens"] if counts["input_tokens"] else 0.0
+        return stats
+
+
+token_usage = TokenUsageStats()
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LLM 호출이 끝날 때 응답의 토큰 사용량을 token_usage에 기록 (스트리밍 응답은 합쳐진 결과 기준)"""
+
+    run_inline = True
+
+    def __init__(self, node: str = None):
+        self.node = node
+
+    def on_llm_end(self, response, **kwargs):
+        if (response.llm_output or {}).get("llm_cache_hit"):
+            token_usage.record_cache_hit(self.node)
+            return
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    token_usage.record(self.node, usage)
+
+
+# Pollinations.ai 이미지 생성 주소 (부하 테스트 등에서는 로컬 대체 서버 주소로 바꿔서 사용)
+POLLINATIONS_URL = os.getenv("POLLINATIONS_URL", "https://image.pollinations.ai/prompt/")
+
+
+def _pollinations_url(prompt: str) -> str:
+    # seed를 추가하여 매번 다른 이미지 생성
+    seed = int(time.time())
+    return f"{POLLINATIONS_URL}{quote(prompt)}?seed={seed}&width=1024&height=1024&nologo=true"
+
+
+def _trigger_pollinations(image_url: str):
+    """이미지 생성 트리거 (최대 40초 대기)
+
+    상태 코드를 반환하고, 타임아웃이면 None을 반환합니다 (URL은 유효).
+    429는 RateLimiter가 재시도하도록 예외로 올립니다.
+    """
+    try:
+        response = requests.get(image_url, timeout=40, stream=True)
+    except requests.Timeout:
+        return None
+    response.close()
+    if response.status_code == 429:
+        response.raise_for_status()
+    return response.status_code
+
+
+async def _atrigger_pollinations(image_url: str):
+    """_trigger_pollinations의 비동기 버전 (응답 본문은 받지 않고 상태 코드만 확인)"""
+    try:
+        async with _async_client().stream("GET", image_url, timeout=40) as response:
+            if response.status_code == 429:
+                response.raise_for_status()
+            return response.status_code
+    except httpx.TimeoutException:
+        return None
+
+
+def generate_image_with_gemini(prompt: str, api_key: str, config=None):
     """Pollinations.ai를 사용하여 이미지 생성
 
     무료 AI 이미지 생성 서비스인 Pollinations.ai를 사용합니다.
     API 키가 필요 없으며, URL을 통해 직접 이미지를 생성합니다.
+    진행 상황은 config의 RunContext 출력 대상으로 보냅니다.
     """
+    run = get_run_context(config)
     try:
-        import urllib.parse
-        import time
-
-        # Pollinations.ai API 사용 (무료, API 키 불필요)
-        # 프롬프트를 URL 인코딩
-        encoded_prompt = urllib.parse.quote(prompt)
-
-        # Pollinations.ai 이미지 생성 URL
-        # seed를 추가하여 매번 다른 이미지 생성
-        seed = int(time.time())
-        image_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}?seed={seed}&width=1024&height=1024&nologo=true"
+        # Pollinations.ai 이미지 생성 URL (API 키 불필요, 프롬프트는 URL 인코딩)
+        image_url = _pollinations_url(prompt)
 
         # Pollinations.ai는 첫 요청 시 이미지를 생성하므로 시간이 걸림
         # HEAD 요청 대신 직접 URL을 반환 (브라우저가 이미지를 가져올 때 생성됨)
-        st.info("🎨 Pollinations.ai를 통해 이미지를 생성 중... (첫 로딩 시 10-20초 소요)")
+        run.info("🎨 Pollinations.ai를 통해 이미지를 생성 중... (첫 로딩 시 10-20초 소요)")
 
         # 이미지 생성을 트리거하기 위해 GET 요청을 보내되,
         # 타임아웃이 발생해도 URL은 유효하므로 반환
         try:
-            # 이미지 생성 트리거 (최대 40초 대기)
-            response = requests.get(image_url, timeout=40, stream=True)
-            if response.status_code == 200:
-                st.success("✅ 이미지 생성 완료!")
-                return image_url
-        except requests.Timeout:
-            # 타임아웃이 발생해도 URL은 유효함
-            st.warning("⏳ 이미지 생성 중... URL은 유효하며 잠시 후 표시됩니다.")
-            return image_url
+            status = get_limiter("Pollinations.ai").call(_trigger_pollinations, image_url)
+            if status is None:
+                # 타임아웃이 발생해도 URL은 유효함
+                run.warning("⏳ 이미지 생성 중... URL은 유효하며 잠시 후 표시됩니다.")
+            elif status == 200:
+                run.success("✅ 이미지 생성 완료!")
         except Exception:
             # 다른 오류가 발생해도 URL 자체는 유효할 수 있음
             return image_url
@@ -102,89 +363,465 @@ def generate_image_with_gemini(prompt: str, api_key: str):
         return image_url
 
     except Exception as e:
-        st.error(f"이미지 URL 생성 실패: {e}")
+        run.error(f"이미지 URL 생성 실패: {e}")
+        return None
+
+
+async def agenerate_image_with_gemini(prompt: str, api_key: str, config=None):
+    """generate_image_with_gemini의 비동기 버전 (이벤트 루프의 공유 httpx.AsyncClient 사용)"""
+    run = get_run_context(config)
+    try:
+        image_url = _pollinations_url(prompt)
+        run.info("🎨 Pollinations.ai를 통해 이미지를 생성 중... (첫 로딩 시 10-20초 소요)")
+        try:
+            status = await get_limiter("Pollinations.ai").acall(_atrigger_pollinations, image_url)
+            if status is None:
+                run.warning("⏳ 이미지 생성 중... URL은 유효하며 잠시 후 표시됩니다.")
+            elif status == 200:
+                run.success("✅ 이미지 생성 완료!")
+        except Exception:
+            # 다른 오류가 발생해도 URL 자체는 유효할 수 있음
+            pass
+        return image_url
+
+    except Exception as e:
+        run.error(f"이미지 URL 생성 실패: {e}")
         return None
 
 
-def _session():
+# 스크랩 요청 타임아웃(초): 연결과 읽기를 따로 지정
+SCRAPE_CONNECT_TIMEOUT = float(os.getenv("SCRAPE_CONNECT_TIMEOUT", "5"))
+SCRAPE_READ_TIMEOUT = float(os.getenv("SCRAPE_READ_TIMEOUT", "20"))
+SCRAPE_TIMEOUT = (SCRAPE_CONNECT_TIMEOUT, SCRAPE_READ_TIMEOUT)
+# 호스트별 최대 동시 연결 수 (초과 요청은 연결이 반납될 때까지 대기)
+SCRAPE_POOL_MAXSIZE = int(os.getenv("SCRAPE_POOL_MAXSIZE", "8"))
+# 연결 풀이 가득 찼을 때 빈 연결을 기다리는 최대 시간(초), 넘으면 요청 오류로 처리
+SCRAPE_POOL_TIMEOUT = float(os.getenv("SCRAPE_POOL_TIMEOUT", "30"))
+# 5xx 응답과 연결 오류에 대한 최대 재시도 횟수
+SCRAPE_MAX_RETRIES = int(os.getenv("SCRAPE_MAX_RETRIES", "3"))
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+class _ScrapeRetry(Retry):
+    """인증서 검증 실패는 재시도하지 않는 Retry
+
+    재시도해도 결과가 같으므로 바로 SSLError를 올려 _fetch_web_page의 verify=False 재요청으로 넘어갑니다.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, Urllib3SSLError):
+            raise error
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class _PoolTimeoutMixin:
+    # requests는 pool_timeout을 넘기지 않아 pool_block=True에서 풀이 가득 차면 무한히 기다리므로 기본값을 지정
+    def urlopen(self, *args, **kwargs):
+        kwargs.setdefault("pool_timeout", SCRAPE_POOL_TIMEOUT)
+        return super().urlopen(*args, **kwargs)
+
+
+class _TimedHTTPConnectionPool(_PoolTimeoutMixin, HTTPConnectionPool):
+    pass
+
+
+class _TimedHTTPSConnectionPool(_PoolTimeoutMixin, HTTPSConnectionPool):
+    pass
+
+
+class _ScrapeAdapter(HTTPAdapter):
+    """빈 연결을 SCRAPE_POOL_TIMEOUT초까지만 기다리는 HTTPAdapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+    def send(self, request, *args, **kwargs):
+        try:
+            return super().send(request, *args, **kwargs)
+        except EmptyPoolError as e:
+            # requests가 감싸지 않는 urllib3 예외이므로 다른 요청 오류와 같이 처리되도록 변환
+            raise requests.ConnectionError(e, request=request)
+
+
+def _build_session() -> requests.Session:
+    retry = _ScrapeRetry(
+        total=SCRAPE_MAX_RETRIES,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        backoff_factor=0.5,
+        backoff_jitter=0.5,  # 여러 세션의 재시도가 동시에 몰리지 않도록 지터 추가
+        raise_on_status=False,  # 재시도 후에도 실패하면 마지막 응답을 반환하여 raise_for_status에서 처리
+    )
+    adapter = _ScrapeAdapter(
+        pool_connections=32,
+        pool_maxsize=SCRAPE_POOL_MAXSIZE,
+        pool_block=True,
+        max_retries=retry,
+    )
     s = requests.Session()
     s.headers.update({
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
     })
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
     return s
 
-def _scrape_naver_blog(url: str):
-    s = _session()
-    try:
-        r = s.get(url, timeout=20)
+
+def _session() -> requests.Session:
+    """스크랩에 사용하는 프로세스 전역 HTTP 세션
+
+    모든 스크랩 요청이 하나의 세션을 공유하여 호스트별 연결(keep-alive)과 TLS 세션을 재사용합니다.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                _http_session = _build_session()
+    return _http_session
+
+
+# 비동기 HTTP 클라이언트 (이벤트 루프 -> {인증서 검증 여부: 클라이언트})
+_async_clients = weakref.WeakKeyDictionary()
+_RETRY_STATUS = (500, 502, 503, 504)
+
+
+def _async_client(verify: bool = True) -> httpx.AsyncClient:
+    """현재 이벤트 루프에서 공유하는 비동기 HTTP 클라이언트
+
+    연결 풀은 이벤트 루프에 묶이므로 루프마다 따로 만들고, 같은 루프의 모든 요청이 keep-alive 연결을 재사용합니다.
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if verify not in clients:
+        clients[verify] = httpx.AsyncClient(
+            headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"},
+            timeout=httpx.Timeout(SCRAPE_READ_TIMEOUT, connect=SCRAPE_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=32 * SCRAPE_POOL_MAXSIZE, max_keepalive_connections=32),
+            follow_redirects=True,
+            verify=verify,
+        )
+    return clients[verify]
+
+
+async def aclose_clients():
+    """현재 이벤트 루프의 비동기 HTTP 클라이언트를 닫음 (asyncio.run으로 시작한 실행이 끝날 때 호출)"""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def _is_ssl_error(error: Exception) -> bool:
+    cause = error.__cause__ or error.__context__
+    return isinstance(cause, ssl.SSLError) or "CERTIFICATE_VERIFY_FAILED" in str(error)
+
+
+async def _aget(url: str, headers: dict = None, verify: bool = True) -> httpx.Response:
+    """_session()의 재시도 정책(5xx와 연결 오류, 지수 백오프 + 지터)을 따르는 비동기 GET"""
+    client = _async_client(verify)
+    for attempt in range(SCRAPE_MAX_RETRIES + 1):
+        try:
+            r = await client.get(url, headers=headers)
+            if r.status_code not in _RETRY_STATUS or attempt == SCRAPE_MAX_RETRIES:
+                return r
+        except httpx.TransportError as e:
+            if attempt == SCRAPE_MAX_RETRIES or _is_ssl_error(e):
+                raise
+        await asyncio.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.5))
+
+
+def _araise_for_status(r: httpx.Response):
+    # requests와 같이 4xx/5xx만 오류로 처리 (304는 캐시 재검증 응답)
+    if r.status_code >= 400:
         r.raise_for_status()
-    except RequestException as e:
-        return "", f"URL 요청 중 오류 발생: {e}"
 
-    soup = BeautifulSoup(r.content, "html.parser")
 
-    frame = soup.find("iframe", {"id": "mainFrame"}) or soup.find("frame", {"id": "mainFrame"})
-    if not frame or not frame.get("src"):
-        return "", "콘텐츠를 추출할 수 없습니다."
+NAVER_POSTVIEW_URL = "https://blog.naver.com/PostView.naver?blogId={blog_id}&logNo={log_no}"
+
+
+def _naver_postview_url(url: str):
+    """네이버 블로그 URL의 blogId/logNo로 본문(PostView) URL을 바로 만듦
+
+    지원하는 형태:
+        - blog.naver.com/{blogId}/{logNo}, m.blog.naver.com/{blogId}/{logNo}
+        - .../PostView.naver?blogId=...&logNo=... (PostView.nhn 포함)
+        - blog.naver.com/{blogId}?Redirect=Log&logNo=...
+
+    알 수 없는 형태이면 None을 반환합니다.
+    """
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    parts = [p for p in parsed.path.split("/") if p]
+
+    blog_id = (query.get("blogId") or [""])[0]
+    log_no = (query.get("logNo") or [""])[0]
+    if not blog_id and parts and "." not in parts[0]:
+        blog_id = parts[0]
+    if not log_no and len(parts) >= 2:
+        log_no = parts[1]
+
+    if blog_id and log_no.isdigit():
+        return NAVER_POSTVIEW_URL.format(blog_id=blog_id, log_no=log_no)
+    return None
+
+
+def _class_xpath(class_name: str, tag: str = "*") -> str:
+    """CSS 클래스 선택자(tag.class)에 해당하는 XPath"""
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
 
-    inner_url = urljoin("https://blog.naver.com", frame.get("src"))
+# 네이버 블로그 본문 페이지의 제목/본문 후보 (CSS 선택자를 미리 컴파일한 XPath로 변환)
+_NAVER_TITLE_XPATHS = [
+    etree.XPath(_class_xpath("se-title-text")),        # .se-title-text
+    etree.XPath(_class_xpath("se_title_text")),        # .se_title_text
+    etree.XPath(_class_xpath("se_textarea", "h3")),    # h3.se_textarea
+    etree.XPath("//*[@id='title_1']"),                 # #title_1
+    etree.XPath("//h3[@id='postTitleText']"),          # h3#postTitleText
+]
+_NAVER_CONTAINER_XPATHS = [
+    etree.XPath(_class_xpath("se-main-container")),    # .se-main-container
+    etree.XPath("//*[@id='postViewArea']"),            # #postViewArea
+]
+_NAVER_FRAME_XPATH = etree.XPath("//iframe[@id='mainFrame'] | //frame[@id='mainFrame']")
+_TITLE_XPATH = etree.XPath("(//title)[1]")
+_NOISE_XPATH = etree.XPath(".//script | .//style | .//nav | .//footer | .//aside | .//form")
+_TEXT_XPATH = etree.XPath(".//text()")
+
+
+def parse_html(content: bytes):
+    """HTML 문서를 lxml 트리로 한 번만 파싱
+
+    trafilatura와 같은 파서(인코딩 추정 포함)를 사용하므로,
+    제목/본문 영역 탐색과 trafilatura 본문 추출이 모두 이 트리를 그대로 재사용합니다.
+    파싱할 수 없는 문서이면 None을 반환합니다.
+    """
     try:
-        r2 = s.get(inner_url, timeout=20)
-        r2.raise_for_status()
-    except RequestException as e:
-        return "", f"URL 요청 중 오류 발생: {e}"
+        return load_html(content)
+    except Exception:
+        return None
 
-    inner = BeautifulSoup(r2.content, "html.parser")
 
-    title_candidates = [
-        ".se-title-text", ".se_title_text", "h3.se_textarea", "#title_1", "h3#postTitleText"
-    ]
+def _first(xpaths, tree):
+    for xpath in xpaths:
+        found = xpath(tree)
+        if found:
+            return found[0]
+    return None
+
+
+def _text_of(element, separator: str = "") -> str:
+    """요소의 텍스트 노드를 공백 제거 후 이어 붙임 (BeautifulSoup get_text(strip=True)와 같은 결과)"""
+    return separator.join(t.strip() for t in _TEXT_XPATH(element) if t.strip())
+
+
+def _page_title(tree) -> str:
+    found = _TITLE_XPATH(tree)
+    return _text_of(found[0]) if found else ""
+
+
+def extract_naver_post(tree):
+    """파싱된 네이버 블로그 본문(PostView) 페이지에서 (제목, 본문) 추출"""
+    if tree is None:
+        return "", "콘텐츠를 추출할 수 없습니다."
+
     title = ""
-    for sel in title_candidates:
-        el = inner.select_one(sel)
-        if el and el.get_text(strip=True):
-            title = el.get_text(strip=True)
+    for xpath in _NAVER_TITLE_XPATHS:
+        for el in xpath(tree):
+            title = _text_of(el)
+            if title:
+                break
+        if title:
             break
     if not title:
-        title = inner.title.get_text(strip=True) if inner.title else ""
+        title = _page_title(tree)
 
-    container = inner.select_one(".se-main-container") or inner.select_one("#postViewArea")
-    if container:
-        for tag in container(["script","style","nav","footer","aside","form"]):
-            tag.decompose()
-        text = container.get_text(separator="\n", strip=True)
+    container = _first(_NAVER_CONTAINER_XPATHS, tree)
+    if container is not None:
+        for tag in _NOISE_XPATH(container):
+            tag.drop_tree()
+        text = _text_of(container, separator="\n")
         return title, text if text else "콘텐츠를 추출할 수 없습니다."
 
-    extracted = trafilatura.extract(r2.text)
+    extracted = trafilatura.extract(tree)
     if extracted:
         return title, extracted
 
     return title, "콘텐츠를 추출할 수 없습니다."
 
-def scrape_web_content(url: str):
-    parsed = urlparse(url)
-    host = parsed.netloc.lower()
-    if "blog.naver.com" in host or "m.blog.naver.com" in host:
-        return _scrape_naver_blog(url)
 
+def extract_web_page(tree):
+    """파싱된 일반 웹 페이지에서 (제목, 본문) 추출"""
+    if tree is None:
+        return "", "콘텐츠를 추출할 수 없습니다."
+
+    title = _page_title(tree)
+    extracted = trafilatura.extract(tree)
+    if extracted:
+        return title, extracted
+    return title, "콘텐츠를 추출할 수 없습니다."
+
+
+def _fetch_naver_post(url: str, headers: dict = None):
+    """네이버 블로그 본문(PostView) 페이지 응답을 가져옴 (본문 주소를 찾지 못하면 None)"""
     s = _session()
-    try:
-        r = s.get(url, timeout=20)
+    inner_url = _naver_postview_url(url)
+
+    if inner_url is None:
+        # 알 수 없는 URL 형태: 바깥 페이지에서 mainFrame iframe 주소를 찾아 본문 페이지로 이동
+        r = s.get(url, timeout=SCRAPE_TIMEOUT)
         r.raise_for_status()
+
+        outer = parse_html(r.content)
+        frame = _NAVER_FRAME_XPATH(outer) if outer is not None else []
+        if not frame or not frame[0].get("src"):
+            return None
+
+        inner_url = urljoin("https://blog.naver.com", frame[0].get("src"))
+
+    r2 = s.get(inner_url, timeout=SCRAPE_TIMEOUT, headers=headers)
+    r2.raise_for_status()
+    return r2
+
+
+def _fetch_web_page(url: str, headers: dict = None):
+    s = _session()
+    try:
+        r = s.get(url, timeout=SCRAPE_TIMEOUT, headers=headers)
     except SSLError:
-        r = s.get(url, timeout=20, verify=False)
-        r.raise_for_status()
-    except RequestException as e:
-        return "", f"URL 요청 중 오류 발생: {e}"
+        r = s.get(url, timeout=SCRAPE_TIMEOUT, headers=headers, verify=False)
+    r.raise_for_status()
+    return r
 
-    title = ""
+
+async def _afetch_naver_post(url: str, headers: dict = None):
+    """_fetch_naver_post의 비동기 버전"""
+    inner_url = _naver_postview_url(url)
+
+    if inner_url is None:
+        r = await _aget(url)
+        _araise_for_status(r)
+
+        outer = await asyncio.to_thread(parse_html, r.content)
+        frame = _NAVER_FRAME_XPATH(outer) if outer is not None else []
+        if not frame or not frame[0].get("src"):
+            return None
+
+        inner_url = urljoin("https://blog.naver.com", frame[0].get("src"))
+
+    r2 = await _aget(inner_url, headers)
+    _araise_for_status(r2)
+    return r2
+
+
+async def _afetch_web_page(url: str, headers: dict = None):
+    """_fetch_web_page의 비동기 버전"""
     try:
-        soup = BeautifulSoup(r.content, "html.parser")
-        title = soup.title.get_text(strip=True) if soup.title else ""
-    except Exception:
-        pass
+        r = await _aget(url, headers)
+    except httpx.ConnectError as e:
+        if not _is_ssl_error(e):
+            raise
+        r = await _aget(url, headers, verify=False)
+    _araise_for_status(r)
+    return r
 
-    extracted = trafilatura.extract(r.text)
-    if extracted:
-        return title, extracted
-    return title, "콘텐츠를 추출할 수 없습니다."
\ No newline at end of file
+
+def _is_naver_blog(url: str) -> bool:
+    host = urlparse(url).netloc.lower()
+    return "blog.naver.com" in host or "m.blog.naver.com" in host
+
+
+def _scrape_key(url: str):
+    """(네이버 블로그 여부, 캐시 키)
+
+    네이버 블로그는 PC/모바일 주소가 같은 항목을 쓰도록 본문(PostView) 주소를 키로 사용합니다.
+    """
+    naver = _is_naver_blog(url)
+    return naver, normalize_url((_naver_postview_url(url) if naver else None) or url)
+
+
+def _fresh_cached(cache, key: str, use_cache: bool, cache_ttl: float, span: dict):
+    """(저장된 항목, 바로 사용 가능 여부)"""
+    cached = cache.get(key) if use_cache else None
+    if cached is not None and cache.is_fresh(cached, cache_ttl):
+        cache.record("hits")
+        span["cache"] = "hit"
+        return cached, True
+    return cached, False
+
+
+def _scrape_result(cache, key: str, cached, r, naver: bool, span: dict):
+    """받은 응답(requests / httpx)에서 (제목, 본문)을 추출하고 캐시에 반영"""
+    if r is None:
+        span["error"] = "본문 주소를 찾지 못함"
+        return "", "콘텐츠를 추출할 수 없습니다."
+    span["status"], span["bytes"] = r.status_code, len(r.content)
+
+    if r.status_code == 304 and cached is not None:
+        cache.record("revalidated")
+        cache.mark_revalidated(key)
+        span["cache"] = "revalidated"
+        return cached["title"], cached["text"]
+
+    cache.record("misses")
+    span["cache"] = "miss"
+    extract = extract_naver_post if naver else extract_web_page
+    title, text = extract(parse_html(r.content))
+    if text != "콘텐츠를 추출할 수 없습니다.":
+        cache.put(key, title, text, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+    return title, text
+
+
+def scrape_web_content(url: str, use_cache: bool = True, cache_ttl: float = None):
+    """URL의 (제목, 본문)을 추출
+
+    추출 결과는 정규화된 URL별로 디스크에 캐시됩니다. 캐시 유효기간(cache_ttl, 기본 SCRAPE_CACHE_TTL)
+    이내이면 요청 없이 캐시를 사용하고, 그 이후에는 조건부 GET으로 재검증하여
+    304 응답이면 다운로드와 추출을 건너뜁니다.
+
+    Args:
+        url: 분석할 URL
+        use_cache: False이면 캐시를 조회하지 않고 새로 받아 캐시를 갱신
+        cache_ttl: 이번 실행에만 적용할 캐시 유효기간(초)
+    """
+    naver, key = _scrape_key(url)
+    cache = get_scrape_cache()
+
+    with trace_span("scrape", "http", url=key) as span:
+        cached, fresh = _fresh_cached(cache, key, use_cache, cache_ttl, span)
+        if fresh:
+            return cached["title"], cached["text"]
+
+        try:
+            headers = cache.conditional_headers(cached)
+            fetch_started = time.perf_counter()
+            r = _fetch_naver_post(url, headers) if naver else _fetch_web_page(url, headers)
+            span["fetch_ms"] = round((time.perf_counter() - fetch_started) * 1000, 1)
+        except RequestException as e:
+            span["error"] = f"{type(e).__name__}: {e}"
+            return "", f"URL 요청 중 오류 발생: {e}"
+        return _scrape_result(cache, key, cached, r, naver, span)
+
+
+async def ascrape_web_content(url: str, use_cache: bool = True, cache_ttl: float = None):
+    """scrape_web_content의 비동기 버전
+
+    요청은 httpx.AsyncClient로 보내고, HTML 파싱과 본문 추출(CPU 작업)은 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    """
+    naver, key = _scrape_key(url)
+    cache = get_scrape_cache()
+
+    with trace_span("scrape", "http", url=key) as span:
+        cached, fresh = _fresh_cached(cache, key, use_cache, cache_ttl, span)
+        if fresh:
+            return cached["title"], cached["text"]
+
+        try:
+            headers = cache.conditional_headers(cached)
+            fetch_started = time.perf_counter()
+            r = await (_afetch_naver_post(url, headers) if naver else _afetch_web_page(url, headers))
+            span["fetch_ms"] = round((time.perf_counter() - fetch_started) * 1000, 1)
+        except httpx.HTTPError as e:
+            span["error"] = f"{type(e).__name__}: {e}"
+            return "", f"URL 요청 중 오류 발생: {e}"
+        return await asyncio.to_thread(_scrape_result, cache, key, cached, r, naver, span)
@@ -0,0 +1,282 @@
+"""로컬 실행 추적 (JSON 스팬 + 선택적 Prometheus 지표)
+
+외부 추적 서비스 없이 노드 실행 시간, LLM 첫 토큰 시간(TTFT)과 토큰/비용, 스크랩 시간과 크기,
+이미지 생성 시간을 한 줄에 하나씩 JSON 스팬으로 TRACE_FILE에 기록합니다.
+METRICS_PORT를 지정하면 같은 값을 Prometheus 형식(/metrics)으로도 노출합니다.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# 스팬을 기록할 JSONL 파일 (빈 값이면 파일 기록 안 함)
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(".cache", "traces.jsonl"))
+# TRACE_FILE이 이 크기(바이트)를 넘으면 TRACE_FILE.1로 옮기고 새 파일에 기록 (0이면 회전 안 함, 백업은 1개만 유지)
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+# Prometheus 지표를 노출할 포트 (빈 값이면 사용 안 함)
+METRICS_PORT = os.getenv("METRICS_PORT", "")
+
+# 모델별 가격 (USD / 100만 토큰): 입력, 캐시 읽기 입력, 캐시 쓰기 입력, 출력
+MODEL_PRICES = {
+    "gpt-4o": {"input": 2.50, "cache_read": 1.25, "cache_creation": 2.50, "output": 10.00},
+    "gemini-2.5-flash": {"input": 0.30, "cache_read": 0.075, "cache_creation": 0.30, "output": 2.50},
+    "claude-4-sonnet": {"input": 3.00, "cache_read": 0.30, "cache_creation": 3.75, "output": 15.00},
+}
+
+logger = logging.getLogger(__name__)
+
+# 현재 실행 ID와 노드 이름 (노드 안에서 만들어지는 LLM/스크랩/이미지 스팬에 붙음)
+_run_id = contextvars.ContextVar("trace_run_id", default=None)
+_node = contextvars.ContextVar("trace_node", default=None)
+_write_lock = threading.Lock()
+
+
+def estimate_cost(model: str, usage: dict) -> float:
+    """usage_metadata 기준 호출 비용(USD), 가격표에 없는 모델은 0"""
+    prices = MODEL_PRICES.get(model)
+    if not prices or not usage:
+        return 0.0
+    details = usage.get("input_token_details") or {}
+    cache_read = details.get("cache_read") or 0
+    cache_creation = details.get("cache_creation") or 0
+    uncached = max((usage.get("input_tokens") or 0) - cache_read - cache_creation, 0)
+    total = (
+        uncached * prices["input"]
+        + cache_read * prices["cache_read"]
+        + cache_creation * prices["cache_creation"]
+        + (usage.get("output_tokens") or 0) * prices["output"]
+    )
+    return total / 1_000_000
+
+
+def _rotate_trace_file():
+    """TRACE_FILE이 TRACE_MAX_BYTES를 넘었으면 이전 백업을 덮어쓰며 TRACE_FILE.1로 옮김 (_write_lock 안에서 호출)"""
+    if TRACE_MAX_BYTES <= 0:
+        return
+    try:
+        if os.path.getsize(TRACE_FILE) < TRACE_MAX_BYTES:
+            return
+    except FileNotFoundError:
+        return
+    os.replace(TRACE_FILE, TRACE_FILE + ".1")
+
+
+def emit(span: dict):
+    """완료된 스팬을 JSONL 파일과 Prometheus 지표에 기록"""
+    span.setdefault("run_id", _run_id.get())
+    span.setdefault("node", _node.get())
+    if TRACE_FILE:
+        line = json.dumps(span, ensure_ascii=False, default=str)
+        try:
+            with _write_lock:
+                if os.path.dirname(TRACE_FILE):
+                    os.makedirs(os.path.dirname(TRACE_FILE), exist_ok=True)
+                _rotate_trace_file()
+                with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            logger.warning("추적 스팬 기록 실패: %s", e)
+    _metrics.observe(span)
+
+
+@contextmanager
+def trace_span(name: str, kind: str, **attributes):
+    """with 블록의 실행 시간을 스팬으로 기록
+
+    yield되는 dict에 값을 넣으면 스팬 속성으로 함께 기록되며, 예외가 나면 error 속성이 붙습니다.
+    """
+    span = {"name": name, "kind": kind, "span_id": uuid.uuid4().hex[:16], "ts": time.time(), **attributes}
+    started = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        emit(span)
+
+
+def traced_node(name: str, fn):
+    """그래프 노드 함수를 감싸 노드 단위 스팬을 기록하고, 안에서 생기는 스팬에 실행 ID/노드 이름을 전달"""
+
+    @functools.wraps(fn)
+    def _node_fn(state, config):
+        run_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        run_token, node_token = _run_id.set(run_id), _node.set(name)
+        try:
+            with trace_span(name, "node", run_id=run_id, node=name):
+                return fn(state, config)
+        finally:
+            _node.reset(node_token)
+            _run_id.reset(run_token)
+
+    return _node_fn
+
+
+def atraced_node(name: str, fn):
+    """traced_node의 비동기 노드 함수 버전"""
+
+    @functools.wraps(fn)
+    async def _node_fn(state, config):
+        run_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        run_token, node_token = _run_id.set(run_id), _node.set(name)
+        try:
+            with trace_span(name, "node", run_id=run_id, node=name):
+                return await fn(state, config)
+        finally:
+            _node.reset(node_token)
+            _run_id.reset(run_token)
+
+    return _node_fn
+
+
+class TracingCallback(BaseCallbackHandler):
+    """LLM 호출마다 TTFT, 전체 시간, 토큰 수, 비용을 스팬으로 기록하는 콜백 (get_llm에서 연결)"""
+
+    # 비동기 호출에서도 스레드 풀을 거치지 않고 바로 호출 (토큰 시각이 밀리지 않고 실행 ID 컨텍스트가 유지됨)
+    run_inline = True
+
+    def __init__(self, node: str, provider: str, model: str):
+        self.node = node
+        self.provider = provider
+        self.model = model
+        self._calls = {}  # LangChain run_id -> 시작 정보
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        with self._lock:
+            self._calls[run_id] = {
+                "ts": time.time(), "started": time.perf_counter(), "first_token": None,
+                "trace_run_id": _run_id.get(), "trace_node": _node.get(),
+            }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            call = self._calls.get(run_id)
+            if call is not None and call["first_token"] is None:
+                call["first_token"] = time.perf_counter()
+
+    def _finish(self, run_id, usage: dict = None, error: BaseException = None, cache_hit: bool = False):
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+        if call is None:
+            return
+        now = time.perf_counter()
+        usage = usage or {}
+        details = usage.get("input_token_details") or {}
+        span = {
+            "name": "llm", "kind": "llm", "span_id": uuid.uuid4().hex[:16], "ts": call["ts"],
+            "run_id": call["trace_run_id"], "node": self.node or call["trace_node"],
+            "provider": self.provider, "model": self.model,
+            "duration_ms": round((now - call["started"]) * 1000, 1),
+            # 스트리밍하지 않은 호출은 응답 전체가 도착한 시점이 첫 토큰 시점
+            "ttft_ms": round(((call["first_token"] or now) - call["started"]) * 1000, 1),
+            "prompt_tokens": usage.get("input_tokens") or 0,
+            "completion_tokens": usage.get("output_tokens") or 0,
+            "cached_tokens": details.get("cache_read") or 0,
+            "cache_creation_tokens": details.get("cache_creation") or 0,
+            "cost_usd": round(estimate_cost(self.model, usage), 6),
+            # LLM 응답 캐시(llm_cache) 적중: 제공자를 호출하지 않아 토큰과 비용이 0
+            "llm_cache_hit": cache_hit,
+        }
+        if error is not None:
+            span["error"] = f"{type(error).__name__}: {error}"
+        emit(span)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        if (response.llm_output or {}).get("llm_cache_hit"):
+            self._finish(run_id, cache_hit=True)
+            return
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        self._finish(run_id, usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
+
+
+class _Metrics:
+    """스팬을 Prometheus 지표로 변환 (prometheus_client가 없거나 METRICS_PORT가 없으면 아무것도 하지 않음)"""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+
+    def start(self, port: int):
+        with self._lock:
+            if self.enabled:
+                return
+            try:
+                from prometheus_client import CollectorRegistry, Counter, Histogram, start_http_server
+            except ImportError:
+                logger.warning("prometheus_client가 설치되어 있지 않아 지표 엔드포인트를 열지 않습니다.")
+                return
+            registry = CollectorRegistry()
+            self.node_seconds = Histogram("blog_agent_node_seconds", "노드 실행 시간", ["node"], registry=registry)
+            self.llm_seconds = Histogram("blog_agent_llm_seconds", "LLM 호출 시간", ["node", "provider"], registry=registry)
+            self.llm_ttft_seconds = Histogram("blog_agent_llm_ttft_seconds", "LLM 첫 토큰 시간", ["node", "provider"], registry=registry)
+            self.llm_tokens = Counter("blog_agent_llm_tokens", "LLM 토큰 수", ["node", "provider", "type"], registry=registry)
+            self.llm_cost = Counter("blog_agent_llm_cost_usd", "LLM 추정 비용(USD)", ["node", "provider"], registry=registry)
+            self.llm_cache_hits = Counter("blog_agent_llm_cache_hits", "LLM 응답 캐시 적중 수", ["node", "provider"], registry=registry)
+            self.scrape_seconds = Histogram("blog_agent_scrape_seconds", "스크랩 시간", ["cache"], registry=registry)
+            self.scrape_bytes = Counter("blog_agent_scrape_bytes", "스크랩 응답 크기", registry=registry)
+            self.image_seconds = Histogram("blog_agent_image_seconds", "이미지 생성 시간", ["provider"], registry=registry)
+            self.errors = Counter("blog_agent_span_errors", "오류로 끝난 스팬 수", ["kind", "name"], registry=registry)
+            start_http_server(port, registry=registry)
+            self.enabled = True
+
+    def observe(self, span: dict):
+        if not self.enabled:
+            return
+        kind, seconds = span.get("kind"), span.get("duration_ms", 0) / 1000
+        if span.get("error"):
+            self.errors.labels(kind, span.get("name", "")).inc()
+        if kind == "node":
+            self.node_seconds.labels(span["name"]).observe(seconds)
+        elif kind == "llm":
+            labels = (span.get("node") or "unknown", span.get("provider") or "unknown")
+            if span.get("llm_cache_hit"):
+                # 캐시 적중은 호출 시간/토큰 분포에 섞지 않고 횟수만 기록
+                self.llm_cache_hits.labels(*labels).inc()
+                return
+            self.llm_seconds.labels(*labels).observe(seconds)
+            self.llm_ttft_seconds.labels(*labels).observe(span.get("ttft_ms", 0) / 1000)
+            for token_type in ("prompt", "completion", "cached"):
+                self.llm_tokens.labels(*labels, token_type).inc(span.get(f"{token_type}_tokens", 0))
+            self.llm_cost.labels(*labels).inc(span.get("cost_usd", 0))
+        elif kind == "http":
+            self.scrape_seconds.labels(span.get("cache") or "miss").observe(seconds)
+            self.scrape_bytes.inc(span.get("bytes", 0))
+        elif kind == "image":
+            self.image_seconds.labels(span.get("provider") or "unknown").observe(seconds)
+
+
+_metrics = _Metrics()
+
+
+def start_metrics_server(port: str = METRICS_PORT) -> bool:
+    """METRICS_PORT가 지정되어 있으면 Prometheus 지표 엔드포인트를 한 번만 시작"""
+    if not port:
+        return False
+    try:
+        _metrics.start(int(port))
+    except OSError as e:
+        # Streamlit 재실행 등으로 포트가 이미 사용 중이면 기존 엔드포인트를 그대로 사용
+        logger.warning("지표 엔드포인트 시작 실패 (포트 %s): %s", port, e)
+    return _metrics.enabled